@@ -20,7 +20,7 @@ from accounts.forms import (
     StudentAddForm,
 )
 from accounts.models import Parent, Student, User
-from core.models import Semester, Session
+from core.metrics import PDF_SECONDS
 from course.models import Course
 from result.models import TakenCourse
 # Comment out imports that don't exist
@@ -41,17 +41,15 @@ def student_dashboard(request):
     Shows a grid layout of all functionalities available to students.
     """
     # Get current session and semester for context
-    current_session = Session.objects.filter(is_current_session=True).first()
-    current_semester = Semester.objects.filter(
-        is_current_semester=True, session=current_session
-    ).first()
-    
+    current_session = request.academic.current_session
+    current_semester = request.academic.current_semester
+
     # Get student information
-    student = get_object_or_404(Student, student__pk=request.user.id)
-    
+    student = request.academic.get_student_or_404()
+
     # Get enrolled courses
     courses = TakenCourse.objects.filter(
-        student__student__id=request.user.id,
+        student=student,
         course__level=student.level
     )
     
@@ -76,15 +74,11 @@ def lecturer_dashboard(request):
     that a lecturer user can perform in the system
     """
     # Get current session and semester information
-    current_session = Session.objects.filter(is_current_session=True).first()
-    current_semester = Semester.objects.filter(
-        is_current_semester=True, session=current_session
-    ).first()
-    
+    current_session = request.academic.current_session
+    current_semester = request.academic.current_semester
+
     # Get courses assigned to the lecturer
-    courses = Course.objects.filter(
-        allocated_course__lecturer__pk=request.user.id
-    )
+    courses = Course.objects.filter(pk__in=request.academic.allocated_course_query)
     
     if current_semester:
         current_courses = courses.filter(semester=current_semester)
@@ -113,7 +107,8 @@ def render_to_pdf(template_name, context):
     response = HttpResponse(content_type="application/pdf")
     response["Content-Disposition"] = 'filename="profile.pdf"'
     template = render_to_string(template_name, context)
-    pdf = pisa.CreatePDF(template, dest=response)
+    with PDF_SECONDS.time(document=template_name):
+        pdf = pisa.CreatePDF(template, dest=response)
     if pdf.err:
         return HttpResponse("We had some problems generating the PDF")
     return response
@@ -174,10 +169,8 @@ def register(request):
 @login_required
 def profile(request):
     """Show profile of the current user."""
-    current_session = Session.objects.filter(is_current_session=True).first()
-    current_semester = Semester.objects.filter(
-        is_current_semester=True, session=current_session
-    ).first()
+    current_session = request.academic.current_session
+    current_semester = request.academic.current_semester
 
     context = {
         "title": request.user.get_full_name,
@@ -187,16 +180,16 @@ def profile(request):
 
     if request.user.is_lecturer:
         courses = Course.objects.filter(
-            allocated_course__lecturer__pk=request.user.id, semester=current_semester
+            pk__in=request.academic.allocated_course_query, semester=current_semester
         )
         context["courses"] = courses
         return render(request, "accounts/profile.html", context)
 
     if request.user.is_student:
-        student = get_object_or_404(Student, student__pk=request.user.id)
+        student = request.academic.get_student_or_404()
         parent = Parent.objects.filter(student=student).first()
         courses = TakenCourse.objects.filter(
-            student__student__id=request.user.id, course__level=student.level
+            student=student, course__level=student.level
         )
         context.update(
             {
@@ -220,10 +213,7 @@ def profile_single(request, user_id):
     if request.user.id == user_id:
         return redirect("profile")
 
-    current_session = Session.objects.filter(is_current_session=True).first()
-    current_semester = Semester.objects.filter(
-        is_current_semester=True, session=current_session
-    ).first()
+    current_session, current_semester = request.academic.period
     user = get_object_or_404(User, pk=user_id)
 
     context = {
@@ -373,7 +363,8 @@ def render_lecturer_pdf_list(request):
     response["Content-Disposition"] = 'filename="lecturers_list.pdf"'
     template = get_template(template_path)
     html = template.render(context)
-    pisa_status = pisa.CreatePDF(html, dest=response)
+    with PDF_SECONDS.time(document=template_path):
+        pisa_status = pisa.CreatePDF(html, dest=response)
     if pisa_status.err:
         return HttpResponse(f"We had some errors <pre>{html}</pre>")
     return response
@@ -467,7 +458,8 @@ def render_student_pdf_list(request):
     response["Content-Disposition"] = 'filename="students_list.pdf"'
     template = get_template(template_path)
     html = template.render(context)
-    pisa_status = pisa.CreatePDF(html, dest=response)
+    with PDF_SECONDS.time(document=template_path):
+        pisa_status = pisa.CreatePDF(html, dest=response)
     if pisa_status.err:
         return HttpResponse(f"We had some errors <pre>{html}</pre>")
     return response
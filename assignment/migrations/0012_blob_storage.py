@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:06
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0011_alter_assignment_topic'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assignment',
+            name='additional_file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='assignment/additional_files/'),
+        ),
+        migrations.AlterField(
+            model_name='assignment',
+            name='evaluation_criteria',
+            field=models.FileField(max_length=255, storage=core.storage.ContentAddressedStorage(), upload_to='assignment/evaluation_files/'),
+        ),
+        migrations.AlterField(
+            model_name='assignmentsubmissionfile',
+            name='file',
+            field=models.FileField(max_length=255, storage=core.storage.ContentAddressedStorage(), upload_to='assignment/submissions/files/'),
+        ),
+    ]
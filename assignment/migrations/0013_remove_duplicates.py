@@ -0,0 +1,38 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:35
+
+from django.db import migrations
+
+from core.utils import merge_duplicates
+
+
+# Filled in once a submission is evaluated
+GRADE_FIELDS = ["ai_score", "teacher_score", "final_score", "ai_feedback", "teacher_feedback"]
+
+
+def remove_duplicate_submissions(apps, schema_editor):
+    AssignmentSubmission = apps.get_model("assignment", "AssignmentSubmission")
+    AssignmentSubmissionFile = apps.get_model("assignment", "AssignmentSubmissionFile")
+    merges = merge_duplicates(
+        AssignmentSubmission,
+        ["assignment", "student"],
+        GRADE_FIELDS,
+        lambda row: any(row[field] not in (None, "") for field in GRADE_FIELDS),
+        latest=("updated_at", "pk"),
+    )
+    for kept, duplicates in merges.items():
+        # Moving the files keeps their blob references valid
+        AssignmentSubmissionFile.objects.filter(submission__in=duplicates).update(
+            submission=kept
+        )
+        AssignmentSubmission.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0012_blob_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_submissions, migrations.RunPython.noop),
+    ]
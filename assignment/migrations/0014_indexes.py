@@ -0,0 +1,17 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0013_remove_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='assignmentsubmission',
+            constraint=models.UniqueConstraint(fields=('assignment', 'student'), name='unique_assignment_submission'),
+        ),
+    ]
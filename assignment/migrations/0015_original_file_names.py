@@ -0,0 +1,58 @@
+# Generated by Django 4.0.8 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+from core.storage import legacy_name
+
+
+# Models and file fields whose <field>_name is backfilled
+FILE_FIELDS = [
+    ('Assignment', ['evaluation_criteria', 'additional_file']),
+    ('AssignmentSubmissionFile', ['file']),
+]
+
+
+def backfill_names(apps, schema_editor):
+    """
+    Recover the uploaded names from the stored ones. Files already in the
+    blob store are named by digest, so theirs stay blank.
+    """
+    for model_name, fields in FILE_FIELDS:
+        model = apps.get_model('assignment', model_name)
+        changed = []
+        for obj in model.objects.only('pk', *fields).iterator():
+            names = {
+                f'{field}_name': legacy_name(getattr(obj, field).name)[:255]
+                for field in fields
+            }
+            if any(names.values()):
+                for attr, name in names.items():
+                    setattr(obj, attr, name)
+                changed.append(obj)
+        model.objects.bulk_update(changed, [f'{field}_name' for field in fields], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0014_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='additional_file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='evaluation_criteria_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='assignmentsubmissionfile',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(backfill_names, migrations.RunPython.noop),
+    ]
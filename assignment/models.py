@@ -1,7 +1,7 @@
 from django.db import models
 from django.conf import settings
+from core.storage import blob_storage, original_name, track_blob_fields, track_original_names
 from course.models import Course, Topic
-import os
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -38,12 +38,16 @@ class Assignment(models.Model):
         blank=False,
     )
     evaluation_criteria = models.FileField(
-        upload_to='assignment/evaluation_files/', blank=False, null=False, max_length=255)
+        upload_to='assignment/evaluation_files/', blank=False, null=False, max_length=255,
+        storage=blob_storage)
+    # Names the files were uploaded as; the stored names are content digests
+    evaluation_criteria_name = models.CharField(max_length=255, blank=True)
     deadline = models.DateTimeField(null=False, blank=False)
     allowed_submissions = models.IntegerField(default=1)
     additional_file = models.FileField(
         upload_to='assignment/additional_files/', blank=True, null=True,
-        max_length=255)
+        max_length=255, storage=blob_storage)
+    additional_file_name = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)  # Using DateTimeField
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -53,6 +57,11 @@ class Assignment(models.Model):
     def __str__(self):
         return self.title
 
+
+track_blob_fields(Assignment, 'evaluation_criteria', 'additional_file')
+track_original_names(Assignment, 'evaluation_criteria', 'additional_file')
+
+
 class AssignmentSubmission(models.Model):
     assignment = models.ForeignKey(
         Assignment, on_delete=models.CASCADE, related_name='submissions')
@@ -76,6 +85,10 @@ class AssignmentSubmission(models.Model):
 
     class Meta:
         ordering = ('-created_at',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['assignment', 'student'], name='unique_assignment_submission'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.assignment.title}"
@@ -84,9 +97,15 @@ class AssignmentSubmission(models.Model):
 class AssignmentSubmissionFile(models.Model):
     submission = models.ForeignKey(
         AssignmentSubmission, on_delete=models.CASCADE, related_name='submission_files')
-    file = models.FileField(upload_to='assignment/submissions/files/', max_length=255)
+    file = models.FileField(upload_to='assignment/submissions/files/', max_length=255,
+                            storage=blob_storage)
+    file_name = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)  # Using DateTimeField
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return os.path.basename(self.file.name)
+        return original_name(self.file)
+
+
+track_blob_fields(AssignmentSubmissionFile, 'file')
+track_original_names(AssignmentSubmissionFile, 'file')
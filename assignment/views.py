@@ -17,6 +17,8 @@ from .models import (
     AssignmentSubmissionFile,
 )
 from .forms import AssignmentForm, AssignmentSubmissionForm
+from core.metrics import histogram, timed
+from core.storage import blob_storage, is_blob_name
 from course.models import Course, Topic
 from google.cloud import vision
 from google.oauth2 import service_account
@@ -29,11 +31,15 @@ from django.contrib.auth.decorators import login_required
 from accounts.decorators import lecturer_required
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse
-import uuid
 from django.conf import settings
 from google.generativeai import GenerativeModel
 import pathlib
 
+AI_EVALUATION_SECONDS = histogram(
+    "ai_evaluation_seconds", "Time spent grading submissions with AI providers", ["kind"]
+)
+OCR_SECONDS = histogram("ocr_seconds", "Time spent extracting text from images")
+
 
 @login_required
 @lecturer_required
@@ -50,18 +56,16 @@ def assignment_create_view(request, slug):
         # Handle evaluation_criteria file
         eval_file_path = request.POST.get(
             'evaluation_criteria_path', '').strip()
-        if eval_file_path:
-            eval_file_name = os.path.basename(eval_file_path)
-            evaluation_criteria = 'assignment/evaluation_files/' + eval_file_name
+        if is_blob_name(eval_file_path):
+            evaluation_criteria = eval_file_path
         else:
             evaluation_criteria = None
 
         # Handle additional_file
         additional_file_path = request.POST.get(
             'additional_file_path', '').strip()
-        if additional_file_path:
-            additional_file_name = os.path.basename(additional_file_path)
-            additional_file = 'assignment/additional_files/' + additional_file_name
+        if is_blob_name(additional_file_path):
+            additional_file = additional_file_path
         else:
             additional_file = None
 
@@ -77,7 +81,9 @@ def assignment_create_view(request, slug):
                 assignment.course = course
                 assignment.topic = topic
                 assignment.evaluation_criteria = evaluation_criteria
+                assignment.evaluation_criteria_name = uploaded_name(request, evaluation_criteria)
                 assignment.additional_file = additional_file
+                assignment.additional_file_name = uploaded_name(request, additional_file)
                 assignment.save()
                 messages.success(request, 'Assignment created successfully.')
                 return redirect(reverse('assignment_list', kwargs={'slug': slug}))
@@ -101,22 +107,17 @@ def assignment_update_view(request, slug, pk):
     assignment = get_object_or_404(Assignment, pk=pk, course=course)
     if request.method == 'POST':
         # Handle evaluation_criteria file
+        # The replaced files are released when the assignment is saved
         eval_file_path = request.POST.get('evaluation_criteria_path', '')
-        if eval_file_path:
-            # Delete old file
-            if assignment.evaluation_criteria:
-                assignment.evaluation_criteria.delete(save=False)
-            eval_file_name = os.path.basename(eval_file_path)
-            assignment.evaluation_criteria.name = 'assignment/evaluation_files/' + eval_file_name
+        if is_blob_name(eval_file_path):
+            assignment.evaluation_criteria.name = eval_file_path
+            assignment.evaluation_criteria_name = uploaded_name(request, eval_file_path)
 
         # Handle additional_file
         additional_file_path = request.POST.get('additional_file_path', '')
-        if additional_file_path:
-            # Delete old file
-            if assignment.additional_file:
-                assignment.additional_file.delete(save=False)
-            additional_file_name = os.path.basename(additional_file_path)
-            assignment.additional_file.name = 'assignment/additional_files/' + additional_file_name
+        if is_blob_name(additional_file_path):
+            assignment.additional_file.name = additional_file_path
+            assignment.additional_file_name = uploaded_name(request, additional_file_path)
 
         # add the evaluation_criteria and additional_file to the form
         form = AssignmentForm(request.POST, instance=assignment, initial={
@@ -136,6 +137,15 @@ def assignment_update_view(request, slug, pk):
     return render(request, 'assignment/assignment_form.html', {'form': form, 'course': course, 'object': assignment})
 
 
+def uploaded_name(request, file_path):
+    """The name ``file_path`` was uploaded as with ajax_upload_file in this session."""
+    names = request.session.get('uploaded_names', {})
+    if file_path in names:
+        request.session.modified = True
+        return names.pop(file_path)
+    return ''
+
+
 @login_required
 @require_POST
 def ajax_upload_file(request):
@@ -150,46 +160,30 @@ def ajax_upload_file(request):
     if upload.size > 15 * 1024 * 1024:
         return JsonResponse({'error': 'File size exceeds 15MB limit'}, status=400)
 
-    # Determine the upload directory based on field_name
-    if field_name == 'evaluation_criteria_path':
-        directory = 'evaluation_files'
-        upload_dir = os.path.join(
-            settings.MEDIA_ROOT, 'assignment', 'evaluation_files')
-    elif field_name == 'additional_file_path':
-        directory = 'additional_files'
-        upload_dir = os.path.join(
-            settings.MEDIA_ROOT, 'assignment', 'additional_files')
+    # Validate the file type based on field_name
+    if field_name in ('evaluation_criteria_path', 'additional_file_path'):
+        pass
     elif field_name == 'submission_files':
-        directory = 'submissions'
         # check file size (max 15MB) and file type (image, doc, txt) for assignment type not 'project'
         file_extension = os.path.splitext(upload.name)[1].lower()
         if assignment_type != 'project' and file_extension not in ['.png', '.jpg', '.jpeg', '.webp', '.heic', '.doc', '.docx', '.txt']:
             return JsonResponse({'error': 'Invalid file type'}, status=400)
         elif assignment_type == 'project' and file_extension not in ['.png', '.jpg', '.jpeg', '.webp', '.heic', '.doc', '.docx', '.txt', '.ppt', '.pptx', '.xls', '.xlsx', '.mp3', '.wav', '.flac', '.pdf', '.mp4', '.avi', '.mkv', '.wmv', '.3gp', '.f4v', '.psd', '.ai', '.xd']:
             return JsonResponse({'error': 'Invalid file type'}, status=400)
-        upload_dir = os.path.join(
-            settings.MEDIA_ROOT, 'assignment', 'submissions', 'files')
     else:
         return JsonResponse({'error': 'Invalid field name'}, status=400)
 
-    os.makedirs(upload_dir, exist_ok=True)
-
-    # Generate a unique filename
-    unique_filename = f"{uuid.uuid4().hex}_{upload.name}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    relative_file_path = os.path.relpath(file_path, settings.MEDIA_ROOT)
-
-    # Save the file
-    with open(file_path, 'wb+') as destination:
-        for chunk in upload.chunks():
-            destination.write(chunk)
-
-    # Generate file URL
-    file_url = f"{settings.MEDIA_URL}assignment/{directory}/{os.path.basename(upload_dir)}/{unique_filename}"
+    # Store the file once under its content hash; uploading the same file
+    # again returns the existing blob. It is referenced (and kept) once the
+    # assignment or submission using it is saved.
+    file_path = blob_storage.save(upload.name, upload)
+    # Blob names are digests: keep the name until the file is attached
+    request.session.setdefault('uploaded_names', {})[file_path] = upload.name
+    request.session.modified = True
 
     return JsonResponse({
-        'file_path': relative_file_path,
-        'file_url': file_url,
+        'file_path': file_path,
+        'file_url': blob_storage.url(file_path),
         'file_name': upload.name,
         'field_name': field_name,
     })
@@ -207,36 +201,27 @@ def ajax_delete_file(request):
 
     if not file_path:
         return JsonResponse({'error': 'No file path provided'}, status=400)
-    file_path = os.path.normpath(file_path)
-    full_path = os.path.join(settings.MEDIA_ROOT, file_path)
-    print("full path", full_path)
-    print("file path", file_path)
-    # Ensure the file is within the assignments directory
-    assignments_root = os.path.join(settings.MEDIA_ROOT, 'assignment')
-    print("assignments_root", assignments_root)
-    if not os.path.abspath(full_path).startswith(os.path.abspath(assignments_root)):
+    # Only blob store files can be deleted from here
+    if not is_blob_name(file_path):
         return JsonResponse({'error': 'Invalid file path'}, status=400)
+    if not blob_storage.exists(file_path):
+        return JsonResponse({'error': 'File not found'}, status=404)
 
-    # Delete the file
-    if os.path.exists(full_path):
-        os.remove(full_path)
-        # Delete the file from the database if it exists
-        if assignment:
-            try:
-                assignment_additional_file = assignment.additional_file
-                assignment.additional_file = None
-                assignment_additional_file.delete()
-            except Exception as e:
-                print("Error deleting file from database: ", e)
-        elif 'submission_files' in file_path:
-            submission_file = AssignmentSubmissionFile.objects.filter(
-                file=file_path).first()
-            if submission_file:
-                submission_file.delete()
-
-        return JsonResponse({'success': True})
+    # Drop the reference held by the database. The blob itself is deleted
+    # once nothing references it any more; files that were uploaded but
+    # never attached are cleaned up by the gc_blobs command.
+    if assignment:
+        if assignment.additional_file.name == file_path:
+            assignment.additional_file = None
+            assignment.additional_file_name = ''
+            assignment.save()
     else:
-        return JsonResponse({'error': 'File not found'}, status=404)
+        submission_file = AssignmentSubmissionFile.objects.filter(
+            file=file_path, submission__student=request.user).first()
+        if submission_file:
+            submission_file.delete()
+
+    return JsonResponse({'success': True})
 
 
 @login_required
@@ -299,11 +284,8 @@ def assignment_submission(request, slug, assignment_id):
                     # Delete previous submission if exists
                     if submission:
                         # Delete associated files
+                        # (physical files are released with the records)
                         for sub_file in submission.submission_files.all():
-                            if sub_file.file:
-                                # Delete physical file
-                                if os.path.exists(sub_file.file.path):
-                                    os.remove(sub_file.file.path)
                             sub_file.delete()
 
                         # Reset submission data
@@ -327,13 +309,14 @@ def assignment_submission(request, slug, assignment_id):
                     files_paths = request.POST.get(
                         'files_paths', '').split(',')
                     # Remove empty strings
-                    files_paths = [p for p in files_paths if p]
+                    files_paths = [p for p in files_paths if is_blob_name(p)]
 
                     # Create AssignmentSubmissionFile objects
                     for file_path in files_paths:
                         AssignmentSubmissionFile.objects.create(
                             submission=submission,
-                            file=file_path
+                            file=file_path,
+                            file_name=uploaded_name(request, file_path)
                         )
                     
                     # if type is project then save the submission text and redirect to result page
@@ -449,6 +432,7 @@ def assignment_submission(request, slug, assignment_id):
     return render(request, 'assignment/assignment_submission.html', context)
 
 
+@timed(AI_EVALUATION_SECONDS, kind="problem")
 def evaluate_problem_submission(image_files, evaluation_criteria):
     """Evaluate problem submission by passing images directly to Gemini"""
    
@@ -604,6 +588,7 @@ def evaluate_problem_submission(image_files, evaluation_criteria):
         return None, f'Error during AI evaluation: {str(e)}'
 
 
+@timed(AI_EVALUATION_SECONDS, kind="essay")
 def evaluate_essay_submission(text, evaluation_criteria):
     """Evaluate essay submission using extracted text"""
     if not os.environ.get('COHERE_API_KEY'):
@@ -641,6 +626,7 @@ Provide a score and detailed feedback in JSON format:
         return None, f'Error during AI evaluation: {str(e)}'
 
 
+@timed(OCR_SECONDS)
 def extract_text_from_image(image_file):
     """Extract text from an image using Google Cloud Vision API"""
     credentials_json = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON')
@@ -686,16 +672,8 @@ def assignment_back(request, slug, assignment_id):
         student=request.user, assignment_id=assignment_id).first()
     
     if assignment_submission:
-        # Get files before deleting submission
-        files = AssignmentSubmissionFile.objects.filter(submission=assignment_submission)
-        
-        # Delete physical files
-        for file in files:
-            if file.file:
-                if os.path.exists(file.file.path):
-                    os.remove(file.file.path)
-        
-        # Delete submission (this will cascade delete AssignmentSubmissionFile records)
+        # Delete submission (this will cascade delete AssignmentSubmissionFile
+        # records and release their files)
         assignment_submission.delete()
 
     # Clear only extracted text from session
@@ -871,29 +849,8 @@ def assignment_delete(request, slug, pk):
 
     try:
         with transaction.atomic():
-            # Delete all submission files
-            for submission in assignment.submissions.all():
-                for submission_file in submission.submission_files.all():
-                    try:
-                        # Delete physical file if it exists
-                        if submission_file.file and os.path.exists(submission_file.file.path):
-                            os.remove(submission_file.file.path)
-                    except OSError as e:
-                        print(f"Error deleting file {submission_file.file}: {e}")
-                    submission_file.delete()
-                submission.delete()
-
-            # Delete assignment files
-            try:
-                if assignment.evaluation_criteria and os.path.exists(assignment.evaluation_criteria.path):
-                    os.remove(assignment.evaluation_criteria.path)
-                if assignment.additional_file and os.path.exists(assignment.additional_file.path):
-                    os.remove(assignment.additional_file.path)
-            except OSError as e:
-                # Log error but continue with deletion
-                print(f"Error deleting assignment files: {e}")
-
-            # Delete the assignment
+            # Delete the assignment; submissions and their files cascade and
+            # the stored files are released once no longer referenced
             assignment.delete()
             messages.success(request, 'Assignment deleted successfully.')
 
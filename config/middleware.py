@@ -1,7 +1,18 @@
 # middleware.py
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 from django.utils import timezone
 import pytz
 
+from core.academic import AcademicContext
+from core.activity import batched_activity_log
+from core.metrics import counter, histogram
+from core.profiling import profile_queries, write_profile
+from core.traffic import record_request
+
+
 class TimezoneMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -18,4 +29,93 @@ class TimezoneMiddleware:
                         request.user.save()
                 except:
                     pass
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
+
+class ActivityLogMiddleware:
+    """Write all activity log entries of a request with a single query."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with batched_activity_log():
+            return self.get_response(request)
+
+
+class AcademicContextMiddleware:
+    """Attach a lazily loaded AcademicContext as ``request.academic``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.academic = AcademicContext(request)
+        return self.get_response(request)
+
+
+class TrafficMiddleware:
+    """Count requests per role and view in memory (see core.traffic)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if settings.TRAFFIC_ANALYTICS_ENABLED:
+            match = request.resolver_match
+            record_request(
+                request.academic.role or "anonymous",
+                match.view_name if match else "unresolved",
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Record query count, repeated queries, DB time and total time of every
+    request to PROFILING_LOG; summarize with `manage.py perf_report`.
+    Only installed when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with profile_queries() as profile:
+            response = self.get_response(request)
+        match = request.resolver_match
+        write_profile(
+            match.view_name if match else "unresolved",
+            request.method,
+            response.status_code,
+            time.perf_counter() - start,
+            profile,
+        )
+        return response
+
+
+REQUESTS = counter(
+    "http_requests_total", "HTTP requests by view, method and status", ["view", "method", "status"]
+)
+REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "Time spent handling requests by view", ["view"]
+)
+
+
+class MetricsMiddleware:
+    """Count requests and observe their latency per URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, view=view)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        return response
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 from decouple import config
 from django.utils.translation import gettext_lazy as _
 
@@ -77,6 +78,7 @@ PROJECT_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + PROJECT_APPS
 
 MIDDLEWARE = [
+    "config.middleware.ProfilingMiddleware",  # no-op unless PROFILING_ENABLED
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -87,6 +89,10 @@ MIDDLEWARE = [
     "django.middleware.locale.LocaleMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # whitenoise to serve static files
     'config.middleware.TimezoneMiddleware',
+    'config.middleware.ActivityLogMiddleware',
+    'config.middleware.AcademicContextMiddleware',
+    'config.middleware.TrafficMiddleware',
+    'config.middleware.MetricsMiddleware',
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -139,6 +145,18 @@ DATABASES = {
     # }
 }
 
+# Use a shared backend (e.g. Redis or Memcached) in production so that
+# cached values such as the current session/semester are invalidated in
+# every worker process.
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
+}
+
 # https://docs.djangoproject.com/en/stable/ref/settings/#std:setting-DEFAULT_AUTO_FIELD
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -209,6 +227,78 @@ STATICFILES_FINDERS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Chunked (resumable) uploads of course files and videos. Part files are
+# kept under MEDIA_ROOT so that finished uploads can be moved into place
+# with a rename instead of a copy.
+CHUNKED_UPLOAD_ROOT = os.path.join(MEDIA_ROOT, "chunked_uploads")
+CHUNKED_UPLOAD_CHUNK_SIZE = config(
+    "CHUNKED_UPLOAD_CHUNK_SIZE", default=8 * 1024 * 1024, cast=int
+)
+CHUNKED_UPLOAD_MAX_SIZE = config(
+    "CHUNKED_UPLOAD_MAX_SIZE", default=10 * 1024 * 1024 * 1024, cast=int
+)
+
+# Course files and videos are served through a view that checks course
+# membership. Set PROTECTED_MEDIA_SERVER to "nginx" (X-Accel-Redirect) or
+# "apache" (X-Sendfile) to hand the transfer off to the fronting proxy;
+# with nginx, PROTECTED_MEDIA_INTERNAL_URL must be an `internal` location
+# aliased to MEDIA_ROOT.
+PROTECTED_MEDIA_SERVER = config("PROTECTED_MEDIA_SERVER", default="")
+PROTECTED_MEDIA_INTERNAL_URL = config(
+    "PROTECTED_MEDIA_INTERNAL_URL", default="/protected-media/"
+)
+
+# Activity log entries are buffered per transaction/request and written
+# with one bulk insert. Disable to skip logging entirely, e.g. for imports.
+ACTIVITY_LOG_ENABLED = config("ACTIVITY_LOG_ENABLED", default=True, cast=bool)
+# Entries older than this are moved to monthly gzip files by
+# `manage.py archive_activity_log` (keep them out of MEDIA_ROOT).
+ACTIVITY_LOG_RETENTION_DAYS = config("ACTIVITY_LOG_RETENTION_DAYS", default=90, cast=int)
+ACTIVITY_LOG_ARCHIVE_ROOT = config(
+    "ACTIVITY_LOG_ARCHIVE_ROOT", default=os.path.join(BASE_DIR, "archive", "activity_log")
+)
+
+# Seconds the admin dashboard user counts are cached. Per-course metrics are
+# refreshed by `manage.py refresh_dashboard_metrics` (run it from cron); a
+# page view recomputes them only once they are older than
+# DASHBOARD_COURSE_METRICS_TTL, e.g. when the cron job stopped running.
+DASHBOARD_METRICS_TTL = config("DASHBOARD_METRICS_TTL", default=60, cast=int)
+DASHBOARD_COURSE_METRICS_TTL = config(
+    "DASHBOARD_COURSE_METRICS_TTL", default=6 * 60 * 60, cast=int
+)
+
+# Requests are counted per role, view and minute in each process and
+# written to TrafficBucket every TRAFFIC_FLUSH_INTERVAL seconds.
+TRAFFIC_ANALYTICS_ENABLED = config("TRAFFIC_ANALYTICS_ENABLED", default=True, cast=bool)
+TRAFFIC_FLUSH_INTERVAL = config("TRAFFIC_FLUSH_INTERVAL", default=30, cast=int)
+TRAFFIC_RETENTION_DAYS = config("TRAFFIC_RETENTION_DAYS", default=30, cast=int)
+
+# Opt-in request profiling: query counts, DB time and queries repeated at
+# least PROFILING_N_PLUS_ONE_THRESHOLD times (N+1 suspects) are appended to
+# PROFILING_LOG and summarized by `manage.py perf_report`.
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=False, cast=bool)
+PROFILING_LOG = config(
+    "PROFILING_LOG", default=os.path.join(BASE_DIR, "archive", "profiling.jsonl")
+)
+PROFILING_N_PLUS_ONE_THRESHOLD = config(
+    "PROFILING_N_PLUS_ONE_THRESHOLD", default=5, cast=int
+)
+
+# Counters and latency histograms (core.metrics) are written by every
+# process to METRICS_DIR and merged by the /metrics view. Empty the
+# directory on deploy. Scrapers authenticate with METRICS_TOKEN as a
+# bearer token; superusers can always read the page.
+METRICS_DIR = config(
+    "METRICS_DIR", default=os.path.join(tempfile.gettempdir(), "lms-metrics")
+)
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", default=10, cast=int)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+# Answers to timed quizzes are accepted for QUIZ_DEADLINE_GRACE seconds
+# after the deadline, for requests in flight. `manage.py expire_sittings`,
+# run every minute from cron, completes the sittings past their deadline.
+QUIZ_DEADLINE_GRACE = config("QUIZ_DEADLINE_GRACE", default=10, cast=int)
+
 # -----------------------------------
 # E-mail configuration
 
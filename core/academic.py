@@ -0,0 +1,212 @@
+import threading
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from .models import Semester, Session
+
+
+AcademicPeriod = namedtuple("AcademicPeriod", ["session", "semester"])
+
+GENERATION_KEY = "core:current_period:generation"
+PERIOD_KEY = "core:current_period:{}"
+
+# Per-process copy of the current period, valid as long as the generation
+# stored in the shared cache has not moved on.
+_local = {"generation": None, "period": None}
+_lock = threading.Lock()
+
+# on_commit hook of a transaction in this thread that changed a Session or
+# Semester; until it runs, the cached period may be out of date for us.
+_pending = threading.local()
+
+
+def _load_period():
+    session = Session.objects.filter(is_current_session=True).first()
+    semester = Semester.objects.filter(
+        is_current_semester=True, session=session
+    ).first()
+    return AcademicPeriod(session, semester)
+
+
+def _get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def get_current_period():
+    """
+    Return the current ``(session, semester)`` as an AcademicPeriod; either
+    may be None. The period is cached in this process and in the shared
+    cache, so a request normally costs one cache lookup and no queries.
+    Saving or deleting a Session or Semester bumps the generation counter,
+    which makes every process reload it.
+    """
+    if _changed_in_transaction():
+        return _load_period()
+
+    generation = _get_generation()
+    with _lock:
+        if _local["generation"] == generation:
+            return _local["period"]
+
+    key = PERIOD_KEY.format(generation)
+    period = cache.get(key)
+    if period is None:
+        period = _load_period()
+        cache.set(key, period, timeout=None)
+
+    with _lock:
+        _local["generation"] = generation
+        _local["period"] = period
+    return period
+
+
+def get_current_session():
+    return get_current_period().session
+
+
+def get_current_semester():
+    return get_current_period().semester
+
+
+def invalidate_current_period():
+    """
+    Drop the cached period everywhere. Called from the Session/Semester
+    signals; code that changes them with QuerySet.update() must call it too.
+    """
+    with _lock:
+        _local["generation"] = None
+        _local["period"] = None
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def _changed_in_transaction():
+    callback = getattr(_pending, "callback", None)
+    if callback is None:
+        return False
+    connection = transaction.get_connection()
+    return any(hook[1] is callback for hook in connection.run_on_commit)
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+@receiver(post_save, sender=Semester)
+@receiver(post_delete, sender=Semester)
+def current_period_changed(sender, **kwargs):
+    # Other processes must not reload the period before the change is
+    # committed, or they would cache the old one under the new generation.
+    if not transaction.get_connection().in_atomic_block:
+        invalidate_current_period()
+        return
+
+    def callback():
+        if getattr(_pending, "callback", None) is callback:
+            _pending.callback = None
+        invalidate_current_period()
+
+    _pending.callback = callback
+    transaction.on_commit(callback)
+
+
+# ########################################################
+# Request academic context
+# ########################################################
+
+
+class AcademicContext:
+    """
+    Academic data about ``request.user`` that many views need, attached as
+    ``request.academic`` by AcademicContextMiddleware. Every attribute is
+    loaded on first access and then kept for the rest of the request.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @property
+    def user(self):
+        return self.request.user
+
+    @cached_property
+    def role(self):
+        """
+        The main role of the user; "admin" for any superuser. A superuser
+        can also be a lecturer or student, so the attributes below check
+        those flags rather than the role.
+        """
+        user = self.user
+        if not user.is_authenticated:
+            return None
+        if user.is_superuser:
+            return "admin"
+        for role in ("lecturer", "student", "parent", "dep_head"):
+            if getattr(user, f"is_{role}"):
+                return role
+        return None
+
+    @cached_property
+    def student(self):
+        """The Student profile of the user, or None."""
+        from accounts.models import Student
+
+        if not (self.user.is_authenticated and self.user.is_student):
+            return None
+        return (
+            Student.objects.select_related("student", "program")
+            .filter(student=self.user)
+            .first()
+        )
+
+    def get_student_or_404(self):
+        if self.student is None:
+            raise Http404("No student profile.")
+        return self.student
+
+    @cached_property
+    def allocated_course_ids(self):
+        """Ids of the courses allocated to the user as a lecturer."""
+        from course.models import Course
+
+        if not (self.user.is_authenticated and self.user.is_lecturer):
+            return frozenset()
+        return frozenset(
+            Course.objects.filter(allocated_course__lecturer=self.user)
+            .values_list("id", flat=True)
+        )
+
+    @property
+    def allocated_course_query(self):
+        """
+        The ids of allocated_course_ids as a subquery. Filtering a queryset
+        with it keeps a single query, where the cached ids would cost a
+        separate lookup and an IN list.
+        """
+        from course.models import Course
+
+        if not (self.user.is_authenticated and self.user.is_lecturer):
+            return Course.objects.none().values("id")
+        return Course.objects.filter(allocated_course__lecturer=self.user).values("id")
+
+    @cached_property
+    def period(self):
+        return get_current_period()
+
+    @property
+    def current_session(self):
+        return self.period.session
+
+    @property
+    def current_semester(self):
+        return self.period.semester
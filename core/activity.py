@@ -0,0 +1,379 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+
+# Per-thread state of the ActivityLog sink:
+#   depth     nesting level of batched_activity_log() (one per request)
+#   buffer    committed entries waiting for the end of the batch
+#   callback  on_commit hook of the current transaction, holding its entries
+#   disabled  nesting level of activity_log_disabled()
+_state = threading.local()
+
+
+def _get_state():
+    if not hasattr(_state, "depth"):
+        _state.depth = 0
+        _state.buffer = []
+        _state.callback = None
+        _state.disabled = 0
+    return _state
+
+
+def is_activity_log_enabled():
+    return settings.ACTIVITY_LOG_ENABLED and not _get_state().disabled
+
+
+def log_activity(message):
+    """
+    Record an ActivityLog entry without writing it right away.
+
+    Inside a transaction the entry is held until the transaction commits
+    (and dropped if it rolls back), so that all entries of a transaction
+    are written together. Inside batched_activity_log(), which wraps every
+    request, committed entries are collected until the batch ends. Every
+    flush is a single bulk_create.
+    """
+    if not is_activity_log_enabled():
+        return
+
+    from core.models import ActivityLog
+
+    entry = ActivityLog(message=str(message))
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        _transaction_entries(connection).append(entry)
+    else:
+        _add_committed([entry])
+
+
+def _transaction_entries(connection):
+    state = _get_state()
+    callback = state.callback
+    # The hook is discarded by Django when its transaction (or savepoint)
+    # rolls back; start a new list in that case.
+    if callback is None or not any(
+        hook[1] is callback for hook in connection.run_on_commit
+    ):
+
+        def callback():
+            if state.callback is callback:
+                state.callback = None
+            _add_committed(callback.entries)
+
+        callback.entries = []
+        state.callback = callback
+        transaction.on_commit(callback)
+    return callback.entries
+
+
+def _add_committed(entries):
+    state = _get_state()
+    if state.depth:
+        state.buffer.extend(entries)
+    else:
+        write_activity_log(entries)
+
+
+def write_activity_log(entries):
+    from core.models import ActivityLog
+
+    if entries:
+        ActivityLog.objects.bulk_create(entries)
+
+
+@contextmanager
+def batched_activity_log():
+    """Collect committed entries and write them with one query on exit."""
+    state = _get_state()
+    state.depth += 1
+    try:
+        yield
+    finally:
+        state.depth -= 1
+        if not state.depth:
+            entries, state.buffer = state.buffer, []
+            write_activity_log(entries)
+
+
+@contextmanager
+def activity_log_disabled():
+    """Skip activity logging, e.g. while loading data in bulk."""
+    state = _get_state()
+    state.disabled += 1
+    try:
+        yield
+    finally:
+        state.disabled -= 1
+
+
+# ########################################################
+# Retention and archive
+# ########################################################
+
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVE_FILE_RE = re.compile(r"^activity_log-(\d{4})-(\d{2})\.jsonl\.gz$")
+
+
+def _archive_path(year, month):
+    return os.path.join(
+        settings.ACTIVITY_LOG_ARCHIVE_ROOT, f"activity_log-{year:04d}-{month:02d}.jsonl.gz"
+    )
+
+
+def _index_path(year, month):
+    return _archive_path(year, month) + ".idx"
+
+
+def _replace_file(path, write):
+    """Call ``write`` with a temporary file next to ``path``, then move it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            write(tmp)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _key(created_at, pk):
+    return [created_at.isoformat(), pk]
+
+
+def _archive_members(year, month):
+    """
+    The gzip members of a month's file with their byte range and first and
+    last ``[created_at, id]``, from its index. A file without a matching
+    index (archived before indexes existed, or interrupted between the file
+    and its index) is returned as one member without a key range.
+    """
+    path = _archive_path(year, month)
+    if not os.path.exists(path):
+        return []
+    size = os.path.getsize(path)
+    try:
+        with open(_index_path(year, month), encoding="utf-8") as f:
+            index = json.load(f)
+        if index["size"] == size:
+            return index["members"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return [{"offset": 0, "length": size, "first": None, "last": None}]
+
+
+def archive_activity_log(before):
+    """
+    Move entries created before ``before`` into monthly gzip JSONL files,
+    oldest first, and delete them from the table. Every batch is written
+    as its own gzip member and listed in the month's index, so pages can
+    be read without decompressing the whole month. Returns the number of
+    archived entries.
+    """
+    from core.models import ActivityLog
+
+    os.makedirs(settings.ACTIVITY_LOG_ARCHIVE_ROOT, exist_ok=True)
+    archived = 0
+    while True:
+        oldest = (
+            ActivityLog.objects.filter(created_at__lt=before)
+            .order_by("created_at", "pk")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        if oldest is None:
+            return archived
+        start = oldest.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        if start.month == 12:
+            end = start.replace(year=start.year + 1, month=1)
+        else:
+            end = start.replace(month=start.month + 1)
+        archived += _archive_month(
+            start.year,
+            start.month,
+            ActivityLog.objects.filter(created_at__gte=start, created_at__lt=min(end, before)),
+        )
+
+
+def _archive_month(year, month, queryset):
+    path = _archive_path(year, month)
+    members = _archive_members(year, month)
+    archived_ids = []
+
+    def write(tmp):
+        # The existing members are copied as they are, without decompressing
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, tmp)
+        last = None
+        while True:
+            rows = queryset.order_by("created_at", "pk")
+            if last:
+                rows = rows.filter(
+                    Q(created_at__gt=last[0]) | Q(created_at=last[0], pk__gt=last[1])
+                )
+            batch = list(rows.values("pk", "message", "created_at")[:ARCHIVE_BATCH_SIZE])
+            if not batch:
+                return
+            data = "".join(
+                json.dumps(
+                    {
+                        "id": row["pk"],
+                        "message": row["message"],
+                        "created_at": row["created_at"].isoformat(),
+                    }
+                )
+                + "\n"
+                for row in batch
+            )
+            offset = tmp.tell()
+            tmp.write(gzip.compress(data.encode("utf-8")))
+            members.append(
+                {
+                    "offset": offset,
+                    "length": tmp.tell() - offset,
+                    "first": _key(batch[0]["created_at"], batch[0]["pk"]),
+                    "last": _key(batch[-1]["created_at"], batch[-1]["pk"]),
+                }
+            )
+            archived_ids.extend(row["pk"] for row in batch)
+            last = (batch[-1]["created_at"], batch[-1]["pk"])
+
+    _replace_file(path, write)
+    index = json.dumps({"size": os.path.getsize(path), "members": members})
+    _replace_file(_index_path(year, month), lambda f: f.write(index.encode("utf-8")))
+
+    # Only delete once the rows are safely in place
+    for ids in _batches(archived_ids, ARCHIVE_BATCH_SIZE):
+        queryset.model.objects.filter(pk__in=ids).delete()
+    return len(archived_ids)
+
+
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _archive_months():
+    """(year, month) of every archive file, newest first."""
+    root = settings.ACTIVITY_LOG_ARCHIVE_ROOT
+    if not os.path.isdir(root):
+        return []
+    months = []
+    for filename in os.listdir(root):
+        match = ARCHIVE_FILE_RE.match(filename)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2))))
+    return sorted(months, reverse=True)
+
+
+def _read_member(year, month, member):
+    from core.models import ActivityLog
+
+    with open(_archive_path(year, month), "rb") as f:
+        f.seek(member["offset"])
+        lines = gzip.decompress(f.read(member["length"])).decode("utf-8").splitlines()
+    entries = []
+    for line in lines:
+        if line.strip():
+            data = json.loads(line)
+            entries.append(
+                ActivityLog(
+                    id=data["id"],
+                    message=data["message"],
+                    created_at=datetime.fromisoformat(data["created_at"]),
+                )
+            )
+    return entries
+
+
+def _position(key):
+    return datetime.fromisoformat(key[0]), key[1]
+
+
+def _read_archive(year, month, position, count):
+    """
+    The newest ``count`` entries of the month older than ``position``,
+    newest first. Members are read newest first and only while they can
+    still hold one of them.
+    """
+    members = _archive_members(year, month)
+    # Members without a key range could hold anything: read them first
+    members = [member for member in members if not member["last"]] + sorted(
+        (member for member in members if member["last"]),
+        key=lambda member: _position(member["last"]),
+        reverse=True,
+    )
+    entries = []
+    for member in members:
+        if member["last"] and len(entries) >= count:
+            if _position(member["last"]) < (entries[-1].created_at, entries[-1].pk):
+                break
+        if position and member["first"] and _position(member["first"]) >= position:
+            continue
+        entries.extend(
+            entry
+            for entry in _read_member(year, month, member)
+            if not position or (entry.created_at, entry.pk) < position
+        )
+        entries.sort(key=lambda entry: (entry.created_at, entry.pk), reverse=True)
+        del entries[count:]
+    return entries
+
+
+def encode_cursor(entry):
+    return f"{entry.created_at.isoformat()}_{entry.pk}"
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, id)`` or None for an invalid cursor."""
+    try:
+        created_at, pk = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def activity_log_page(before=None, limit=50):
+    """
+    Return ``(entries, next_cursor)`` with up to ``limit`` entries, newest
+    first, older than the ``before`` cursor. Entries still in the table are
+    read first and the monthly archive files after that, so callers page
+    through the whole history without knowing where it is stored.
+    ``next_cursor`` is None on the last page.
+    """
+    from core.models import ActivityLog
+
+    position = decode_cursor(before) if before else None
+    queryset = ActivityLog.objects.order_by("-created_at", "-pk")
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+    entries = list(queryset[: limit + 1])
+
+    if len(entries) <= limit:
+        if entries:
+            position = (entries[-1].created_at, entries[-1].pk)
+        for year, month in _archive_months():
+            if position and (year, month) > (position[0].year, position[0].month):
+                continue
+            entries += _read_archive(year, month, position, limit + 1 - len(entries))
+            if len(entries) > limit:
+                break
+
+    next_cursor = encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
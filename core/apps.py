@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        # Connect the current Session/Semester cache invalidation signals
+        from . import academic  # noqa: F401
@@ -0,0 +1,187 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from core.profiling import percentile, profile_queries
+
+
+class Scenario:
+    """One request, repeated by the benchmark, made as ``role``."""
+
+    def __init__(self, name, role, url, method="get", data=None):
+        self.name = name
+        self.role = role
+        self.url = url
+        self.method = method
+        self.data = data
+
+
+def build_scenarios():
+    """
+    Pick a lecturer, one of their courses with enrolled students in the
+    current semester, a student of that course and one of its quizzes from
+    the database (typically built by generate_bulk_data) and return the
+    users per role, the scenarios to time and the reason each scenario
+    that cannot run on this data is skipped.
+    """
+    from core.academic import get_current_semester
+    from course.models import CourseAllocation
+    from quiz.models import Quiz
+    from result.models import CourseStats, TakenCourse
+
+    semester = get_current_semester()
+    stats = (
+        CourseStats.objects.filter(
+            enrollments__gt=0,
+            course__allocated_course__isnull=False,
+            course__semester=semester.semester if semester else None,
+        )
+        .select_related("course")
+        .order_by("-enrollments")
+        .first()
+    )
+    if stats is None:
+        raise ValueError(
+            "No allocated course with enrollments in the current semester; "
+            "run generate_bulk_data first."
+        )
+    course = stats.course
+    lecturer = CourseAllocation.objects.filter(courses=course).first().lecturer
+    taken = TakenCourse.objects.filter(course=course).select_related("student__student")
+    student = taken.first().student.student
+    quiz = Quiz.objects.filter(course__taken_courses__student__student=student).first()
+
+    # Five fields per student: stay under DATA_UPLOAD_MAX_NUMBER_FIELDS
+    limit = settings.DATA_UPLOAD_MAX_NUMBER_FIELDS // 5 - 1
+    scores = {str(item.pk): ["5", "10", "5", "5", "30"] for item in taken[:limit]}
+
+    scenarios = [
+        Scenario(
+            "add_score_for POST",
+            "lecturer",
+            reverse("add_score_for", kwargs={"id": course.pk}),
+            method="post",
+            data=scores,
+        ),
+        Scenario("grade_result", "student", reverse("grade_results")),
+        Scenario("course_registration", "student", reverse("course_registration")),
+        Scenario("search", "student", reverse("query") + "?q=" + course.title.split()[0]),
+        Scenario("export_grades_csv", "lecturer", reverse("export_grades_csv", args=[course.slug])),
+        Scenario(
+            "export_grades_excel", "lecturer", reverse("export_grades_excel", args=[course.slug])
+        ),
+        Scenario("export_grades_pdf", "lecturer", reverse("export_grades_pdf", args=[course.slug])),
+    ]
+    skipped = {}
+    if quiz is not None:
+        scenarios.append(
+            Scenario(
+                "QuizTake",
+                "student",
+                reverse("quiz_take", kwargs={"pk": quiz.course_id, "slug": quiz.slug}),
+            )
+        )
+    else:
+        skipped["QuizTake"] = f"no quiz in the courses of {student.username}"
+    return {"lecturer": lecturer, "student": student}, scenarios, skipped
+
+
+def run_benchmarks(repeat=10, only=None, log=print):
+    """
+    Time every scenario ``repeat`` times after one warm-up request and
+    return a report with p50/p95 latency and query counts per scenario.
+    """
+    with override_settings(
+        ALLOWED_HOSTS=["testserver"],
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+        PROFILING_ENABLED=False,
+    ):
+        # LANGUAGE_CODE (en-us) is not one of LANGUAGES: reverse with a
+        # prefix the i18n patterns resolve
+        with translation.override(settings.MODELTRANSLATION_DEFAULT_LANGUAGE):
+            users, scenarios, skipped = build_scenarios()
+        clients = {}
+        for role, user in users.items():
+            clients[role] = Client()
+            clients[role].force_login(user)
+
+        skipped = {
+            name: reason for name, reason in skipped.items() if not only or name in only
+        }
+        for name, reason in skipped.items():
+            log(f"{name:>22}: skipped, {reason}")
+
+        results = {}
+        for scenario in scenarios:
+            if only and scenario.name not in only:
+                continue
+            client = clients[scenario.role]
+            request = getattr(client, scenario.method)
+            request(scenario.url, scenario.data)
+
+            timings, db_timings, queries, statuses = [], [], [], set()
+            for _ in range(repeat):
+                with profile_queries() as profile:
+                    start = time.perf_counter()
+                    response = request(scenario.url, scenario.data)
+                    timings.append((time.perf_counter() - start) * 1000)
+                db_timings.append(profile.duration * 1000)
+                queries.append(profile.count)
+                statuses.add(response.status_code)
+
+            results[scenario.name] = {
+                "url": scenario.url,
+                "status": sorted(statuses),
+                "p50_ms": round(percentile(timings, 50), 2),
+                "p95_ms": round(percentile(timings, 95), 2),
+                "mean_ms": round(statistics.mean(timings), 2),
+                "db_ms": round(statistics.mean(db_timings), 2),
+                "queries": round(statistics.mean(queries), 1),
+                "max_queries": max(queries),
+            }
+            log(
+                f"{scenario.name:>22}: p50 {results[scenario.name]['p50_ms']:8.1f} ms, "
+                f"p95 {results[scenario.name]['p95_ms']:8.1f} ms, "
+                f"{results[scenario.name]['queries']:7.1f} queries"
+            )
+
+    return {
+        "created_at": timezone.now().isoformat(),
+        "database": connection.vendor,
+        "dataset": _dataset_size(),
+        "repeat": repeat,
+        "scenarios": results,
+        "skipped": skipped,
+    }
+
+
+def _dataset_size():
+    from accounts.models import Student
+    from course.models import Course
+    from result.models import TakenCourse
+
+    return {
+        "students": Student.objects.count(),
+        "courses": Course.objects.count(),
+        "taken_courses": TakenCourse.objects.count(),
+    }
+
+
+def compare_reports(baseline, current):
+    """Lines describing the change of every scenario present in both reports."""
+    lines = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        lines.append(
+            f"{name:>22}: p95 {before['p95_ms']:8.1f} -> {result['p95_ms']:8.1f} ms, "
+            f"queries {before['queries']:7.1f} -> {result['queries']:7.1f}"
+        )
+    return lines
@@ -0,0 +1,139 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .traffic import traffic_by_role
+
+
+USER_METRICS_KEY = "core:dashboard:user_metrics"
+COURSE_METRICS_KEY = "core:dashboard:course_metrics"
+TRAFFIC_METRICS_KEY = "core:dashboard:traffic_metrics"
+LOCK_TIMEOUT = 60
+# How long a request waits for another worker filling a cold cache before
+# computing the value itself.
+COLD_WAIT = 2.0
+TOP_COURSES = 10
+
+
+def compute_user_metrics():
+    """User and student counts with one conditional aggregate."""
+    from accounts.models import User
+
+    return User.objects.aggregate(
+        student_count=Count("pk", filter=Q(is_student=True)),
+        lecturer_count=Count("pk", filter=Q(is_lecturer=True)),
+        superuser_count=Count("pk", filter=Q(is_superuser=True)),
+        males_count=Count("student", filter=Q(gender="M")),
+        females_count=Count("student", filter=Q(gender="F")),
+    )
+
+
+def compute_course_metrics():
+    """
+    Most enrolled courses with their average total (read from CourseStats),
+    plus resource totals. The counts scan the upload tables, so these are
+    refreshed by `manage.py refresh_dashboard_metrics` instead of on page
+    views.
+    """
+    from assignment.models import Assignment
+    from course.models import Upload, UploadVideo
+    from quiz.models import Quiz
+    from result.models import CourseStats
+
+    from .models import Blob
+
+    stats = (
+        CourseStats.objects.filter(enrollments__gt=0)
+        .select_related("course")
+        .order_by("-enrollments", "course__code")[:TOP_COURSES]
+    )
+    return {
+        "courses": [
+            {
+                "code": item.course.code,
+                "title": item.course.title,
+                "enrollments": item.enrollments,
+                "average_grade": float(item.average_total),
+            }
+            for item in stats
+        ],
+        "resources": {
+            "files": Upload.objects.count(),
+            "videos": UploadVideo.objects.count(),
+            "assignments": Assignment.objects.count(),
+            "quizzes": Quiz.objects.count(),
+            "storage_bytes": Blob.objects.aggregate(total=Sum("size"))["total"] or 0,
+        },
+        "updated_at": timezone.now(),
+    }
+
+
+def _store(key, value, ttl):
+    cache.set(key, {"value": value, "expires": time.time() + ttl}, timeout=None)
+
+
+def _get_or_refresh(key, compute, ttl):
+    """
+    Return the cached value of ``key``, recomputing it once ``ttl`` seconds
+    have passed. Only the worker that wins the lock recomputes; the others
+    keep serving the stale value meanwhile, so an expiry never sends every
+    request to the database at once.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry["expires"] > time.time():
+        return entry["value"]
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        try:
+            value = compute()
+            _store(key, value, ttl)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry["value"]
+
+    # Cold cache and another worker is computing it: give it a moment
+    deadline = time.time() + COLD_WAIT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["value"]
+    return compute()
+
+
+def get_user_metrics():
+    return _get_or_refresh(
+        USER_METRICS_KEY, compute_user_metrics, settings.DASHBOARD_METRICS_TTL
+    )
+
+
+def get_traffic_metrics():
+    def compute():
+        labels, series = traffic_by_role()
+        return {"labels": labels, "series": series}
+
+    return _get_or_refresh(TRAFFIC_METRICS_KEY, compute, settings.DASHBOARD_METRICS_TTL)
+
+
+def get_course_metrics():
+    # Normally kept up to date by refresh_dashboard_metrics(); the long TTL
+    # only matters when that stops running.
+    return _get_or_refresh(
+        COURSE_METRICS_KEY, compute_course_metrics, settings.DASHBOARD_COURSE_METRICS_TTL
+    )
+
+
+def refresh_dashboard_metrics():
+    """Recompute all dashboard metrics and store them in the cache."""
+    user_metrics = compute_user_metrics()
+    _store(USER_METRICS_KEY, user_metrics, settings.DASHBOARD_METRICS_TTL)
+    course_metrics = compute_course_metrics()
+    _store(COURSE_METRICS_KEY, course_metrics, settings.DASHBOARD_COURSE_METRICS_TTL)
+    return user_metrics, course_metrics
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.activity import archive_activity_log
+
+
+class Command(BaseCommand):
+    help = "Moves old activity log entries into compressed monthly archive files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ACTIVITY_LOG_RETENTION_DAYS,
+            help="Keep entries from the last DAYS days in the database "
+            "(default: ACTIVITY_LOG_RETENTION_DAYS).",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(days=options["days"])
+        count = archive_activity_log(cutoff)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {count} activity log entries older than {cutoff:%Y-%m-%d}."
+            )
+        )
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.activity import activity_log_disabled
+from core.models import ActivityLog
+from course.models import Program
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares per-signal ActivityLog inserts with the batched writer by "
+        "creating programs in one transaction. Created rows are removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=500,
+            help="Number of programs to create per run (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        for label, run in (
+            ("per-signal inserts", self.run_unbatched),
+            ("batched writer", self.run_batched),
+        ):
+            last_log = ActivityLog.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                program_ids = run(count)
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{label:>20}: {elapsed * 1000:8.1f} ms, {len(queries):5d} queries"
+            )
+            with activity_log_disabled():
+                Program.objects.filter(pk__in=program_ids).delete()
+                ActivityLog.objects.filter(pk__gt=last_log).delete()
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
+
+    def run_unbatched(self, count):
+        # What the signal handlers did before: one INSERT per event
+        ids = []
+        with activity_log_disabled(), transaction.atomic():
+            for i in range(count):
+                program = Program.objects.create(title=f"Benchmark program {i}")
+                ActivityLog.objects.create(
+                    message=f"The program '{program}' has been created."
+                )
+                ids.append(program.pk)
+        return ids
+
+    def run_batched(self, count):
+        ids = []
+        with transaction.atomic():
+            for i in range(count):
+                ids.append(Program.objects.create(title=f"Benchmark program {i}").pk)
+        return ids
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from core import traffic
+from core.models import TrafficBucket
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the per-request cost of the traffic counters against one "
+        "INSERT per request. Created rows are removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=10000,
+            help="Number of simulated requests (default: 10000).",
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        views = [f"view_{i}" for i in range(20)]
+        last_bucket = TrafficBucket.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+        traffic.flush_traffic()
+        with override_settings(TRAFFIC_FLUSH_INTERVAL=3600):
+            start = time.perf_counter()
+            for i in range(count):
+                traffic.record_request(traffic.ROLES[i % len(traffic.ROLES)], views[i % len(views)])
+            counting = time.perf_counter() - start
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            rows = traffic.flush_traffic()
+            flushing = time.perf_counter() - start
+        self.stdout.write(
+            f"   in-process counters: {counting / count * 1e6:8.2f} us/request, "
+            f"flush of {rows} buckets in {flushing * 1000:.1f} ms ({len(queries)} queries)"
+        )
+
+        sample = min(count, 1000)
+        start = time.perf_counter()
+        for i in range(sample):
+            TrafficBucket.objects.create(
+                minute=timezone.now(), role="student", view=views[i % len(views)], count=1
+            )
+        per_row = (time.perf_counter() - start) / sample
+        self.stdout.write(f"  one INSERT per request: {per_row * 1e6:8.2f} us/request")
+
+        TrafficBucket.objects.filter(pk__gt=last_bucket).delete()
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand, CommandError
+from core.academic import invalidate_current_period
 from core.models import Session, Semester
 from django.utils import timezone
 
@@ -57,6 +58,8 @@ class Command(BaseCommand):
         # If making this the current semester, unset any existing current semesters
         if make_current:
             Semester.objects.filter(is_current_semester=True).update(is_current_semester=False)
+            # update() does not send signals
+            invalidate_current_period()
             self.stdout.write(self.style.SUCCESS('Unset previous current semester.'))
 
         # Create the new semester
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand, CommandError
+from core.academic import invalidate_current_period
 from core.models import Session
 from django.utils import timezone
 
@@ -37,6 +38,8 @@ class Command(BaseCommand):
         # If making this the current session, unset any existing current sessions
         if make_current:
             Session.objects.filter(is_current_session=True).update(is_current_session=False)
+            # update() does not send signals
+            invalidate_current_period()
             self.stdout.write(self.style.SUCCESS('Unset previous current session.'))
 
         # Create the new session
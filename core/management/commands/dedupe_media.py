@@ -0,0 +1,60 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.storage import acquire_blob, blob_storage, is_blob_name, tracked_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves files saved before the blob store existed into it, so that "
+        "identical files are stored only once"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many files would be moved.",
+        )
+
+    def handle(self, *args, **options):
+        moved = 0
+        missing = 0
+        for model, fields in tracked_fields:
+            for field in fields:
+                legacy = (
+                    model.objects.exclude(**{field: ""})
+                    .exclude(**{f"{field}__isnull": True})
+                    .exclude(**{f"{field}__startswith": "blobs/"})
+                    .values_list(field, flat=True)
+                    .distinct()
+                )
+                for name in legacy.iterator():
+                    if is_blob_name(name):
+                        continue
+                    if not blob_storage.exists(name):
+                        missing += 1
+                        continue
+                    if options["dry_run"]:
+                        moved += 1
+                        continue
+                    self.move(model, field, name)
+                    moved += 1
+
+        verb = "Would move" if options["dry_run"] else "Moved"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {moved} file(s) into the blob store ({missing} missing).")
+        )
+
+    def move(self, model, field, name):
+        with blob_storage.open(name, "rb") as f:
+            new_name = blob_storage.save(name, f)
+        with transaction.atomic():
+            # Queryset update so the tracking signals do not release the
+            # legacy file before it is removed below.
+            count = model.objects.filter(**{field: name}).update(**{field: new_name})
+            acquire_blob(new_name, count)
+        if os.path.exists(blob_storage.path(name)):
+            blob_storage.delete(name)
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import Blob
+from core.storage import blob_storage, tracked_fields
+
+
+class Command(BaseCommand):
+    help = "Deletes blobs that are no longer referenced by any model"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=24,
+            help="Only delete unreferenced blobs older than this many hours, so that "
+            "files uploaded for a form that has not been submitted yet are kept (default: 24).",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Recompute every reference count from the tracked model fields first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            self.recount()
+
+        cutoff = timezone.now() - timezone.timedelta(hours=options["hours"])
+        count = 0
+        freed = 0
+        for blob in Blob.objects.filter(refcount=0, created_at__lt=cutoff).iterator():
+            blob_storage.delete(blob.name)
+            blob.delete()
+            count += 1
+            freed += blob.size
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {count} unreferenced blob(s), freed {freed} bytes.")
+        )
+
+    def recount(self):
+        counts = {}
+        for model, fields in tracked_fields:
+            for field in fields:
+                rows = (
+                    model.objects.exclude(**{field: ""})
+                    .exclude(**{f"{field}__isnull": True})
+                    .values(field)
+                    .annotate(n=Count("pk"))
+                )
+                for row in rows:
+                    counts[row[field]] = counts.get(row[field], 0) + row["n"]
+
+        updated = 0
+        for blob in Blob.objects.iterator():
+            refcount = counts.get(blob.name, 0)
+            if blob.refcount != refcount:
+                Blob.objects.filter(pk=blob.pk).update(refcount=refcount)
+                updated += 1
+        self.stdout.write(f"Corrected {updated} reference count(s).")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from scripts.generate_bulk_data import generate_bulk_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the database with a large deterministic dataset for benchmarks "
+        "(use a scratch database: it also changes the current session)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=20000)
+        parser.add_argument("--courses", type=int, default=2000)
+        parser.add_argument("--taken-courses", type=int, default=500000)
+        parser.add_argument("--quizzes", type=int, help="Default: one per 10 courses.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--prefix",
+            default="bench",
+            help="Prefix of generated usernames, slugs and codes (default: bench).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Data with prefix '{prefix}' already exists; use another --prefix "
+                "or a fresh database."
+            )
+        counts = generate_bulk_data(
+            students=options["students"],
+            courses=options["courses"],
+            taken_courses=options["taken_courses"],
+            quizzes=options["quizzes"],
+            seed=options["seed"],
+            prefix=prefix,
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+        )
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary}."))
@@ -0,0 +1,69 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.profiling import build_report, read_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Ranks views by latency, query count or DB time from the requests "
+        "recorded by ProfilingMiddleware, listing N+1 suspects per view"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--log",
+            default=settings.PROFILING_LOG,
+            help="Profiling log to read (default: PROFILING_LOG).",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=["total", "queries", "db"],
+            default="total",
+            help="Rank by p95 total time, maximum query count or average DB time.",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Number of views to show (default: 20)."
+        )
+        parser.add_argument(
+            "--json",
+            dest="json_path",
+            help="Also write the full report to this file, e.g. to compare runs.",
+        )
+        parser.add_argument(
+            "--clear", action="store_true", help="Empty the log after reporting."
+        )
+
+    def handle(self, *args, **options):
+        records = read_profiles(options["log"])
+        if not records:
+            self.stdout.write(self.style.WARNING("No profiled requests recorded."))
+            return
+
+        report = build_report(records, sort=options["sort"])
+        self.stdout.write(
+            f"{'view':<40} {'requests':>8} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'db ms':>8} {'queries':>8} {'max':>5}"
+        )
+        for row in report[: options["limit"]]:
+            self.stdout.write(
+                f"{row['view'][:40]:<40} {row['requests']:>8} {row['p50_ms']:>9.1f} "
+                f"{row['p95_ms']:>9.1f} {row['avg_db_ms']:>8.1f} "
+                f"{row['avg_queries']:>8.1f} {row['max_queries']:>5}"
+            )
+            for suspect in row["suspects"][:3]:
+                self.stdout.write(
+                    self.style.WARNING(f"    N+1 suspect x{suspect['count']}: {suspect['sql'][:120]}")
+                )
+
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        if options["clear"]:
+            os.remove(options["log"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Reported {len(report)} views from {len(records)} requests.")
+        )
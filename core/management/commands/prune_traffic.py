@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import TrafficBucket
+
+
+class Command(BaseCommand):
+    help = "Deletes traffic counters older than TRAFFIC_RETENTION_DAYS"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.TRAFFIC_RETENTION_DAYS,
+            help="Keep counters from the last DAYS days (default: TRAFFIC_RETENTION_DAYS).",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(days=options["days"])
+        count, _ = TrafficBucket.objects.filter(minute__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} traffic counters."))
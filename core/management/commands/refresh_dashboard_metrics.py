@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.dashboard import refresh_dashboard_metrics
+
+
+class Command(BaseCommand):
+    help = "Recomputes the admin dashboard metrics and stores them in the cache"
+
+    def handle(self, *args, **options):
+        user_metrics, course_metrics = refresh_dashboard_metrics()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed dashboard metrics: {user_metrics['student_count']} students, "
+                f"{len(course_metrics['courses'])} courses with enrollments."
+            )
+        )
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import compare_reports, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Times key views with the test client against the current database "
+        "(see generate_bulk_data) and writes p50/p95 latency and query counts "
+        "to a JSON file"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=10, help="Timed requests per scenario (default: 10)."
+        )
+        parser.add_argument(
+            "--output", default="benchmark.json", help="Report file (default: benchmark.json)."
+        )
+        parser.add_argument("--compare", help="Earlier report to compare against.")
+        parser.add_argument(
+            "--only", action="append", help="Run only this scenario (repeatable)."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmarks(
+                repeat=options["repeat"], only=options["only"], log=self.stdout.write
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as f:
+                baseline = json.load(f)
+            for line in compare_reports(baseline, report):
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
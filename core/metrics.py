@@ -0,0 +1,229 @@
+"""
+A small Prometheus-style metrics registry.
+
+Every process keeps its counters and histograms in memory and writes them
+to its own file in METRICS_DIR every METRICS_FLUSH_INTERVAL seconds. The
+/metrics view merges the files of all processes, so the exposition covers
+every worker; files of stopped processes keep counting towards the totals
+until METRICS_DIR is emptied (do that when deploying).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_registry = {}
+_last_flush = time.monotonic()
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # {label values: sample}
+        self.samples = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def describe(self):
+        return {"type": self.type, "help": self.documentation, "labels": self.labelnames}
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+        _maybe_flush()
+
+
+class Histogram(Metric):
+    """Observations counted in fixed cumulative buckets, plus sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def describe(self):
+        return {**super().describe(), "buckets": self.buckets}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            # [count per bucket..., count of +Inf, sum]
+            sample = self.samples.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[i] += 1
+            sample[-2] += 1
+            sample[-1] += value
+        _maybe_flush()
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+def _register(cls, name, *args, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.type}")
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+PDF_SECONDS = histogram(
+    "pdf_generation_seconds", "Time spent rendering PDF documents", ["document"]
+)
+
+
+def timed(metric, **labels):
+    """Decorator observing the duration of every call in ``metric``."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with metric.time(**labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ########################################################
+# Multiprocess files
+# ########################################################
+
+
+def _process_path():
+    return os.path.join(settings.METRICS_DIR, f"metrics_{os.getpid()}.json")
+
+
+def _maybe_flush():
+    global _last_flush
+
+    if time.monotonic() - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = time.monotonic()
+    try:
+        flush_metrics()
+    except OSError:
+        # Metrics must never break a request; retry on the next interval
+        pass
+
+
+def flush_metrics():
+    """Write this process' samples to its file in METRICS_DIR."""
+    with _lock:
+        data = {
+            name: {
+                **metric.describe(),
+                "samples": [[list(key), value] for key, value in metric.samples.items()],
+            }
+            for name, metric in _registry.items()
+        }
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = _process_path()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def collect():
+    """Merge the samples of every process: ``{name: description + samples}``."""
+    flush_metrics()
+    merged = {}
+    for filename in sorted(os.listdir(settings.METRICS_DIR)):
+        if not (filename.startswith("metrics_") and filename.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, filename), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, metric in data.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            if target["type"] != metric["type"]:
+                continue
+            for key, value in metric["samples"]:
+                key = tuple(key)
+                if metric["type"] == "counter":
+                    target["samples"][key] = target["samples"].get(key, 0) + value
+                else:
+                    current = target["samples"].get(key)
+                    target["samples"][key] = (
+                        [a + b for a, b in zip(current, value)] if current else value
+                    )
+    return merged
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def generate_latest():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, metric in sorted(collect().items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labels = metric["labels"]
+        for key, value in sorted(metric["samples"].items()):
+            if metric["type"] == "counter":
+                lines.append(f"{name}{_format_labels(labels, key)} {_format_value(value)}")
+                continue
+            for bound, count in zip(metric["buckets"], value):
+                le = ("le", _format_value(float(bound)))
+                lines.append(f"{name}_bucket{_format_labels(labels, key, le)} {count}")
+            lines.append(f'{name}_bucket{_format_labels(labels, key, ("le", "+Inf"))} {value[-2]}')
+            lines.append(f"{name}_count{_format_labels(labels, key)} {value[-2]}")
+            lines.append(f"{name}_sum{_format_labels(labels, key)} {_format_value(value[-1])}")
+    return "\n".join(lines) + "\n"
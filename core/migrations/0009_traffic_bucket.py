@@ -0,0 +1,23 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_activitylog_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrafficBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField(db_index=True)),
+                ('role', models.CharField(max_length=16)),
+                ('view', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -94,7 +94,40 @@ class Semester(models.Model):
 
 class ActivityLog(models.Model):
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now=True)
+    # Set once on insert; indexed for "latest activity" and for archiving
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"[{self.created_at}]{self.message}"
+
+
+class Blob(models.Model):
+    """
+    A file stored once under its sha256 digest by ContentAddressedStorage.
+    ``refcount`` is the number of model fields currently pointing at it;
+    the file is removed when the last reference is released.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class TrafficBucket(models.Model):
+    """
+    Number of requests of one role to one view during one minute, as
+    flushed by one process; readers sum rows sharing the same key.
+    """
+
+    minute = models.DateTimeField(db_index=True)
+    role = models.CharField(max_length=16)
+    view = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"[{self.minute}] {self.role} {self.view}: {self.count}"
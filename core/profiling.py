@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+_write_lock = threading.Lock()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Normalize ``sql`` so that queries differing only in their parameters
+    (literals, placeholders, length of IN lists) compare equal.
+    """
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+class QueryProfile:
+    """Queries run on every database connection while it is installed."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def n_plus_one_suspects(self, threshold=None):
+        """Fingerprints run at least ``threshold`` times, most repeated first."""
+        if threshold is None:
+            threshold = settings.PROFILING_N_PLUS_ONE_THRESHOLD
+        return [
+            (sql, count)
+            for sql, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+@contextmanager
+def profile_queries():
+    profile = QueryProfile()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+        yield profile
+
+
+def write_profile(view, method, status, total, profile):
+    """Append one request to the PROFILING_LOG JSON lines file."""
+    record = {
+        "time": time.time(),
+        "view": view,
+        "method": method,
+        "status": status,
+        "total_ms": round(total * 1000, 2),
+        "db_ms": round(profile.duration * 1000, 2),
+        "queries": profile.count,
+        "duplicates": profile.count - len(profile.fingerprints),
+        "suspects": [
+            {"sql": sql, "count": count} for sql, count in profile.n_plus_one_suspects()
+        ],
+    }
+    path = settings.PROFILING_LOG
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def read_profiles(path=None):
+    path = path or settings.PROFILING_LOG
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def build_report(records, sort="total"):
+    """
+    Aggregate request records per view, ranked by ``sort`` (``total``,
+    ``queries`` or ``db``), worst first.
+    """
+    views = {}
+    for record in records:
+        views.setdefault(record["view"], []).append(record)
+
+    report = []
+    for view, items in views.items():
+        suspects = Counter()
+        for item in items:
+            for suspect in item["suspects"]:
+                suspects[suspect["sql"]] = max(suspects[suspect["sql"]], suspect["count"])
+        totals = [item["total_ms"] for item in items]
+        report.append(
+            {
+                "view": view,
+                "requests": len(items),
+                "p50_ms": percentile(totals, 50),
+                "p95_ms": percentile(totals, 95),
+                "avg_db_ms": round(sum(item["db_ms"] for item in items) / len(items), 2),
+                "avg_queries": round(sum(item["queries"] for item in items) / len(items), 1),
+                "max_queries": max(item["queries"] for item in items),
+                "suspects": [
+                    {"sql": sql, "count": count} for sql, count in suspects.most_common()
+                ],
+            }
+        )
+
+    key = {"total": "p95_ms", "queries": "max_queries", "db": "avg_db_ms"}[sort]
+    report.sort(key=lambda row: row[key], reverse=True)
+    return report
@@ -0,0 +1,246 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+
+BLOB_PREFIX = "blobs"
+BLOB_NAME_RE = re.compile(
+    r"^%s/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[0-9a-z]+)?$" % BLOB_PREFIX
+)
+
+# (model, field names) registered with track_blob_fields
+tracked_fields = []
+
+
+def blob_name(digest, ext=""):
+    # Keep only what BLOB_NAME_RE allows, so ".PDF" or ".tar-gz" still give
+    # a name that is_blob_name recognises
+    ext = re.sub(r"[^0-9a-z]", "", ext.lower())
+    ext = f".{ext}" if ext else ""
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def is_blob_name(name):
+    return bool(name) and bool(BLOB_NAME_RE.match(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each distinct file once under ``blobs/<aa>/<bb>/<sha256><ext>``.
+    The digest is computed while the upload is streamed to a temporary file,
+    so identical uploads end up as the same name and only the first copy is
+    kept. Reference counts live in core.Blob and are maintained by
+    track_blob_fields; files are deleted by release_blob, never directly.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from the content in _save, so there is nothing
+        # to make unique here.
+        return name
+
+    def _save(self, name, content):
+        tmp_dir = self.path(os.path.join(BLOB_PREFIX, "tmp"))
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    tmp.write(chunk)
+                    hasher.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return self.adopt(tmp_path, hasher.hexdigest(), os.path.splitext(name)[1], size)
+
+    def adopt(self, path, digest, ext="", size=None):
+        """
+        Move an already hashed file at ``path`` (on the same filesystem) into
+        the store and return its blob name. If the blob exists, ``path`` is
+        discarded instead.
+        """
+        from core.models import Blob
+
+        name = blob_name(digest, ext)
+        full_path = self.path(name)
+        if size is None:
+            size = os.path.getsize(path)
+        with transaction.atomic():
+            # The row lock keeps a pending delete in release_blob from
+            # removing the file between the check below and the commit.
+            blob, created = Blob.objects.select_for_update().get_or_create(
+                name=name, defaults={"digest": digest, "size": size}
+            )
+            if not created:
+                # The caller is about to reference it again: restart the
+                # grace period of gc_blobs and keep it from release_blob.
+                Blob.objects.filter(pk=blob.pk).update(created_at=timezone.now())
+            if os.path.exists(full_path):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+                os.replace(path, full_path)
+        return name
+
+
+blob_storage = ContentAddressedStorage()
+
+
+# ########################################################
+# Reference counting
+# ########################################################
+
+
+def acquire_blob(name, count=1):
+    from core.models import Blob
+
+    Blob.objects.filter(name=name).update(refcount=F("refcount") + count)
+
+
+def release_blob(name, storage=blob_storage):
+    """
+    Drop one reference to ``name``. The file is deleted after the current
+    transaction commits if no reference is left. Files saved before the
+    blob store existed have no Blob row and are deleted right away, as
+    they were before.
+    """
+    from core.models import Blob
+
+    if not is_blob_name(name):
+        transaction.on_commit(lambda: storage.delete(name))
+        return
+
+    released_at = timezone.now()
+    Blob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F("refcount") - 1
+    )
+
+    def delete_if_unreferenced():
+        # A blob acquired or adopted again since the release is kept; the
+        # lock makes a concurrent acquire_blob or adopt wait for the delete.
+        with transaction.atomic():
+            blob = (
+                Blob.objects.select_for_update()
+                .filter(name=name, refcount=0, created_at__lte=released_at)
+                .first()
+            )
+            if blob is None:
+                return
+            blob.delete()
+            storage.delete(name)
+
+    transaction.on_commit(delete_if_unreferenced)
+
+
+def _field_name(instance, field):
+    value = instance.__dict__.get(field)
+    return getattr(value, "name", value) or None
+
+
+def track_blob_fields(model, *fields):
+    """
+    Keep Blob.refcount in sync with the file fields of ``model``: saving a
+    new file acquires a reference and releases the replaced one, deleting
+    the instance (including cascades) releases all of them.
+    """
+    tracked_fields.append((model, fields))
+    uid = f"track_blob_fields.{model._meta.label}"
+
+    def remember(sender, instance, **kwargs):
+        # Only fields that were loaded; deferred ones are left alone
+        instance._blob_names = {
+            field: _field_name(instance, field)
+            for field in fields
+            if field in instance.__dict__
+        }
+
+    def on_save(sender, instance, created, update_fields=None, **kwargs):
+        for field in instance._blob_names.keys() & set(
+            update_fields if update_fields is not None else fields
+        ):
+            old = None if created else instance._blob_names[field]
+            new = getattr(instance, field).name or None
+            if new == old:
+                continue
+            if new:
+                acquire_blob(new)
+            if old:
+                release_blob(old, getattr(instance, field).storage)
+            instance._blob_names[field] = new
+
+    def on_delete(sender, instance, **kwargs):
+        for field, name in instance._blob_names.items():
+            if name:
+                release_blob(name, getattr(instance, field).storage)
+
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(on_save, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=uid)
+
+
+# ########################################################
+# Original file names
+# ########################################################
+
+
+LEGACY_NAME_RE = re.compile(r"^[0-9a-f]{32}_(?P<name>.+)$")
+
+
+def legacy_name(path):
+    """
+    The uploaded name of a file stored before ``<field>_name`` existed:
+    its base name without the uuid prefix older uploads were given, or ""
+    for blobs, whose names say nothing about it.
+    """
+    if not path or is_blob_name(path):
+        return ""
+    name = os.path.basename(path)
+    match = LEGACY_NAME_RE.match(name)
+    return match.group("name") if match else name
+
+
+def original_name(field_file):
+    """The name ``field_file`` was uploaded as, for display and downloads."""
+    return (
+        getattr(field_file.instance, f"{field_file.field.name}_name", "")
+        or legacy_name(field_file.name)
+        or os.path.basename(field_file.name or "")
+    )
+
+
+class OriginalNameFieldFile(FieldFile):
+    """Records the name a new file is saved as in ``<field>_name``."""
+
+    def save(self, name, content, save=True):
+        name_field = self.instance._meta.get_field(f"{self.field.name}_name")
+        setattr(
+            self.instance,
+            name_field.attname,
+            os.path.basename(name)[: name_field.max_length],
+        )
+        super().save(name, content, save)
+
+
+def track_original_names(model, *fields):
+    """
+    Keep the uploaded name of each file in ``fields`` in ``<field>_name``,
+    as blob names are content digests. This covers files saved through the
+    field (forms, FieldFile.save); code that attaches a stored blob by name
+    sets ``<field>_name`` itself.
+    """
+    for field in fields:
+        model._meta.get_field(field).attr_class = OriginalNameFieldFile
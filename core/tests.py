@@ -1,3 +1,705 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.activity import (
+    activity_log_disabled,
+    activity_log_page,
+    archive_activity_log,
+    batched_activity_log,
+)
+from core.dashboard import (
+    COURSE_METRICS_KEY,
+    USER_METRICS_KEY,
+    _get_or_refresh,
+    compute_user_metrics,
+    get_course_metrics,
+)
+from core.academic import (
+    AcademicContext,
+    get_current_period,
+    invalidate_current_period,
+)
+from accounts.models import Student, User
+from core import activity, metrics, traffic
+from core.benchmarks import run_benchmarks
+from core.profiling import build_report, fingerprint, profile_queries, read_profiles
+from core.models import ActivityLog, Blob, Semester, Session, TrafficBucket
+from core.storage import blob_name, blob_storage, is_blob_name, original_name
+from core.utils import merge_duplicates
+from course.models import Course, CourseAllocation, Program, Topic, Upload
+from assignment.models import Assignment, AssignmentSubmission
+from payments.models import Invoice
+from quiz.models import MCQuestion, Quiz, Sitting
+from result.models import PASS, Result, TakenCourse
+from scripts.generate_bulk_data import generate_bulk_data
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BlobStorageTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        program = Program.objects.create(title="Science")
+        self.course = Course.objects.create(
+            program=program, title="Physics", code="PHY101", level="High School"
+        )
+        self.topic = Topic.objects.create(title="Motion", course=self.course, order=1)
+
+    def upload(self, title, content):
+        upload = Upload(title=title, course=self.course, topic=self.topic)
+        upload.file.save("notes.pdf", ContentFile(content))
+        return upload
+
+    def test_identical_files_are_stored_once(self):
+        first = self.upload("First", b"same content")
+        second = self.upload("Second", b"same content")
+        third = self.upload("Third", b"other content")
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.file.name, third.file.name)
+        self.assertEqual(Blob.objects.get(name=first.file.name).refcount, 2)
+
+    def test_blob_is_deleted_with_last_reference(self):
+        first = self.upload("First", b"same content")
+        second = self.upload("Second", b"same content")
+        name = first.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(blob_storage.exists(name))
+        self.assertEqual(Blob.objects.get(name=name).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+
+    def test_replacing_a_file_releases_the_old_blob(self):
+        upload = self.upload("Notes", b"version 1")
+        old_name = upload.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upload.file.save("notes.pdf", ContentFile(b"version 2"))
+        self.assertFalse(blob_storage.exists(old_name))
+        self.assertEqual(Blob.objects.get(name=upload.file.name).refcount, 1)
+
+    def test_blob_readopted_before_commit_is_kept(self):
+        upload = self.upload("Notes", b"same content")
+        name = upload.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upload.delete()
+            self.assertEqual(
+                blob_storage.save("copy.pdf", ContentFile(b"same content")), name
+            )
+        self.assertTrue(blob_storage.exists(name))
+        self.assertEqual(Blob.objects.get(name=name).refcount, 0)
+
+    def test_uploaded_names_are_kept(self):
+        upload = self.upload("Notes", b"same content")
+        self.assertEqual(upload.file_name, "notes.pdf")
+        self.assertEqual(original_name(upload.file), "notes.pdf")
+
+        legacy = Upload(file="course_files/%s_old notes.pdf" % ("a" * 32))
+        self.assertEqual(original_name(legacy.file), "old notes.pdf")
+
+    def test_extensions_are_normalised(self):
+        digest = "a" * 64
+        for ext, suffix in [(".PDF", ".pdf"), (".tar-gz", ".targz"), (".", "")]:
+            name = blob_name(digest, ext)
+            self.assertTrue(name.endswith(digest + suffix))
+            self.assertTrue(is_blob_name(name))
+
+
+class MergeDuplicatesTestCase(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(
+            program=Program.objects.create(title="Science"),
+            title="Physics",
+            code="PHY101",
+            level="High School",
+        )
+
+    def merge(self):
+        return merge_duplicates(
+            Topic, ["course", "title"], ["order"], lambda row: row["order"] > 0
+        )
+
+    def test_graded_row_is_kept(self):
+        graded = Topic.objects.create(course=self.course, title="Motion", order=2)
+        blank = Topic.objects.create(course=self.course, title="Motion", order=0)
+        Topic.objects.create(course=self.course, title="Heat", order=1)
+        self.assertEqual(self.merge(), {graded.pk: [blank.pk]})
+
+    def test_conflicting_grades_are_reported(self):
+        Topic.objects.create(course=self.course, title="Motion", order=1)
+        Topic.objects.create(course=self.course, title="Motion", order=2)
+        with self.assertRaisesMessage(RuntimeError, f"course={self.course.pk}, title=Motion"):
+            self.merge()
+
+
+class ActivityLogTestCase(TestCase):
+    def test_transaction_entries_are_written_with_one_query(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for i in range(3):
+                Program.objects.create(title=f"Program {i}")
+        self.assertFalse(ActivityLog.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+
+        with self.assertNumQueries(1):
+            callbacks[0]()
+        self.assertEqual(ActivityLog.objects.count(), 3)
+
+    def test_request_batch_is_written_on_exit(self):
+        with batched_activity_log():
+            for i in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Program.objects.create(title=f"Program {i}")
+            self.assertFalse(ActivityLog.objects.exists())
+        self.assertEqual(ActivityLog.objects.count(), 2)
+
+    def test_rolled_back_entries_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Program.objects.create(title="Discarded")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_disabled(self):
+        with activity_log_disabled(), self.captureOnCommitCallbacks(execute=True):
+            Program.objects.create(title="Quiet")
+        self.assertFalse(ActivityLog.objects.exists())
+
+        with override_settings(ACTIVITY_LOG_ENABLED=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                Program.objects.create(title="Quiet too")
+        self.assertFalse(ActivityLog.objects.exists())
+
+
+@override_settings(ACTIVITY_LOG_ARCHIVE_ROOT=os.path.join(MEDIA_ROOT, "archive"))
+class ActivityLogArchiveTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.ACTIVITY_LOG_ARCHIVE_ROOT, ignore_errors=True)
+        now = timezone.now()
+        entries = ActivityLog.objects.bulk_create(
+            ActivityLog(message=f"Entry {i}") for i in range(6)
+        )
+        # Spread the entries over the last six months, oldest first
+        for months_ago, entry in zip(range(5, -1, -1), entries):
+            ActivityLog.objects.filter(pk=entry.pk).update(
+                created_at=now - timezone.timedelta(days=31 * months_ago)
+            )
+
+    def test_archive_and_page_through_history(self):
+        cutoff = timezone.now() - timezone.timedelta(days=45)
+        self.assertEqual(archive_activity_log(cutoff), 4)
+        self.assertEqual(ActivityLog.objects.count(), 2)
+
+        messages = []
+        cursor = None
+        while True:
+            logs, cursor = activity_log_page(before=cursor, limit=4)
+            messages += [log.message for log in logs]
+            if not cursor:
+                break
+        self.assertEqual(messages, [f"Entry {i}" for i in range(5, -1, -1)])
+
+    def page_messages(self, limit):
+        logs, cursor = activity_log_page(limit=limit)
+        return [log.message for log in logs]
+
+    @mock.patch("core.activity.ARCHIVE_BATCH_SIZE", 2)
+    def test_page_reads_only_the_members_it_needs(self):
+        # Entry 5 and these make three members of two entries
+        ActivityLog.objects.bulk_create(ActivityLog(message=f"Recent {i}") for i in range(5))
+        archive_activity_log(timezone.now() + timezone.timedelta(days=1))
+        self.assertFalse(ActivityLog.objects.exists())
+
+        with mock.patch("core.activity._read_member", wraps=activity._read_member) as read:
+            self.assertEqual(self.page_messages(limit=1), ["Recent 4"])
+        self.assertEqual(read.call_count, 1)
+
+    def test_failed_archive_keeps_entries(self):
+        cutoff = timezone.now() - timezone.timedelta(days=45)
+        with mock.patch("core.activity.gzip.compress", side_effect=OSError):
+            with self.assertRaises(OSError):
+                archive_activity_log(cutoff)
+        self.assertEqual(ActivityLog.objects.count(), 6)
+        self.assertEqual(os.listdir(settings.ACTIVITY_LOG_ARCHIVE_ROOT), [])
+
+    def test_page_reads_archives_without_index(self):
+        ActivityLog.objects.all().delete()
+        os.makedirs(settings.ACTIVITY_LOG_ARCHIVE_ROOT)
+        path = os.path.join(settings.ACTIVITY_LOG_ARCHIVE_ROOT, "activity_log-2020-01.jsonl.gz")
+        # Two runs appended to the same file, as archives were written before
+        for pk in (1, 2):
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                created_at = f"2020-01-0{pk}T00:00:00+00:00"
+                f.write(json.dumps({"id": pk, "message": f"Old {pk}", "created_at": created_at}))
+                f.write("\n")
+
+        self.assertEqual(self.page_messages(limit=5), ["Old 2", "Old 1"])
+
+
+class CurrentPeriodTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(invalidate_current_period)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.session = Session.objects.create(session="2024/2025", is_current_session=True)
+            self.semester = Semester.objects.create(
+                semester="First", is_current_semester=True, session=self.session
+            )
+
+    def test_cached_after_first_lookup(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(get_current_period(), (self.session, self.semester))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_current_period(), (self.session, self.semester))
+
+    def test_invalidated_on_save(self):
+        get_current_period()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.semester.is_current_semester = False
+            self.semester.save()
+            # Uncommitted changes are read from the database in this thread
+            self.assertIsNone(get_current_period().semester)
+        self.assertIsNone(get_current_period().semester)
+
+
+class AcademicContextTestCase(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+
+    def test_student_is_loaded_once(self):
+        user = User.objects.create_user(username="student", password="password", is_student=True)
+        student = Student.objects.create(student=user)
+        self.request.user = user
+        academic = AcademicContext(self.request)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(academic.student, student)
+            self.assertEqual(academic.get_student_or_404(), student)
+        self.assertEqual(academic.role, "student")
+        self.assertEqual(academic.allocated_course_ids, frozenset())
+        with self.assertNumQueries(0):
+            self.assertFalse(Course.objects.filter(pk__in=academic.allocated_course_query))
+
+    def test_lecturer_allocated_course_ids(self):
+        user = User.objects.create_user(username="lecturer", password="password", is_lecturer=True)
+        course = Course.objects.create(
+            program=Program.objects.create(title="Science"),
+            title="Physics",
+            code="PHY101",
+            level="High School",
+        )
+        CourseAllocation.objects.create(lecturer=user).courses.add(course)
+        self.request.user = user
+        academic = AcademicContext(self.request)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(academic.allocated_course_ids, {course.id})
+            self.assertEqual(academic.allocated_course_ids, {course.id})
+        self.assertIsNone(academic.student)
+
+        # Filtering stays one query with the allocation lookup as a subquery
+        academic = AcademicContext(self.request)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(Course.objects.filter(pk__in=academic.allocated_course_query)), [course]
+            )
+
+    def test_superuser_lecturer_allocated_course_ids(self):
+        user = User.objects.create_superuser(
+            username="admin", password="password", is_lecturer=True
+        )
+        course = Course.objects.create(
+            program=Program.objects.create(title="Science"),
+            title="Physics",
+            code="PHY101",
+            level="High School",
+        )
+        CourseAllocation.objects.create(lecturer=user).courses.add(course)
+        self.request.user = user
+        academic = AcademicContext(self.request)
+
+        self.assertEqual(academic.role, "admin")
+        self.assertEqual(academic.allocated_course_ids, {course.id})
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    TRAFFIC_ANALYTICS_ENABLED=False,
+)
+class DashboardMetricsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.admin = User.objects.create_superuser(username="admin", password="password")
+        program = Program.objects.create(title="Science")
+        course = Course.objects.create(
+            program=program, title="Physics", code="PHY101", level="High School"
+        )
+        for i, gender in enumerate(["M", "M", "F"]):
+            user = User.objects.create_user(
+                username=f"student{i}", password="password", is_student=True, gender=gender
+            )
+            student = Student.objects.create(student=user)
+            TakenCourse.objects.create(student=student, course=course, final_exam=60 + i * 10)
+        User.objects.create_user(username="lecturer", password="password", is_lecturer=True)
+
+    def test_user_metrics_single_query(self):
+        with self.assertNumQueries(1):
+            metrics = compute_user_metrics()
+        self.assertEqual(
+            metrics,
+            {
+                "student_count": 3,
+                "lecturer_count": 1,
+                "superuser_count": 1,
+                "males_count": 2,
+                "females_count": 1,
+            },
+        )
+
+    def test_course_metrics(self):
+        [course] = get_course_metrics()["courses"]
+        self.assertEqual(course["enrollments"], 3)
+        self.assertEqual(course["average_grade"], 70.0)
+
+    def test_course_metrics_expire_without_refresh(self):
+        cache.set(COURSE_METRICS_KEY, {"value": "stale", "expires": 0}, timeout=None)
+        [course] = get_course_metrics()["courses"]
+        self.assertEqual(course["enrollments"], 3)
+
+    def test_dashboard_uses_cached_metrics(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse("dashboard"))
+        # session, user, activity log
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("dashboard"))
+        self.assertContains(response, "PHY101", status_code=200)
+
+    def test_stale_value_served_while_another_worker_refreshes(self):
+        cache.set(USER_METRICS_KEY, {"value": "stale", "expires": 0}, timeout=None)
+        cache.add(f"{USER_METRICS_KEY}:lock", 1)
+
+        def compute():
+            raise AssertionError("recomputed while locked")
+
+        self.assertEqual(_get_or_refresh(USER_METRICS_KEY, compute, 60), "stale")
+
+        cache.delete(f"{USER_METRICS_KEY}:lock")
+        self.assertEqual(_get_or_refresh(USER_METRICS_KEY, lambda: "fresh", 60), "fresh")
+        self.assertEqual(_get_or_refresh(USER_METRICS_KEY, compute, 60), "fresh")
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    TRAFFIC_FLUSH_INTERVAL=3600,
+)
+class TrafficAnalyticsTestCase(TestCase):
+    def setUp(self):
+        traffic.flush_traffic()
+        TrafficBucket.objects.all().delete()
+
+    def test_requests_are_buffered_and_flushed_in_bulk(self):
+        student = User.objects.create_user(
+            username="student", password="password", is_student=True
+        )
+        self.client.get(reverse("login"))
+        self.client.force_login(student)
+        self.client.get(reverse("home"))
+        self.client.get(reverse("home"))
+        self.client.force_login(
+            User.objects.create_user(username="head", password="password", is_dep_head=True)
+        )
+        self.client.get(reverse("home"))
+        self.assertFalse(TrafficBucket.objects.exists())
+
+        with self.assertNumQueries(1):
+            traffic.flush_traffic()
+        counts = {
+            (bucket.role, bucket.view): bucket.count
+            for bucket in TrafficBucket.objects.all()
+        }
+        self.assertEqual(
+            counts,
+            {("anonymous", "login"): 1, ("student", "home"): 2, ("dep_head", "home"): 1},
+        )
+
+        labels, series = traffic.traffic_by_role()
+        self.assertEqual(len(labels), 24)
+        self.assertEqual(series["student"][-1], 2)
+        self.assertEqual(series["dep_head"][-1], 1)
+        self.assertEqual(sum(series["lecturer"]), 0)
+
+    @override_settings(TRAFFIC_FLUSH_INTERVAL=0)
+    def test_flushes_after_interval(self):
+        self.client.get(reverse("home"))
+        self.assertEqual(TrafficBucket.objects.get().role, "anonymous")
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    PROFILING_ENABLED=True,
+    PROFILING_LOG=os.path.join(MEDIA_ROOT, "profiling.jsonl"),
+    PROFILING_N_PLUS_ONE_THRESHOLD=3,
+)
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        self.log = settings.PROFILING_LOG
+        self.addCleanup(lambda: os.path.exists(self.log) and os.remove(self.log))
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+
+    def test_repeated_queries_are_n_plus_one_suspects(self):
+        users = [
+            User.objects.create_user(username=f"user{i}", password="password")
+            for i in range(4)
+        ]
+        with profile_queries() as profile:
+            for user in users:
+                User.objects.get(pk=user.pk)
+            list(User.objects.all())
+        self.assertEqual(profile.count, 5)
+        [(sql, count)] = profile.n_plus_one_suspects()
+        self.assertEqual(count, 4)
+        self.assertIn("WHERE", sql)
+
+    def test_middleware_records_requests_for_report(self):
+        self.client.get(reverse("home"))
+        self.client.get(reverse("home"))
+        records = read_profiles()
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["view"], "home")
+
+        [row] = build_report(records)
+        self.assertEqual(row["requests"], 2)
+
+        report_path = os.path.join(MEDIA_ROOT, "perf_report.json")
+        call_command("perf_report", json_path=report_path, clear=True, stdout=StringIO())
+        with open(report_path) as f:
+            self.assertIn('"view": "home"', f.read())
+        self.assertFalse(os.path.exists(self.log))
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    METRICS_DIR=os.path.join(MEDIA_ROOT, "metrics"),
+    METRICS_FLUSH_INTERVAL=3600,
+    METRICS_TOKEN="secret",
+)
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, settings.METRICS_DIR, ignore_errors=True)
+
+    def test_histogram_and_counter_exposition(self):
+        jobs = metrics.counter("test_jobs_total", "Jobs", ["queue"])
+        latency = metrics.histogram("test_job_seconds", "Job latency", buckets=(0.1, 1))
+        jobs.inc(queue="mail")
+        jobs.inc(2, queue="mail")
+        latency.observe(0.05)
+        latency.observe(0.5)
+
+        # Another worker process
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        with open(os.path.join(settings.METRICS_DIR, "metrics_0.json"), "w") as f:
+            f.write(
+                '{"test_jobs_total": {"type": "counter", "help": "Jobs", '
+                '"labels": ["queue"], "samples": [[["mail"], 4]]}}'
+            )
+
+        text = metrics.generate_latest()
+        self.assertIn('test_jobs_total{queue="mail"} 7', text)
+        self.assertIn('test_job_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_job_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('test_job_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("test_job_seconds_count 2", text)
+
+    def test_metrics_view_requires_token(self):
+        self.client.get(reverse("home"))
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'http_requests_total{view="home",method="GET",status="200"}',
+            response.content.decode(),
+        )
+
+
+class BulkDataBenchmarkTestCase(TestCase):
+    def generate(self, prefix, seed=7, quizzes=2):
+        return generate_bulk_data(
+            students=12, courses=6, taken_courses=36, quizzes=quizzes, seed=seed,
+            prefix=prefix, log=lambda *args: None,
+        )
+
+    def test_generated_data_is_deterministic(self):
+        counts = self.generate("first")
+        self.assertEqual(counts["students"], 12)
+        self.assertEqual(counts["taken_courses"], 36)
+        self.assertEqual(TakenCourse.objects.count(), 36)
+        self.assertEqual(MCQuestion.objects.count(), counts["questions"])
+        first = list(
+            TakenCourse.objects.filter(student__student__username__startswith="first-")
+            .order_by("pk")
+            .values_list("total", "grade")
+        )
+
+        self.generate("second")
+        second = list(
+            TakenCourse.objects.filter(student__student__username__startswith="second-")
+            .order_by("pk")
+            .values_list("total", "grade")
+        )
+        self.assertEqual(first, second)
+
+    def test_benchmarks_run_against_generated_data(self):
+        self.generate("bench")
+        report = run_benchmarks(repeat=1, log=lambda *args: None)
+        self.assertIn("QuizTake", report["scenarios"])
+        for name, result in report["scenarios"].items():
+            self.assertTrue(all(status < 400 for status in result["status"]), name)
+            self.assertGreater(result["queries"], 0, name)
+
+    def test_benchmarks_report_skipped_scenarios(self):
+        self.generate("bench", quizzes=0)
+        report = run_benchmarks(repeat=1, log=lambda *args: None)
+        self.assertNotIn("QuizTake", report["scenarios"])
+        self.assertIn("QuizTake", report["skipped"])
+
+
+class QueryPlanTestCase(TestCase):
+    """The hot lookups must be served by an index, not a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_bulk_data(
+            students=40, courses=8, taken_courses=160, quizzes=4, prefix="plan",
+            log=lambda *args: None,
+        )
+        cls.taken = TakenCourse.objects.select_related("student", "course").first()
+        cls.user = cls.taken.student.student
+        cls.quiz = Quiz.objects.first()
+        topic = Topic.objects.create(title="Motion", course=cls.taken.course, order=1)
+        assignments = Assignment.objects.bulk_create(
+            Assignment(
+                course=cls.taken.course, topic=topic, title=f"Assignment {i}",
+                evaluation_criteria="criteria.pdf", deadline=timezone.now(),
+            )
+            for i in range(5)
+        )
+        students = User.objects.filter(is_student=True)
+        AssignmentSubmission.objects.bulk_create(
+            AssignmentSubmission(assignment=assignment, student=student)
+            for assignment in assignments
+            for student in students
+        )
+        Sitting.objects.bulk_create(
+            Sitting(
+                user=student, quiz=cls.quiz, course=cls.quiz.course, current_score=0,
+                question_order="",
+            )
+            for student in students
+        )
+        Invoice.objects.bulk_create(
+            Invoice(user=student, invoice_code=f"code-{student.pk}") for student in students
+        )
+        Result.objects.bulk_create(
+            Result(student=student, semester=semester, session="2024/2025", level=level)
+            for student in Student.objects.all()
+            for semester in (settings.FIRST, settings.SECOND)
+            for level in (settings.MIDDLE_SCHOOL, settings.HIGH_SCHOOL)
+        )
+        ActivityLog.objects.bulk_create(ActivityLog(message=f"Entry {i}") for i in range(50))
+
+    def assertUsesIndex(self, queryset):
+        table = queryset.model._meta.db_table
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+            self.assertNotIn(f"Seq Scan on {table}", plan, plan)
+        elif connection.vendor == "sqlite":
+            plan = queryset.explain()
+            # "SCAN <table>" without "USING ... INDEX" reads every row
+            self.assertIsNone(
+                re.search(rf"\bSCAN {table}\s*$", plan, re.MULTILINE), plan
+            )
+        else:
+            self.skipTest(f"No plan check for {connection.vendor}")
+
+    def test_taken_course_lookups(self):
+        self.assertUsesIndex(
+            TakenCourse.objects.filter(student=self.taken.student, course=self.taken.course)
+        )
+        self.assertUsesIndex(
+            TakenCourse.objects.filter(course=self.taken.course, comment=PASS)
+        )
+
+    def test_sitting_lookup(self):
+        self.assertUsesIndex(
+            Sitting.objects.filter(
+                user=self.user, quiz=self.quiz, course=self.quiz.course, complete=False
+            )
+        )
+
+    def test_assignment_submission_lookup(self):
+        self.assertUsesIndex(
+            AssignmentSubmission.objects.filter(
+                assignment=Assignment.objects.first(), student=self.user
+            )
+        )
+
+    def test_invoice_lookup(self):
+        self.assertUsesIndex(Invoice.objects.filter(invoice_code=f"code-{self.user.pk}"))
+
+    def test_result_lookup(self):
+        self.assertUsesIndex(
+            Result.objects.filter(
+                student=self.taken.student,
+                semester=settings.FIRST,
+                session="2024/2025",
+                level=settings.HIGH_SCHOOL,
+            )
+        )
+
+    def test_activity_log_lookups(self):
+        before = timezone.now()
+        self.assertUsesIndex(ActivityLog.objects.filter(created_at__lt=before))
+        self.assertUsesIndex(
+            ActivityLog.objects.order_by("-created_at", "-pk").filter(created_at__lt=before)[:20]
+        )
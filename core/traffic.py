@@ -0,0 +1,97 @@
+import atexit
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+# AcademicContext.role values, and "anonymous" for everyone without one
+ROLES = ("admin", "lecturer", "student", "parent", "dep_head", "anonymous")
+
+# Request counts of this process keyed by (minute, role, view), written to
+# TrafficBucket by flush_traffic() and once more when the process exits.
+_counts = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record_request(role, view):
+    """
+    Count a request in memory; every TRAFFIC_FLUSH_INTERVAL seconds the
+    request that notices it writes the buffer out.
+    """
+    global _last_flush
+
+    minute = int(time.time()) // 60
+    with _lock:
+        _counts[(minute, role, view)] += 1
+        due = time.monotonic() - _last_flush >= settings.TRAFFIC_FLUSH_INTERVAL
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush_traffic()
+
+
+def flush_traffic():
+    """Write the buffered counts with one bulk insert; returns the row count."""
+    from .models import TrafficBucket
+
+    global _counts
+    with _lock:
+        counts, _counts = _counts, Counter()
+    if not counts:
+        return 0
+
+    buckets = [
+        TrafficBucket(
+            minute=datetime.fromtimestamp(minute * 60, tz=dt_timezone.utc),
+            role=role,
+            view=view[:100],
+            count=count,
+        )
+        for (minute, role, view), count in counts.items()
+    ]
+    try:
+        TrafficBucket.objects.bulk_create(buckets)
+    except DatabaseError:
+        # Analytics must never break a request; put the counts back
+        with _lock:
+            _counts.update(counts)
+        return 0
+    return len(buckets)
+
+
+atexit.register(flush_traffic)
+
+
+def traffic_by_role(hours=24):
+    """
+    Requests per hour and role over the last ``hours`` hours, as
+    ``(labels, {role: [count per hour]})`` ready for a chart.
+    """
+    from .models import TrafficBucket
+
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    start = now - timedelta(hours=hours - 1)
+    hours_list = [start + timedelta(hours=i) for i in range(hours)]
+    series = {role: [0] * hours for role in ROLES}
+    rows = (
+        TrafficBucket.objects.filter(minute__gte=start)
+        .annotate(hour=TruncHour("minute"))
+        .values("hour", "role")
+        .annotate(total=Sum("count"))
+        .order_by()
+    )
+    index = {hour: i for i, hour in enumerate(hours_list)}
+    for row in rows:
+        i = index.get(row["hour"])
+        if i is not None and row["role"] in series:
+            series[row["role"]][i] += row["total"]
+    labels = [timezone.localtime(hour).strftime("%H:%M") for hour in hours_list]
+    return labels, series
@@ -14,6 +14,7 @@ from .views import (
     semester_update_view,
     semester_delete_view,
     dashboard_view,
+    activity_log_view,
     # Add new view functions
     news_view,
     news_detail_view,
@@ -39,6 +40,7 @@ urlpatterns = [
     path("semester/<int:pk>/edit/", semester_update_view, name="edit_semester"),
     path("semester/<int:pk>/delete/", semester_delete_view, name="delete_semester"),
     path("dashboard/", dashboard_view, name="dashboard"),
+    path("dashboard/activity/", activity_log_view, name="activity_log"),
     
     # New URL patterns
     path("news/", news_view, name="news"),
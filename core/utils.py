@@ -55,3 +55,48 @@ def unique_slug_generator(instance, new_slug=None):
         new_slug = f"{slug}-{random_string_generator(size=4)}"
         return unique_slug_generator(instance, new_slug=new_slug)
     return slug
+
+
+def merge_duplicates(model, key_fields, value_fields, is_graded, latest=("pk",)):
+    """
+    Plan the merge of the rows of ``model`` that share ``key_fields``, for
+    data migrations that add a unique constraint. Each group keeps its
+    graded row (``is_graded(values)``), or the latest by ``latest`` when
+    none is, and returns ``{kept pk: [duplicate pks]}``; the caller moves
+    any child rows and deletes the duplicates.
+
+    Groups whose graded rows disagree on ``value_fields`` cannot be merged
+    without losing a grade. Nothing is changed then: RuntimeError lists
+    their keys so that an admin can resolve them and migrate again.
+    """
+    from django.db.models import Count
+
+    groups = (
+        model.objects.values(*key_fields)
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    merges, conflicts = {}, []
+    for group in groups:
+        del group["count"]
+        rows = list(
+            model.objects.filter(**group).order_by(*latest).values("pk", *value_fields)
+        )
+        graded = [row for row in rows if is_graded(row)]
+        if len({tuple(row[field] for field in value_fields) for row in graded}) > 1:
+            conflicts.append(group)
+            continue
+        kept = (graded or rows)[-1]["pk"]
+        merges[kept] = [row["pk"] for row in rows if row["pk"] != kept]
+
+    if conflicts:
+        keys = "; ".join(
+            ", ".join(f"{field}={value}" for field, value in group.items())
+            for group in conflicts
+        )
+        raise RuntimeError(
+            f"{model._meta.label} has duplicate rows with different grades "
+            f"for {keys}. Keep one row of each and run migrate again."
+        )
+    return merges
@@ -1,9 +1,15 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.crypto import constant_time_compare
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 
 from accounts.decorators import admin_required, lecturer_required
-from accounts.models import User, Student
+from .activity import activity_log_page
+from .dashboard import get_course_metrics, get_traffic_metrics, get_user_metrics
+from .metrics import generate_latest
 from .forms import SessionForm, SemesterForm, NewsAndEventsForm
 from .models import NewsAndEvents, ActivityLog, Session, Semester
 
@@ -35,18 +41,42 @@ def home_view(request):
 @admin_required
 def dashboard_view(request):
     logs = ActivityLog.objects.all().order_by("-created_at")[:10]
-    gender_count = Student.get_gender_count()
+    course_metrics = get_course_metrics()
     context = {
-        "student_count": User.objects.get_student_count(),
-        "lecturer_count": User.objects.get_lecturer_count(),
-        "superuser_count": User.objects.get_superuser_count(),
-        "males_count": gender_count["M"],
-        "females_count": gender_count["F"],
+        **get_user_metrics(),
+        "course_metrics": course_metrics,
+        "resources": course_metrics["resources"],
+        "traffic": get_traffic_metrics(),
         "logs": logs,
     }
     return render(request, "core/dashboard.html", context)
 
 
+@login_required
+@admin_required
+def activity_log_view(request):
+    logs, next_cursor = activity_log_page(before=request.GET.get("before"))
+    context = {
+        "title": "Activity Log",
+        "logs": logs,
+        "next_cursor": next_cursor,
+    }
+    return render(request, "core/activity_log.html", context)
+
+
+def metrics_view(request):
+    """Prometheus exposition of core.metrics for every worker process."""
+    authorization = request.headers.get("Authorization", "")
+    token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else ""
+    if not request.user.is_superuser and not (
+        settings.METRICS_TOKEN and constant_time_compare(token, settings.METRICS_TOKEN)
+    ):
+        raise PermissionDenied
+    return HttpResponse(
+        generate_latest(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @login_required
 def post_add(request):
     if request.method == "POST":
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from course.models import ChunkedUpload
+
+
+class Command(BaseCommand):
+    help = "Deletes chunked uploads (and their part files) that have not received data recently"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=48,
+            help="Delete uploads that have been idle for more than this many hours (default: 48).",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(hours=options["hours"])
+        stale = ChunkedUpload.objects.filter(updated_at__lt=cutoff)
+
+        count = 0
+        for upload in stale.iterator():
+            upload.delete()
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} stale chunked upload(s)."))
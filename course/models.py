@@ -1,13 +1,19 @@
+import os
+import uuid
+
 from django.conf import settings
 from django.core.validators import FileExtensionValidator, MinValueValidator, ValidationError
 from django.db import models
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.db.models.signals import pre_save, post_delete, post_save
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
-from core.models import ActivityLog, Semester
+from core.activity import log_activity
+from core.academic import get_current_semester
+from core.models import Semester
+from core.storage import blob_storage, track_blob_fields, track_original_names
 from core.utils import unique_slug_generator
 
 
@@ -36,15 +42,29 @@ class Program(models.Model):
 @receiver(post_save, sender=Program)
 def log_program_save(sender, instance, created, **kwargs):
     verb = "created" if created else "updated"
-    ActivityLog.objects.create(message=_(f"The program '{instance}' has been {verb}."))
+    log_activity(_(f"The program '{instance}' has been {verb}."))
 
 
 @receiver(post_delete, sender=Program)
 def log_program_delete(sender, instance, **kwargs):
-    ActivityLog.objects.create(message=_(f"The program '{instance}' has been deleted."))
+    log_activity(_(f"The program '{instance}' has been deleted."))
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_current_semester_flag(self):
+        """
+        Annotate ``current_semester_flag`` with one subquery, so that
+        ``Course.is_current_semester`` costs nothing per row in listings.
+        """
+        current = Semester.objects.filter(
+            is_current_semester=True,
+            session__is_current_session=True,
+            semester=OuterRef("semester"),
+        )
+        return self.annotate(current_semester_flag=Exists(current))
 
 
-class CourseManager(models.Manager):
+class CourseManager(models.Manager.from_queryset(CourseQuerySet)):
     def search(self, query=None):
         queryset = self.get_queryset()
         if query:
@@ -80,8 +100,10 @@ class Course(models.Model):
 
     @property
     def is_current_semester(self):
-
-        current_semester = Semester.objects.filter(is_current_semester=True).first()
+        # Prefer the annotation from with_current_semester_flag()
+        if hasattr(self, "current_semester_flag"):
+            return self.current_semester_flag
+        current_semester = get_current_semester()
         return self.semester == current_semester.semester if current_semester else False
 
 
@@ -94,12 +116,12 @@ def course_pre_save_receiver(sender, instance, **kwargs):
 @receiver(post_save, sender=Course)
 def log_course_save(sender, instance, created, **kwargs):
     verb = "created" if created else "updated"
-    ActivityLog.objects.create(message=_(f"The course '{instance}' has been {verb}."))
+    log_activity(_(f"The course '{instance}' has been {verb}."))
 
 
 @receiver(post_delete, sender=Course)
 def log_course_delete(sender, instance, **kwargs):
-    ActivityLog.objects.create(message=_(f"The course '{instance}' has been deleted."))
+    log_activity(_(f"The course '{instance}' has been deleted."))
 
 
 class CourseAllocation(models.Model):
@@ -170,6 +192,7 @@ class Upload(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='files')
     file = models.FileField(
         upload_to="course_files/",
+        storage=blob_storage,
         help_text=_(
             "Valid Files: pdf, docx, doc, xls, xlsx, ppt, pptx, zip, rar, 7zip"
         ),
@@ -190,6 +213,8 @@ class Upload(models.Model):
             )
         ],
     )
+    # Name the file was uploaded as; the stored name is its content digest
+    file_name = models.CharField(max_length=255, blank=True)
     updated_date = models.DateTimeField(auto_now=True)
     upload_time = models.DateTimeField(auto_now_add=True)
 
@@ -210,9 +235,9 @@ class Upload(models.Model):
             return "archive"
         return "file"
 
-    def delete(self, *args, **kwargs):
-        self.file.delete(save=False)
-        super().delete(*args, **kwargs)
+
+track_blob_fields(Upload, "file")
+track_original_names(Upload, "file")
 
 
 @receiver(post_save, sender=Upload)
@@ -225,13 +250,13 @@ def log_upload_save(sender, instance, created, **kwargs):
         message = _(
             f"The file '{instance.title}' of the course '{instance.course}' has been updated."
         )
-    ActivityLog.objects.create(message=message)
+    log_activity(message)
 
 
 @receiver(post_delete, sender=Upload)
 def log_upload_delete(sender, instance, **kwargs):
-    ActivityLog.objects.create(
-        message=_(
+    log_activity(
+        _(
             f"The file '{instance.title}' of the course '{instance.course}' has been deleted."
         )
     )
@@ -251,6 +276,7 @@ class UploadVideo(models.Model):
     )
     video = models.FileField(
         upload_to="course_videos/",
+        storage=blob_storage,
         blank=True,
         null=True,
         help_text=_("Valid video formats: mp4, mkv, wmv, 3gp, f4v, avi, mp3"),
@@ -258,6 +284,7 @@ class UploadVideo(models.Model):
             FileExtensionValidator(["mp4", "mkv", "wmv", "3gp", "f4v", "avi", "mp3"])
         ],
     )
+    video_name = models.CharField(max_length=255, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def clean(self):
@@ -266,10 +293,9 @@ class UploadVideo(models.Model):
         if self.video and self.video_url:
             raise ValidationError(_("Please provide either a video file or YouTube URL, not both"))
 
-    def delete(self, *args, **kwargs):
-        if self.video:
-            self.video.delete(save=False)
-        super().delete(*args, **kwargs)
+
+track_blob_fields(UploadVideo, "video")
+track_original_names(UploadVideo, "video")
 
 
 @receiver(pre_save, sender=UploadVideo)
@@ -288,18 +314,67 @@ def log_uploadvideo_save(sender, instance, created, **kwargs):
         message = _(
             f"The video '{instance.title}' of the course '{instance.course}' has been updated."
         )
-    ActivityLog.objects.create(message=message)
+    log_activity(message)
 
 
 @receiver(post_delete, sender=UploadVideo)
 def log_uploadvideo_delete(sender, instance, **kwargs):
-    ActivityLog.objects.create(
-        message=_(
+    log_activity(
+        _(
             f"The video '{instance.title}' of the course '{instance.course}' has been deleted."
         )
     )
 
 
+class ChunkedUpload(models.Model):
+    """
+    A resumable upload of a course file or video. Chunks are appended to
+    a part file under CHUNKED_UPLOAD_ROOT until ``offset`` reaches ``size``,
+    then the part file is moved into place and attached to an Upload or
+    UploadVideo.
+    """
+
+    FILE = "file"
+    VIDEO = "video"
+
+    KIND_CHOICES = (
+        (FILE, _("File")),
+        (VIDEO, _("Video")),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="chunked_uploads",
+    )
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_ROOT, f"{self.pk.hex}.part")
+
+    @property
+    def is_complete(self):
+        return self.offset >= self.size
+
+    def delete(self, *args, **kwargs):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        super().delete(*args, **kwargs)
+
+
 class CourseOffer(models.Model):
     """NOTE: Only department head can offer semester courses"""
 
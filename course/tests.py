@@ -1,3 +1,244 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Student, User
+from core.academic import invalidate_current_period
+from core.models import Semester, Session
+from course.models import ChunkedUpload, Course, CourseAllocation, Program, Topic, Upload
+from course.utils import ChunkError, append_chunk
+from course.views import serve_public_media
+from result.models import TakenCourse
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    MEDIA_ROOT=MEDIA_ROOT,
+    CHUNKED_UPLOAD_ROOT=os.path.join(MEDIA_ROOT, "chunked_uploads"),
+    CHUNKED_UPLOAD_CHUNK_SIZE=4,
+)
+class ChunkedUploadTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.lecturer = User.objects.create_user(
+            username="lecturer", password="password", is_lecturer=True
+        )
+        program = Program.objects.create(title="Science")
+        self.course = Course.objects.create(
+            program=program, title="Physics", code="PHY101", level="High School"
+        )
+        self.topic = Topic.objects.create(title="Motion", course=self.course, order=1)
+        self.client.force_login(self.lecturer)
+        self.content = b"0123456789"
+
+    def start(self):
+        response = self.client.post(
+            reverse("chunked_upload_start", args=[self.course.slug]),
+            {
+                "kind": "file",
+                "filename": "notes.pdf",
+                "size": len(self.content),
+                "topic": self.topic.pk,
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["upload_id"]
+
+    def put_chunk(self, upload_id, start, end):
+        return self.client.put(
+            reverse("chunked_upload_chunk", args=[self.course.slug, upload_id]),
+            data=self.content[start:end],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end - 1}/{len(self.content)}",
+        )
+
+    def test_resume_and_complete(self):
+        upload_id = self.start()
+        self.assertEqual(self.put_chunk(upload_id, 0, 4).json()["offset"], 4)
+
+        # A retried chunk at a stale offset is rejected with the current offset
+        response = self.put_chunk(upload_id, 0, 4)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 4)
+
+        self.put_chunk(upload_id, 4, 8)
+        self.put_chunk(upload_id, 8, 10)
+
+        response = self.client.post(
+            reverse("chunked_upload_complete", args=[self.course.slug, upload_id]),
+            {"title": "Notes"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["sha256"], hashlib.sha256(self.content).hexdigest()
+        )
+
+        upload = Upload.objects.get(title="Notes")
+        with upload.file.open("rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(upload.file_name, "notes.pdf")
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_concurrent_chunk_is_not_written(self):
+        upload_id = self.start()
+        upload = ChunkedUpload.objects.get(pk=upload_id)
+        # A second request that read the upload before the first appended
+        stale = ChunkedUpload.objects.get(pk=upload_id)
+
+        append_chunk(upload, BytesIO(self.content[:4]), 0, 4)
+        with self.assertRaises(ChunkError):
+            append_chunk(stale, BytesIO(b"XXXX"), 0, 4)
+        with open(upload.path, "rb") as part:
+            self.assertEqual(part.read(), self.content[:4])
+
+    def test_rejects_invalid_extension(self):
+        response = self.client.post(
+            reverse("chunked_upload_start", args=[self.course.slug]),
+            {"kind": "file", "filename": "run.exe", "size": 10, "topic": self.topic.pk},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    MEDIA_ROOT=MEDIA_ROOT,
+    PROTECTED_MEDIA_SERVER="",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class ProtectedMediaTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        program = Program.objects.create(title="Science")
+        self.course = Course.objects.create(
+            program=program, title="Physics", code="PHY101", level="High School"
+        )
+        topic = Topic.objects.create(title="Motion", course=self.course, order=1)
+        self.content = b"0123456789"
+        self.upload = Upload(title="Notes", course=self.course, topic=topic)
+        self.upload.file.save("notes.pdf", ContentFile(self.content))
+        self.url = reverse("upload_file_serve", args=[self.course.slug, self.upload.pk])
+
+        self.user = User.objects.create_user(
+            username="student", password="password", is_student=True
+        )
+        self.client.force_login(self.user)
+
+    def enroll(self):
+        student = Student.objects.create(student=self.user)
+        TakenCourse.objects.create(student=student, course=self.course)
+
+    def test_requires_course_membership(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        lecturer = User.objects.create_user(
+            username="lecturer", password="password", is_lecturer=True
+        )
+        allocation = CourseAllocation.objects.create(lecturer=lecturer)
+        allocation.courses.add(self.course)
+        self.client.force_login(lecturer)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_range_request(self):
+        self.enroll()
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-3")
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=20-")
+        self.assertEqual(response.status_code, 416)
+
+    def test_download_keeps_the_uploaded_name(self):
+        self.enroll()
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response["Content-Disposition"], 'inline; filename="notes.pdf"'
+        )
+
+    def test_conditional_get(self):
+        self.enroll()
+        response = self.client.get(self.url)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_development_media_route_skips_course_files(self):
+        request = RequestFactory().get("/media/")
+        with self.assertRaises(Http404):
+            serve_public_media(request, self.upload.file.name, document_root=MEDIA_ROOT)
+
+        os.makedirs(os.path.join(MEDIA_ROOT, "news_thumbnails"), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, "news_thumbnails", "news.png"), "wb") as f:
+            f.write(b"png")
+        response = serve_public_media(request, "news_thumbnails/news.png", document_root=MEDIA_ROOT)
+        self.assertEqual(b"".join(response.streaming_content), b"png")
+
+    @override_settings(PROTECTED_MEDIA_SERVER="nginx")
+    def test_accel_redirect(self):
+        self.enroll()
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected-media/" + self.upload.file.name
+        )
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    TRAFFIC_ANALYTICS_ENABLED=False,
+)
+class ProgramDetailQueryCountTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(invalidate_current_period)
+        session = Session.objects.create(session="2024/2025", is_current_session=True)
+        Semester.objects.create(semester="First", is_current_semester=True, session=session)
+        self.program = Program.objects.create(title="Science")
+        Course.objects.bulk_create(
+            Course(
+                program=self.program,
+                title=f"Course {i}",
+                slug=f"course-{i}",
+                code=f"C{i:03d}",
+                level="High School",
+                semester="First" if i % 2 else "Second",
+            )
+            for i in range(200)
+        )
+        user = User.objects.create_superuser(username="admin", password="password")
+        self.client.force_login(user)
+
+    def test_current_semester_flag_is_annotated(self):
+        courses = Course.objects.with_current_semester_flag().order_by("code")
+        with self.assertNumQueries(1):
+            flags = [course.is_current_semester for course in courses]
+        self.assertEqual(flags.count(True), 100)
+
+    def test_program_detail_query_count(self):
+        url = reverse("program_detail", args=[self.program.pk])
+        # session, user, program, credits, page count, page of courses
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Current semester")
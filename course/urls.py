@@ -53,6 +53,11 @@ urlpatterns = [
         views.handle_file_delete,
         name="upload_file_delete",
     ),
+    path(
+        "course/<slug>/documentations/<int:file_id>/download/",
+        views.serve_upload_file,
+        name="upload_file_serve",
+    ),
     # Video uploads urls
     path(
         "course/<slug>/video_tutorials/upload/",
@@ -74,6 +79,27 @@ urlpatterns = [
         views.handle_video_delete,
         name="upload_video_delete",
     ),
+    path(
+        "course/<slug>/video_tutorials/<video_slug>/stream/",
+        views.serve_upload_video,
+        name="upload_video_stream",
+    ),
+    # Chunked (resumable) upload urls
+    path(
+        "course/<slug>/uploads/chunked/",
+        views.chunked_upload_start,
+        name="chunked_upload_start",
+    ),
+    path(
+        "course/<slug>/uploads/chunked/<uuid:upload_id>/",
+        views.chunked_upload_chunk,
+        name="chunked_upload_chunk",
+    ),
+    path(
+        "course/<slug>/uploads/chunked/<uuid:upload_id>/complete/",
+        views.chunked_upload_complete,
+        name="chunked_upload_complete",
+    ),
     # course registration
     path("course/registration/", views.course_registration, name="course_registration"),
     path("course/drop/", views.course_drop, name="course_drop"),
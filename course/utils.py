@@ -0,0 +1,205 @@
+import hashlib
+import os
+import threading
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.storage import blob_storage
+from result.models import TakenCourse
+
+
+# ########################################################
+# Chunked uploads
+# ########################################################
+
+# Running sha256 state per ChunkedUpload, keyed by upload id. hashlib
+# objects cannot be persisted, so a worker that did not see the previous
+# chunks rebuilds the state from the part file on disk (see _get_hasher).
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class ChunkError(Exception):
+    """Raised when a chunk cannot be appended to a ChunkedUpload."""
+
+
+def validate_chunked_filename(field, filename):
+    """Run the model field validators (e.g. allowed extensions) on a filename."""
+    value = ContentFile(b"", name=filename)
+    for validator in field.validators:
+        validator(value)
+
+
+def _get_hasher(upload):
+    with _hashers_lock:
+        cached = _hashers.get(upload.pk)
+    if cached is not None and cached[0] == upload.offset:
+        return cached[1]
+
+    hasher = hashlib.sha256()
+    remaining = upload.offset
+    if remaining:
+        with open(upload.path, "rb") as part:
+            while remaining > 0:
+                block = part.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def append_chunk(upload, stream, start, length):
+    """
+    Append ``length`` bytes read from ``stream`` to the part file of ``upload``,
+    hashing them on the way. ``start`` must equal the current offset so that
+    a client retrying a chunk after a dropped connection cannot corrupt the file.
+    Returns the new offset.
+    """
+    if start != upload.offset:
+        raise ChunkError(f"Expected offset {upload.offset}, got {start}.")
+    if length <= 0 or start + length > upload.size:
+        raise ChunkError("Chunk exceeds the declared upload size.")
+
+    with transaction.atomic():
+        # Claim the range first: a concurrent request for the same offset
+        # waits on the row until this one commits and then updates nothing,
+        # so only one of them ever writes to the part file.
+        claimed = upload.__class__.objects.filter(pk=upload.pk, offset=start).update(
+            offset=F("offset") + length, updated_at=timezone.now()
+        )
+        if not claimed:
+            raise ChunkError("The upload was modified by another request.")
+
+        hasher = _get_hasher(upload)
+        os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+        with open(upload.path, "ab") as part:
+            # Drop bytes left behind by an interrupted chunk before appending
+            part.truncate(upload.offset)
+            part.seek(upload.offset)
+            received = 0
+            while received < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - received))
+                if not block:
+                    break
+                part.write(block)
+                hasher.update(block)
+                received += len(block)
+
+        if received != length:
+            with _hashers_lock:
+                _hashers.pop(upload.pk, None)
+            # Rolls the claimed offset back
+            raise ChunkError(f"Incomplete chunk: received {received} of {length} bytes.")
+
+    upload.offset = start + length
+    with _hashers_lock:
+        _hashers[upload.pk] = (upload.offset, hasher)
+    return upload.offset
+
+
+class ChecksumMismatch(ChunkError):
+    """Raised when the assembled upload does not match the expected sha256."""
+
+
+def finish_chunked_upload(upload, expected_digest=""):
+    """
+    Move the assembled part file into the blob store without copying it,
+    and return the blob name to assign to the model's FileField together
+    with the sha256 of the content.
+    """
+    if not upload.is_complete:
+        raise ChunkError("The upload is not complete yet.")
+
+    digest = _get_hasher(upload).hexdigest()
+    with _hashers_lock:
+        _hashers.pop(upload.pk, None)
+    if expected_digest and expected_digest != digest:
+        raise ChecksumMismatch("Checksum mismatch.")
+
+    name = blob_storage.adopt(
+        upload.path, digest, os.path.splitext(upload.filename)[1], upload.size
+    )
+    return name, digest
+
+
+# ########################################################
+# Protected media
+# ########################################################
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header does not overlap the file."""
+
+
+def user_can_access_course(user, course):
+    """Superusers, lecturers allocated to the course and enrolled students."""
+    if user.is_superuser:
+        return True
+    if user.is_lecturer and course.allocated_course.filter(lecturer=user).exists():
+        return True
+    return TakenCourse.objects.filter(student__student=user, course=course).exists()
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single ``bytes=`` range against a file of ``size`` bytes and
+    return ``(start, end)`` with ``end`` inclusive, or None when the header
+    should be ignored (missing, malformed or multiple ranges) and the whole
+    file sent.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, sep, end = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start:
+            start = int(start)
+            end = int(end) if end else size - 1
+        else:
+            # Suffix range: the last ``end`` bytes
+            suffix = int(end)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start < 0 or start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+class RangeFileWrapper:
+    """
+    File-like object exposing ``length`` bytes of ``file`` from its current
+    position. ``fileno()`` is kept so that a WSGI server with
+    ``wsgi.file_wrapper`` support (gunicorn, uWSGI) can hand the range to
+    sendfile() instead of copying it through Python.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
@@ -1,17 +1,26 @@
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.paginator import Paginator
 from django.db import transaction, IntegrityError
 from django.db.models import Sum, Max, Count, Q, Avg
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_http_methods, require_POST
+from django.views.static import serve
 from django.views.generic import CreateView
 from django_filters.views import FilterView
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse
+from django.urls import reverse
 from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
+from urllib.parse import quote
 import csv
+import mimetypes
+import os
 import xlwt
 import io
 import datetime
@@ -20,6 +29,8 @@ from xhtml2pdf import pisa
 
 from accounts.decorators import lecturer_required, student_required
 from accounts.models import Student
+from core.metrics import PDF_SECONDS
+from core.storage import original_name
 from course.filters import CourseAllocationFilter, ProgramFilter
 from course.forms import (
     CourseAddForm,
@@ -32,6 +43,7 @@ from course.forms import (
     TopicForm,
 )
 from course.models import (
+    ChunkedUpload,
     Course,
     CourseAllocation,
     CourseSession,
@@ -42,7 +54,18 @@ from course.models import (
     DiscussionTopic,
     DiscussionResponse,
 )
-from result.models import TakenCourse
+from course.utils import (
+    ChecksumMismatch,
+    ChunkError,
+    RangeFileWrapper,
+    RangeNotSatisfiable,
+    append_chunk,
+    finish_chunked_upload,
+    parse_range_header,
+    user_can_access_course,
+    validate_chunked_filename,
+)
+from result.models import CourseStats, TakenCourse
 
 
 # ########################################################
@@ -84,7 +107,12 @@ def program_detail(request, pk):
     program = get_object_or_404(Program, pk=pk)
     
     # Optimize the courses query by adding caching to the queryset
-    courses_queryset = Course.objects.filter(program_id=pk).order_by("-year")
+    courses_queryset = (
+        Course.objects.filter(program_id=pk)
+        .with_current_semester_flag()
+        .select_related("stats")
+        .order_by("-year")
+    )
     
     # Calculate credits once before pagination to avoid recalculation
     credits = courses_queryset.aggregate(total_credits=Sum("credit"))
@@ -302,12 +330,15 @@ def delete_session(request, slug, session_id):
 @login_required
 def course_participants(request, slug):
     course = get_object_or_404(Course, slug=slug)
-    students = Student.objects.filter(takencourse__course=course).distinct()
-    lecturers = CourseAllocation.objects.filter(courses__pk=course.id)
+    students = (
+        Student.objects.filter(takencourse__course=course)
+        .select_related("student", "program")
+        .distinct()
+    )
+    lecturers = CourseAllocation.objects.filter(courses__pk=course.id).select_related(
+        "lecturer"
+    )
 
-    for student in students:
-        print(student.student.email)   
-    
     context = {
         "title": course.title,
         "course": course,
@@ -556,7 +587,8 @@ def export_grades_pdf(request, slug):
     
     try:
         # Create a PDF
-        pisa_status = pisa.CreatePDF(html, dest=response)
+        with PDF_SECONDS.time(document=template_path):
+            pisa_status = pisa.CreatePDF(html, dest=response)
         
         # If error then show some error view
         if pisa_status.err:
@@ -1063,6 +1095,271 @@ def handle_video_delete(request, slug, video_slug):
     return redirect("course_detail", slug=slug)
 
 
+# ########################################################
+# Chunked Upload Views
+# ########################################################
+
+CHUNKED_UPLOAD_TARGETS = {
+    ChunkedUpload.FILE: (Upload, "file"),
+    ChunkedUpload.VIDEO: (UploadVideo, "video"),
+}
+
+
+def _chunked_upload_status(upload):
+    return {
+        "upload_id": str(upload.pk),
+        "offset": upload.offset,
+        "size": upload.size,
+        "chunk_size": settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+    }
+
+
+def _parse_content_range(header, size):
+    """Parse ``bytes <start>-<end>/<total>`` and return ``(start, length)``."""
+    try:
+        unit, _, spec = header.partition(" ")
+        byte_range, _, total = spec.partition("/")
+        start, _, end = byte_range.partition("-")
+        start, end, total = int(start), int(end), int(total)
+    except ValueError:
+        return None
+    if unit != "bytes" or total != size or end < start:
+        return None
+    return start, end - start + 1
+
+
+@login_required
+@lecturer_required
+@require_POST
+def chunked_upload_start(request, slug):
+    """Open a resumable upload session for a course file or video."""
+    course = get_object_or_404(Course, slug=slug)
+    topic_id = request.POST.get("topic") or request.GET.get("topic")
+    if not topic_id:
+        return JsonResponse({"error": "Topic is required."}, status=400)
+    topic = get_object_or_404(Topic, id=topic_id, course=course)
+    kind = request.POST.get("kind", ChunkedUpload.FILE)
+    filename = request.POST.get("filename", "")
+    if kind not in CHUNKED_UPLOAD_TARGETS:
+        return JsonResponse({"error": "Invalid upload kind."}, status=400)
+    try:
+        size = int(request.POST.get("size", ""))
+    except ValueError:
+        return JsonResponse({"error": "Missing upload size."}, status=400)
+    if size <= 0 or size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        return JsonResponse({"error": "Invalid upload size."}, status=400)
+
+    model, field_name = CHUNKED_UPLOAD_TARGETS[kind]
+    try:
+        validate_chunked_filename(model._meta.get_field(field_name), filename)
+    except ValidationError as e:
+        return JsonResponse({"error": " ".join(e.messages)}, status=400)
+
+    upload = ChunkedUpload.objects.create(
+        user=request.user,
+        course=course,
+        topic=topic,
+        kind=kind,
+        filename=filename,
+        size=size,
+        sha256=request.POST.get("sha256", "").lower(),
+    )
+    return JsonResponse(_chunked_upload_status(upload), status=201)
+
+
+@login_required
+@lecturer_required
+@require_http_methods(["GET", "PUT", "POST"])
+def chunked_upload_chunk(request, slug, upload_id):
+    """
+    GET returns the current offset so that a client can resume an interrupted
+    upload; PUT/POST appends the request body at the offset given in the
+    ``Content-Range`` header.
+    """
+    upload = get_object_or_404(
+        ChunkedUpload, pk=upload_id, course__slug=slug, user=request.user
+    )
+    if request.method == "GET":
+        return JsonResponse(_chunked_upload_status(upload))
+
+    content_range = _parse_content_range(
+        request.headers.get("Content-Range", ""), upload.size
+    )
+    if content_range is None:
+        return JsonResponse({"error": "Invalid Content-Range header."}, status=400)
+    start, length = content_range
+    if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        return JsonResponse({"error": "Chunk too large."}, status=413)
+
+    try:
+        # Read straight from the request stream so that the chunk is never
+        # buffered by the upload handlers.
+        append_chunk(upload, request, start, length)
+    except ChunkError as e:
+        upload.refresh_from_db(fields=["offset"])
+        data = _chunked_upload_status(upload)
+        data["error"] = str(e)
+        return JsonResponse(data, status=409)
+    return JsonResponse(_chunked_upload_status(upload))
+
+
+@login_required
+@lecturer_required
+@require_POST
+def chunked_upload_complete(request, slug, upload_id):
+    """Attach a fully received upload to a new Upload or UploadVideo."""
+    upload = get_object_or_404(
+        ChunkedUpload, pk=upload_id, course__slug=slug, user=request.user
+    )
+    if not upload.is_complete:
+        return JsonResponse(_chunked_upload_status(upload), status=409)
+
+    model, field_name = CHUNKED_UPLOAD_TARGETS[upload.kind]
+    title = request.POST.get("title", "").strip()
+    if not title:
+        return JsonResponse({"error": "Title is required."}, status=400)
+
+    expected = upload.sha256 or request.POST.get("sha256", "").lower()
+    with transaction.atomic():
+        # A second request completing the same upload waits here until the
+        # first one has deleted it
+        upload = ChunkedUpload.objects.select_for_update().filter(pk=upload.pk).first()
+        if upload is None:
+            return JsonResponse({"error": "The upload was already completed."}, status=409)
+        try:
+            name, digest = finish_chunked_upload(upload, expected)
+        except ChecksumMismatch as e:
+            upload.delete()
+            return JsonResponse({"error": str(e)}, status=422)
+        except FileNotFoundError:
+            # Moved into the blob store by a concurrent request
+            return JsonResponse({"error": "The upload was already completed."}, status=409)
+
+        obj = model(title=title, course=upload.course, topic=upload.topic)
+        if upload.kind == ChunkedUpload.VIDEO:
+            obj.description = request.POST.get("description", "")
+        getattr(obj, field_name).name = name
+        setattr(obj, f"{field_name}_name", upload.filename)
+        obj.save()
+        upload.delete()
+
+    messages.success(request, f"{obj.title} has been uploaded.")
+    return JsonResponse(
+        {
+            "sha256": digest,
+            "redirect": reverse("course_detail", kwargs={"slug": slug}),
+        }
+    )
+
+
+# ########################################################
+# Protected Media Views
+# ########################################################
+
+
+def _serve_protected_file(request, field_file):
+    """
+    Stream a stored file with Range (206) and conditional GET support, or
+    hand it off to the fronting proxy when PROTECTED_MEDIA_SERVER is set.
+    """
+    if not field_file:
+        raise Http404
+    path = field_file.path
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404
+
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return response
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    server = settings.PROTECTED_MEDIA_SERVER
+    if server:
+        # The proxy serves the file itself, including Range requests
+        response = HttpResponse(content_type=content_type)
+        if server == "nginx":
+            response["X-Accel-Redirect"] = "{}/{}".format(
+                settings.PROTECTED_MEDIA_INTERNAL_URL.rstrip("/"),
+                quote(field_file.name),
+            )
+        else:
+            response["X-Sendfile"] = path
+        return response
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+        try:
+            byte_range = parse_range_header(request.headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    filename = original_name(field_file)
+    file = open(path, "rb")
+    if byte_range:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(
+            RangeFileWrapper(file, end - start + 1),
+            status=206,
+            content_type=content_type,
+            filename=filename,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    else:
+        response = FileResponse(file, content_type=content_type, filename=filename)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private"
+    return response
+
+
+def serve_public_media(request, path, document_root=None, show_indexes=False):
+    """
+    MEDIA_ROOT in development (DEBUG), except course files and videos:
+    those are only served by serve_upload_file and serve_upload_video,
+    which check course membership.
+    """
+    if (
+        path.startswith(("course_files/", "course_videos/"))
+        or Upload.objects.filter(file=path).exists()
+        or UploadVideo.objects.filter(video=path).exists()
+    ):
+        raise Http404
+    return serve(request, path, document_root=document_root, show_indexes=show_indexes)
+
+
+@login_required
+def serve_upload_file(request, slug, file_id):
+    upload = get_object_or_404(
+        Upload.objects.select_related("course"), pk=file_id, course__slug=slug
+    )
+    if not user_can_access_course(request.user, upload.course):
+        raise PermissionDenied
+    return _serve_protected_file(request, upload.file)
+
+
+@login_required
+def serve_upload_video(request, slug, video_slug):
+    video = get_object_or_404(
+        UploadVideo.objects.select_related("course"), slug=video_slug, course__slug=slug
+    )
+    if not user_can_access_course(request.user, video.course):
+        raise PermissionDenied
+    return _serve_protected_file(request, video.video)
+
+
 # ########################################################
 # Course Registration Views
 # ########################################################
@@ -1072,8 +1369,7 @@ def handle_video_delete(request, slug, video_slug):
 @student_required
 def course_registration(request):
     # Get student object once and reuse it
-    student = get_object_or_404(Student.objects.select_related('program', 'student'), 
-                                student__id=request.user.id)
+    student = request.academic.get_student_or_404()
     
     if request.method == "POST":
         course_ids = request.POST.getlist("course_ids")
@@ -1081,7 +1377,9 @@ def course_registration(request):
             # Use a transaction to ensure all operations succeed or fail together
             with transaction.atomic():
                 # Bulk create TakenCourse objects instead of creating one by one
-                courses_to_register = Course.objects.filter(pk__in=course_ids)
+                courses_to_register = Course.objects.filter(pk__in=course_ids).exclude(
+                    taken_courses__student=student
+                )
                 
                 # Prepare bulk create data
                 taken_courses = [
@@ -1091,6 +1389,7 @@ def course_registration(request):
                 
                 # Bulk create
                 TakenCourse.objects.bulk_create(taken_courses)
+                CourseStats.record_enrollments(taken_courses)
                 
             messages.success(request, "Courses registered successfully!")
         except Exception as e:
@@ -1147,7 +1446,7 @@ def course_registration(request):
 @student_required
 def course_drop(request):
     if request.method == "POST":
-        student = get_object_or_404(Student, student__pk=request.user.id)
+        student = request.academic.get_student_or_404()
         course_ids = request.POST.getlist("course_ids")
         print("course_ids", course_ids)
         for course_id in course_ids:
@@ -1168,11 +1467,11 @@ def course_drop(request):
 @login_required
 def user_course_list(request):
     if request.user.is_lecturer:
-        courses = Course.objects.filter(allocated_course__lecturer__pk=request.user.id)
+        courses = Course.objects.filter(pk__in=request.academic.allocated_course_query)
         return render(request, "course/user_course_list.html", {"courses": courses})
 
     if request.user.is_student:
-        student = get_object_or_404(Student, student__pk=request.user.id)
+        student = request.academic.get_student_or_404()
         taken_courses = TakenCourse.objects.filter(student=student)
         return render(
             request,
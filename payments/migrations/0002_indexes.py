@@ -0,0 +1,40 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+def clear_blank_codes(apps, schema_editor):
+    Invoice = apps.get_model("payments", "Invoice")
+    Invoice.objects.filter(invoice_code="").update(invoice_code=None)
+
+    # Payments are matched by their code, so duplicates cannot be renamed
+    # here; stop before the unique constraint fails halfway
+    duplicates = list(
+        Invoice.objects.exclude(invoice_code=None)
+        .values("invoice_code")
+        .annotate(count=models.Count("pk"))
+        .filter(count__gt=1)
+        .values_list("invoice_code", flat=True)
+        .order_by()
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Invoice codes used by more than one invoice: %s. Give each "
+            "invoice its own code and run migrate again." % ", ".join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_blank_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='invoice',
+            name='invoice_code',
+            field=models.CharField(blank=True, max_length=200, null=True, unique=True),
+        ),
+    ]
@@ -7,4 +7,4 @@ class Invoice(models.Model):
     total = models.FloatField(null=True, blank=True)
     amount = models.FloatField(null=True, blank=True)
     payment_complete = models.BooleanField(default=False)
-    invoice_code = models.CharField(max_length=200, blank=True, null=True)
+    invoice_code = models.CharField(max_length=200, blank=True, null=True, unique=True)
@@ -13,6 +13,7 @@ from .models import (
     Choice,
     EssayQuestion,
     Sitting,
+    SittingAnswer,
 )
 
 
@@ -20,6 +21,12 @@ class ChoiceInline(admin.TabularInline):
     model = Choice
 
 
+class SittingAnswerInline(admin.TabularInline):
+    model = SittingAnswer
+    raw_id_fields = ("question",)
+    extra = 0
+
+
 class QuizAdminForm(TranslationModelForm):
     questions = forms.ModelMultipleChoiceField(
         queryset=Question.objects.all().select_subclasses(),
@@ -89,6 +96,8 @@ class EssayQuestionAdmin(admin.ModelAdmin):
         "content",
         "quiz",
         "explanation",
+        "tag",
+        "difficulty",
     )
     search_fields = ("content", "explanation")
     filter_horizontal = ("quiz",)
@@ -98,4 +107,10 @@ admin.site.register(Quiz, QuizAdmin)
 admin.site.register(MCQuestion, MCQuestionAdmin)
 admin.site.register(Progress, ProgressAdmin)
 admin.site.register(EssayQuestion, EssayQuestionAdmin)
-admin.site.register(Sitting)
+class SittingAdmin(admin.ModelAdmin):
+    list_display = ("user", "quiz", "complete", "current_score", "start")
+    raw_id_fields = ("user", "quiz", "course")
+    inlines = [SittingAnswerInline]
+
+
+admin.site.register(Sitting, SittingAdmin)
@@ -0,0 +1,106 @@
+"""
+Compiled answer keys of quizzes.
+
+Grading and rendering a multiple-choice question used to cost a Choice
+query each. An answer key holds every choice of a quiz, loaded with one
+query; it is part of the quiz snapshot (see quiz.snapshot), which caches
+it per quiz version.
+"""
+
+import random
+
+from django.db.models import F
+
+
+class AnswerChoice:
+    """A choice as the quiz templates use it: ``id``, ``correct`` and its text."""
+
+    __slots__ = ("id", "choice_text", "correct")
+
+    def __init__(self, id, choice_text, correct):
+        self.id = id
+        self.choice_text = choice_text
+        self.correct = correct
+
+    def __str__(self):
+        return self.choice_text
+
+
+class QuestionKey:
+    def __init__(self, choice_order="", choices=()):
+        self.choice_order = choice_order
+        self.choices = tuple(choices)
+        self.correct = frozenset(choice.id for choice in self.choices if choice.correct)
+        self.texts = {choice.id: choice.choice_text for choice in self.choices}
+
+    def is_correct(self, guess):
+        try:
+            return int(guess) in self.correct
+        except (TypeError, ValueError):
+            return False
+
+    def choice_text(self, guess):
+        try:
+            return self.texts.get(int(guess), "")
+        except (TypeError, ValueError):
+            return ""
+
+    def ordered_choices(self, seed=None):
+        """
+        The choices in display order. A "random" order is a permutation
+        derived from ``seed``, so the same seed always shows the same order.
+        """
+        if self.choice_order == "content":
+            return sorted(self.choices, key=lambda choice: choice.choice_text)
+        choices = list(self.choices)
+        if self.choice_order == "random":
+            random.Random(seed).shuffle(choices)
+        return choices
+
+
+EMPTY_QUESTION_KEY = QuestionKey()
+
+
+class AnswerKey:
+    """The QuestionKey of every multiple-choice question of a quiz."""
+
+    def __init__(self, questions):
+        self.questions = questions
+
+    def question(self, question_id):
+        return self.questions.get(question_id, EMPTY_QUESTION_KEY)
+
+    def grade(self, answers):
+        """{question id: whether the guess is correct} for ``answers`` ({question id: guess})."""
+        return {
+            question_id: self.question(question_id).is_correct(guess)
+            for question_id, guess in answers.items()
+        }
+
+
+def build_answer_key(quiz):
+    from .models import Choice
+
+    questions = {}
+    choices = (
+        Choice.objects.filter(question__quiz=quiz)
+        .annotate(choice_order=F("question__choice_order"))
+        .order_by("question_id", "pk")
+    )
+    for choice in choices:
+        questions.setdefault(choice.question_id, (choice.choice_order, []))[1].append(
+            AnswerChoice(choice.pk, choice.choice_text, choice.correct)
+        )
+    return AnswerKey(
+        {
+            question_id: QuestionKey(choice_order, items)
+            for question_id, (choice_order, items) in questions.items()
+        }
+    )
+
+
+def get_answer_key(quiz):
+    """The AnswerKey of ``quiz`` from its cached snapshot."""
+    from .snapshot import get_quiz_snapshot
+
+    return get_quiz_snapshot(quiz).answer_key
@@ -33,11 +33,9 @@ def fix_quiz_records():
                         quiz=quiz,
                         course=course,
                         question_order="1,2,3,",  # Dummy question order
-                        question_list="",         # Empty question list
-                        incorrect_questions="",   # No incorrect questions
+                        cursor=3,                 # All questions asked
                         current_score=8,          # Mock score 
                         complete=True,            # Mark as complete
-                        user_answers="{}"         # Empty answers
                     )
                     
                     # Set end time to now
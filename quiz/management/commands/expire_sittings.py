@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quiz.models import Sitting
+
+
+class Command(BaseCommand):
+    help = (
+        "Completes every sitting of a timed quiz whose deadline has passed; "
+        "run it every minute from cron"
+    )
+
+    def handle(self, *args, **options):
+        count = Sitting.objects.expire_overdue()
+        self.stdout.write(self.style.SUCCESS(f"Completed {count} expired sittings."))
@@ -0,0 +1,27 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.models import Quiz, Sitting
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the sittings of every student enrolled in the course of the "
+        "given quizzes ahead of a scheduled exam"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("quizzes", nargs="+", help="Slugs of the quizzes.")
+
+    def handle(self, *args, **options):
+        for slug in options["quizzes"]:
+            quiz = Quiz.objects.select_related("course").filter(slug=slug).first()
+            if quiz is None:
+                raise CommandError(f"Quiz '{slug}' does not exist.")
+            try:
+                count = Sitting.objects.pregenerate(quiz)
+            except ImproperlyConfigured as e:
+                raise CommandError(f"{slug}: {e}")
+            self.stdout.write(
+                self.style.SUCCESS(f"Created {count} sittings for '{quiz.title}'.")
+            )
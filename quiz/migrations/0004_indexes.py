@@ -0,0 +1,17 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_rename_choice_text_es_choice_choice_text_fa_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sitting',
+            index=models.Index(fields=['user', 'quiz', 'course', 'complete'], name='sitting_user_quiz'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:38
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitting',
+            name='cursor',
+            field=models.PositiveIntegerField(default=0, verbose_name='Cursor'),
+        ),
+        migrations.AlterField(
+            model_name='sitting',
+            name='question_order',
+            field=models.TextField(validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')], verbose_name='Question Order'),
+        ),
+        migrations.CreateModel(
+            name='SittingAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='Position')),
+                ('answer', models.TextField(blank=True, verbose_name='Answer')),
+                ('correct', models.BooleanField(default=False, verbose_name='Correct')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.question', verbose_name='Question')),
+                ('sitting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quiz.sitting', verbose_name='Sitting')),
+            ],
+            options={
+                'verbose_name': 'Sitting answer',
+                'verbose_name_plural': 'Sitting answers',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sittinganswer',
+            constraint=models.UniqueConstraint(fields=('sitting', 'question'), name='unique_sitting_answer'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:38
+
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def _ids(value):
+    return [int(item) for item in (value or "").split(",") if item.strip().isdigit()]
+
+
+def answers_to_rows(apps, schema_editor):
+    """
+    Turn question_list, incorrect_questions and the user_answers JSON of
+    every sitting into its cursor and SittingAnswer rows.
+    """
+    Question = apps.get_model("quiz", "Question")
+    Sitting = apps.get_model("quiz", "Sitting")
+    SittingAnswer = apps.get_model("quiz", "SittingAnswer")
+
+    question_ids = set(Question.objects.values_list("pk", flat=True))
+    rows, sittings = [], []
+    for sitting in Sitting.objects.order_by("pk").iterator(chunk_size=BATCH_SIZE):
+        positions = {qid: i for i, qid in enumerate(_ids(sitting.question_order))}
+        incorrect = set(_ids(sitting.incorrect_questions))
+        try:
+            answers = json.loads(sitting.user_answers or "{}")
+        except ValueError:
+            answers = {}
+        answers = {
+            int(key): "" if guess is None else str(guess)
+            for key, guess in answers.items()
+            if str(key).isdigit()
+        }
+        for qid in incorrect - set(answers):
+            answers[qid] = ""
+
+        for qid, guess in answers.items():
+            if qid in positions and qid in question_ids:
+                rows.append(
+                    SittingAnswer(
+                        sitting_id=sitting.pk,
+                        question_id=qid,
+                        position=positions[qid],
+                        answer=guess,
+                        correct=qid not in incorrect,
+                    )
+                )
+        sitting.cursor = max(0, len(positions) - len(_ids(sitting.question_list)))
+        sittings.append(sitting)
+
+        if len(rows) >= BATCH_SIZE or len(sittings) >= BATCH_SIZE:
+            SittingAnswer.objects.bulk_create(rows)
+            Sitting.objects.bulk_update(sittings, ["cursor"])
+            rows, sittings = [], []
+    SittingAnswer.objects.bulk_create(rows)
+    Sitting.objects.bulk_update(sittings, ["cursor"])
+
+
+def rows_to_answers(apps, schema_editor):
+    Sitting = apps.get_model("quiz", "Sitting")
+
+    sittings = []
+    for sitting in Sitting.objects.prefetch_related("answers"):
+        answers = sorted(sitting.answers.all(), key=lambda answer: answer.position)
+        remaining = _ids(sitting.question_order)[sitting.cursor:]
+        sitting.question_list = "".join(f"{qid}," for qid in remaining)
+        sitting.incorrect_questions = "".join(
+            f"{answer.question_id}," for answer in answers if not answer.correct
+        )
+        sitting.user_answers = json.dumps(
+            {str(answer.question_id): answer.answer for answer in answers if answer.answer}
+        )
+        sittings.append(sitting)
+    Sitting.objects.bulk_update(
+        sittings,
+        ["question_list", "incorrect_questions", "user_answers"],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_sitting_answers'),
+    ]
+
+    operations = [
+        migrations.RunPython(answers_to_rows, rows_to_answers),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:38
+
+import django.core.validators
+from django.db import migrations, models
+import re
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_migrate_sitting_answers'),
+    ]
+
+    operations = [
+        # Defaults, so that reverting re-adds the columns to existing rows
+        migrations.AlterField(
+            model_name='sitting',
+            name='incorrect_questions',
+            field=models.CharField(blank=True, default='', max_length=1024, validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')], verbose_name='Incorrect questions'),
+        ),
+        migrations.AlterField(
+            model_name='sitting',
+            name='question_list',
+            field=models.CharField(default='', max_length=1024, validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')], verbose_name='Question List'),
+        ),
+        migrations.RemoveField(
+            model_name='sitting',
+            name='incorrect_questions',
+        ),
+        migrations.RemoveField(
+            model_name='sitting',
+            name='question_list',
+        ),
+        migrations.RemoveField(
+            model_name='sitting',
+            name='user_answers',
+        ),
+    ]
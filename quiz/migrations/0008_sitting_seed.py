@@ -0,0 +1,25 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:54
+
+import django.core.validators
+from django.db import migrations, models
+import re
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_remove_sitting_lists'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitting',
+            name='seed',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Seed'),
+        ),
+        migrations.AlterField(
+            model_name='sitting',
+            name='question_order',
+            field=models.TextField(blank=True, validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')], verbose_name='Question Order'),
+        ),
+    ]
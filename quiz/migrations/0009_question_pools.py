@@ -0,0 +1,33 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_sitting_seed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='difficulty',
+            field=models.CharField(blank=True, choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=10, verbose_name='Difficulty'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='tag',
+            field=models.CharField(blank=True, help_text='Topic of the question, used to stratify random draws.', max_length=50, verbose_name='Tag'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='draw_count',
+            field=models.PositiveIntegerField(blank=True, help_text="Draw this many questions at random from the quiz's questions for each sitting. Leave empty to ask all of them.", null=True, verbose_name='Questions per sitting'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='stratify_by',
+            field=models.CharField(blank=True, choices=[('tag', 'Tag'), ('difficulty', 'Difficulty')], help_text='Draw from every tag or difficulty in proportion to its share of the questions.', max_length=20, verbose_name='Stratify by'),
+        ),
+    ]
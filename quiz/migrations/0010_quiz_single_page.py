@@ -0,0 +1,18 @@
+# Generated by Django 4.0.8 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_question_pools'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='single_page',
+            field=models.BooleanField(default=False, help_text='If yes, all questions are shown on one page and the answers are submitted together.', verbose_name='Single page'),
+        ),
+    ]
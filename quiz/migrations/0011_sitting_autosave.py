@@ -0,0 +1,23 @@
+# Generated by Django 4.0.8 on 2026-10-19 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_quiz_single_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitting',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Heartbeat'),
+        ),
+        migrations.AddField(
+            model_name='sitting',
+            name='last_seq',
+            field=models.PositiveIntegerField(default=0, verbose_name='Last autosave'),
+        ),
+    ]
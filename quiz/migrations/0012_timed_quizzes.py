@@ -0,0 +1,27 @@
+# Generated by Django 4.0.8 on 2026-10-19 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_sitting_autosave'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='time_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='Minutes allowed for each attempt. Leave empty for no limit.', null=True, verbose_name='Time limit'),
+        ),
+        migrations.AddField(
+            model_name='sitting',
+            name='deadline',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Deadline'),
+        ),
+        migrations.AddIndex(
+            model_name='sitting',
+            index=models.Index(fields=['complete', 'deadline'], name='sitting_deadline'),
+        ),
+    ]
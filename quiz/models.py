@@ -1,16 +1,19 @@
-import json
+import random
 import re
 import os
+from datetime import timedelta
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.validators import (
     MaxValueValidator,
     validate_comma_separated_integer_list,
 )
 
-from django.db import models
-from django.db.models import Q
-from django.db.models.signals import pre_save
+from django.db import connections, models, transaction
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed, post_save, pre_delete, pre_save
 from django.urls import reverse
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
@@ -26,6 +29,17 @@ CHOICE_ORDER_OPTIONS = (
     ("none", _("None")),
 )
 
+DIFFICULTY_OPTIONS = (
+    ("easy", _("Easy")),
+    ("medium", _("Medium")),
+    ("hard", _("Hard")),
+)
+
+STRATIFY_OPTIONS = (
+    ("tag", _("Tag")),
+    ("difficulty", _("Difficulty")),
+)
+
 CATEGORY_OPTIONS = (
     ("assignment", _("Assignment")),
     ("exam", _("Exam")),
@@ -64,6 +78,23 @@ class Quiz(models.Model):
         help_text=_(
             "Display the questions in a random order or as they are set?"),
     )
+    draw_count = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Questions per sitting"),
+        help_text=_(
+            "Draw this many questions at random from the quiz's questions for each sitting. Leave empty to ask all of them."
+        ),
+    )
+    stratify_by = models.CharField(
+        max_length=20,
+        choices=STRATIFY_OPTIONS,
+        blank=True,
+        verbose_name=_("Stratify by"),
+        help_text=_(
+            "Draw from every tag or difficulty in proportion to its share of the questions."
+        ),
+    )
     answers_at_end = models.BooleanField(
         default=False,
         verbose_name=_("Answers at end"),
@@ -71,6 +102,13 @@ class Quiz(models.Model):
             "Correct answer is NOT shown after question. Answers displayed at the end."
         ),
     )
+    single_page = models.BooleanField(
+        default=False,
+        verbose_name=_("Single page"),
+        help_text=_(
+            "If yes, all questions are shown on one page and the answers are submitted together."
+        ),
+    )
     exam_paper = models.BooleanField(
         default=False,
         verbose_name=_("Exam Paper"),
@@ -83,6 +121,12 @@ class Quiz(models.Model):
         verbose_name=_("Single Attempt"),
         help_text=_("If yes, only one attempt by a user will be permitted."),
     )
+    time_limit = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Time limit"),
+        help_text=_("Minutes allowed for each attempt. Leave empty for no limit."),
+    )
     pass_mark = models.SmallIntegerField(
         default=50,
         verbose_name=_("Pass Mark"),
@@ -141,6 +185,28 @@ class ProgressManager(models.Manager):
         new_progress = self.create(user=user, score="")
         return new_progress
 
+    def add_scores(self, results):
+        """
+        Add ``(user_id, quiz, score, possible)`` results to the progress of
+        their users: missing rows are inserted first, then every row is
+        locked, updated in memory and written with one bulk update.
+        """
+        by_user = {}
+        for user_id, quiz, score, possible in results:
+            by_user.setdefault(user_id, []).append((quiz, score, possible))
+        if not by_user:
+            return
+        with transaction.atomic(using=self.db):
+            self.bulk_create(
+                [self.model(user_id=user_id, score="") for user_id in by_user],
+                ignore_conflicts=True,
+            )
+            progress = list(self.select_for_update().filter(user_id__in=by_user))
+            for record in progress:
+                for quiz, score, possible in by_user[record.user_id]:
+                    record.add_score(quiz, score, possible)
+            self.bulk_update(progress, ["score"], batch_size=1000)
+
 
 class Progress(models.Model):
     user = models.OneToOneField(
@@ -161,11 +227,16 @@ class Progress(models.Model):
     def list_all_cat_scores(self):
         return {}  # Implement as needed
 
-    def update_score(self, question, score_to_add=0, possible_to_add=0):
+    def update_score(self, quiz, score_to_add=0, possible_to_add=0):
         if not isinstance(score_to_add, int) or not isinstance(possible_to_add, int):
             return _("Error"), _("Invalid score values.")
 
-        to_find = re.escape(str(question.quiz)) + \
+        self.add_score(quiz, score_to_add, possible_to_add)
+        self.save()
+
+    def add_score(self, quiz, score_to_add, possible_to_add):
+        """Add a result of ``quiz`` to ``score`` without saving it."""
+        to_find = re.escape(str(quiz)) + \
             r",(?P<score>\d+),(?P<possible>\d+),"
         match = re.search(to_find, self.score, re.IGNORECASE)
 
@@ -174,16 +245,14 @@ class Progress(models.Model):
             updated_possible = int(match.group(
                 "possible")) + abs(possible_to_add)
             new_score = ",".join(
-                [str(question.quiz), str(updated_score),
+                [str(quiz), str(updated_score),
                  str(updated_possible), ""]
             )
             self.score = self.score.replace(match.group(), new_score)
-            self.save()
         else:
             self.score += ",".join(
-                [str(question.quiz), str(score_to_add), str(possible_to_add), ""]
+                [str(quiz), str(score_to_add), str(possible_to_add), ""]
             )
-            self.save()
 
     def show_exams(self):
         if self.user.is_superuser:
@@ -194,52 +263,234 @@ class Progress(models.Model):
             )
 
 
+SITTING_QUESTIONS_KEY = "quiz:sitting:{}:questions"
+SITTING_QUESTIONS_TIMEOUT = 24 * 60 * 60
+
+
 class SittingManager(models.Manager):
+    @staticmethod
+    def new_seed(quiz):
+        """
+        A seed for the questions of a new sitting: their order and, for pool
+        quizzes, the draw. None asks every question in quiz order.
+        """
+        if quiz.random_order or quiz.draw_count:
+            return random.getrandbits(31)
+        return None
+
+    @staticmethod
+    def new_deadline(quiz):
+        if quiz.time_limit:
+            return now() + timedelta(minutes=quiz.time_limit)
+        return None
+
     def new_sitting(self, user, quiz, course):
-        # Use select_related to optimize related fields loading
-        # Cache the question set to avoid repeated queries
-        if not hasattr(quiz, '_question_set_cache'):
-            if quiz.random_order:
-                # Use efficient randomization for large datasets
-                question_set = list(quiz.question_set.all().select_subclasses())
-                from random import shuffle
-                shuffle(question_set)
-            else:
-                question_set = list(quiz.question_set.all().select_subclasses())
-            
-            quiz._question_set_cache = question_set
-        else:
-            question_set = quiz._question_set_cache
-            
-            # If random order is required and we're using cached questions, shuffle them locally
-            if quiz.random_order:
-                from random import shuffle
-                shuffle(question_set)  # This shuffles in place
+        from .snapshot import get_quiz_snapshot
 
-        question_ids = [item.id for item in question_set]
-        if not question_ids:
+        # Question ids come from the cached quiz snapshot, not the database
+        if not get_quiz_snapshot(quiz).question_ids:
             raise ImproperlyConfigured(
                 _(
                     "Question set of the quiz is empty. Please configure questions properly."
                 )
             )
 
-        questions = ",".join(map(str, question_ids)) + ","
-
-        # Use bulk create where possible and reduce DB interactions
+        # The order is derived from the seed; only the seed is stored
         new_sitting = self.create(
             user=user,
             quiz=quiz,
             course=course,
-            question_order=questions,
-            question_list=questions,
-            incorrect_questions="",
+            seed=self.new_seed(quiz),
+            deadline=self.new_deadline(quiz),
             current_score=0,
             complete=False,
-            user_answers="{}",
         )
         return new_sitting
 
+    def pregenerate(self, quiz, course=None):
+        """
+        Create, in one bulk_create, a sitting with its own question order for
+        every student enrolled in ``course`` (the quiz's by default) who may
+        take the quiz and has none in progress, so that starting a scheduled
+        exam only reads. Returns the number of sittings created.
+        """
+        from result.models import TakenCourse
+        from .snapshot import get_quiz_snapshot
+
+        course = course or quiz.course
+        if not get_quiz_snapshot(quiz).question_ids:
+            raise ImproperlyConfigured(
+                _(
+                    "Question set of the quiz is empty. Please configure questions properly."
+                )
+            )
+
+        taken = self.filter(quiz=quiz, course=course)
+        if not quiz.single_attempt:
+            taken = taken.filter(complete=False)
+        user_ids = (
+            TakenCourse.objects.filter(course=course)
+            .exclude(student__student_id__in=taken.values("user_id"))
+            .values_list("student__student_id", flat=True)
+            .distinct()
+        )
+
+        # The clock of a timed quiz starts when the student opens it
+        sittings = [
+            self.model(
+                user_id=user_id,
+                quiz=quiz,
+                course=course,
+                seed=self.new_seed(quiz),
+                current_score=0,
+                complete=False,
+            )
+            for user_id in user_ids
+        ]
+        self.bulk_create(sittings, batch_size=1000)
+        return len(sittings)
+
+    def cache_question_ids(self, sitting):
+        question_ids = frozenset(sitting._question_ids())
+        cache.set(
+            SITTING_QUESTIONS_KEY.format(sitting.pk), question_ids, SITTING_QUESTIONS_TIMEOUT
+        )
+        return question_ids
+
+    def cached_question_ids(self, sitting_id):
+        """
+        The set of question ids of a sitting, cached per sitting: they do
+        not change once drawn (see Sitting.pin_question_order).
+        """
+        question_ids = cache.get(SITTING_QUESTIONS_KEY.format(sitting_id))
+        if question_ids is None:
+            sitting = self.select_related("quiz").filter(pk=sitting_id).first()
+            if sitting is None:
+                return frozenset()
+            question_ids = self.cache_question_ids(sitting)
+        return question_ids
+
+    def autosave(self, sitting_id, user, seq=None, answers=None):
+        """
+        Record a heartbeat of the user's incomplete single-page sitting and
+        apply a batch of draft answers ({question id: guess}) without
+        loading the sitting or its quiz: one UPDATE, which only takes a
+        batch whose ``seq`` is above the last applied one, and one upsert
+        of the answers to questions of the sitting (whose ids are cached).
+        Returns (whether the batch was applied, the last applied seq);
+        raises DoesNotExist when there is no such sitting.
+        """
+        cutoff = now() - timedelta(seconds=settings.QUIZ_DEADLINE_GRACE)
+        sittings = self.filter(
+            Q(deadline__isnull=True) | Q(deadline__gte=cutoff),
+            pk=sitting_id,
+            user=user,
+            complete=False,
+            quiz__single_page=True,
+        )
+        if not answers:
+            if not sittings.update(heartbeat=now()):
+                raise self.model.DoesNotExist
+            return False, seq
+
+        with transaction.atomic(using=self.db):
+            if sittings.filter(last_seq__lt=seq).update(last_seq=seq, heartbeat=now()):
+                question_ids = self.cached_question_ids(sitting_id)
+                SittingAnswer.objects.save_drafts(
+                    sitting_id,
+                    {q: guess for q, guess in answers.items() if q in question_ids},
+                )
+                return True, seq
+        # A batch already applied (a retry) or out of order
+        last_seq = sittings.values_list("last_seq", flat=True).first()
+        if last_seq is None:
+            raise self.model.DoesNotExist
+        return False, last_seq
+
+    def expire_overdue(self):
+        """
+        Complete, in bulk, every sitting past its deadline and grace period
+        with what was answered in time, and add the results to the progress
+        of their users. The drafts of single-page sittings are graded
+        against the answer key in one pass per quiz; all rows are written
+        with bulk updates. Returns the number of sittings completed.
+        """
+        cutoff = now() - timedelta(seconds=settings.QUIZ_DEADLINE_GRACE)
+        with transaction.atomic(using=self.db):
+            # Sittings locked by another sweep are left to it
+            overdue = list(
+                self.select_for_update(skip_locked=True).filter(
+                    complete=False, deadline__lt=cutoff
+                )
+            )
+            quizzes = Quiz.objects.in_bulk({sitting.quiz_id for sitting in overdue})
+            # As mark_quiz_complete does, so that the results are kept
+            Quiz.objects.filter(exam_paper=False, pk__in=quizzes).update(exam_paper=True)
+
+            by_quiz = {}
+            for sitting in overdue:
+                by_quiz.setdefault(sitting.quiz_id, []).append(sitting)
+            answered = []
+            for quiz_id, sittings in by_quiz.items():
+                quiz = quizzes[quiz_id]
+                if quiz.single_page:
+                    self._grade_drafts(quiz, sittings)
+                    continue
+                for sitting in sittings:
+                    sitting.quiz = quiz
+                    sitting.complete = True
+                    sitting.end = sitting.deadline
+                    sitting.pin_question_order()
+                    answered.append(sitting)
+            # Only rows still open, in case one was submitted meanwhile
+            self.filter(complete=False).bulk_update(
+                answered, ["complete", "end", "question_order"], batch_size=1000
+            )
+            Progress.objects.add_scores(
+                (sitting.user_id, sitting.quiz, sitting.current_score, sitting.get_max_score)
+                for sitting in overdue
+            )
+        return len(overdue)
+
+    def _grade_drafts(self, quiz, sittings):
+        from .snapshot import get_quiz_snapshot
+
+        answer_key = get_quiz_snapshot(quiz).answer_key
+        sittings = {sitting.pk: sitting for sitting in sittings}
+        positions = {}
+        for sitting in sittings.values():
+            sitting.quiz = quiz
+            positions[sitting.pk] = {
+                question_id: position
+                for position, question_id in enumerate(sitting._question_ids())
+            }
+            sitting.cursor = len(positions[sitting.pk])
+            sitting.current_score = 0
+            sitting.complete = True
+            sitting.end = sitting.deadline
+            sitting.pin_question_order()
+
+        # As submit_answers does: blank answers and other questions are dropped
+        graded, dropped = [], []
+        for answer in SittingAnswer.objects.filter(sitting__in=list(sittings)):
+            position = positions[answer.sitting_id].get(answer.question_id)
+            if position is None or not answer.answer:
+                dropped.append(answer.pk)
+                continue
+            answer.position = position
+            answer.correct = answer_key.question(answer.question_id).is_correct(answer.answer)
+            sittings[answer.sitting_id].current_score += answer.correct
+            graded.append(answer)
+
+        with transaction.atomic(using=self.db):
+            SittingAnswer.objects.filter(pk__in=dropped).delete()
+            SittingAnswer.objects.bulk_update(graded, ["position", "correct"], batch_size=1000)
+            self.filter(complete=False).bulk_update(
+                sittings.values(),
+                ["cursor", "current_score", "complete", "end", "question_order"],
+                batch_size=1000,
+            )
+
     def user_sitting(self, user, quiz, course):
         if (
             quiz.single_attempt
@@ -249,6 +500,7 @@ class SittingManager(models.Manager):
         try:
             sitting = self.get(user=user, quiz=quiz,
                                course=course, complete=False)
+            sitting.quiz, sitting.course = quiz, course
         except Sitting.DoesNotExist:
             sitting = self.new_sitting(user, quiz, course)
         except Sitting.MultipleObjectsReturned:
@@ -259,6 +511,16 @@ class SittingManager(models.Manager):
 
 
 class Sitting(models.Model):
+    """
+    One attempt of a user at a quiz. Its questions are asked in quiz order,
+    or in the permutation (and for pool quizzes, the draw) derived from
+    ``seed`` (sittings started before seeds keep an explicit
+    ``question_order``), and
+    ``cursor`` is the position of the next question to answer. The answers
+    themselves are SittingAnswer rows, so recording one is a single insert
+    whatever the length of the quiz.
+    """
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, verbose_name=_("User"), on_delete=models.CASCADE
     )
@@ -267,27 +529,19 @@ class Sitting(models.Model):
     course = models.ForeignKey(
         Course, verbose_name=_("Course"), on_delete=models.CASCADE
     )
-    question_order = models.CharField(
-        max_length=1024,
-        verbose_name=_("Question Order"),
-        validators=[validate_comma_separated_integer_list],
-    )
-    question_list = models.CharField(
-        max_length=1024,
-        verbose_name=_("Question List"),
-        validators=[validate_comma_separated_integer_list],
-    )
-    incorrect_questions = models.CharField(
-        max_length=1024,
+    question_order = models.TextField(
         blank=True,
-        verbose_name=_("Incorrect questions"),
+        verbose_name=_("Question Order"),
         validators=[validate_comma_separated_integer_list],
     )
+    seed = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("Seed"))
+    cursor = models.PositiveIntegerField(default=0, verbose_name=_("Cursor"))
+    # Last autosave batch applied and when the client was last heard from
+    last_seq = models.PositiveIntegerField(default=0, verbose_name=_("Last autosave"))
+    heartbeat = models.DateTimeField(null=True, blank=True, verbose_name=_("Heartbeat"))
+    deadline = models.DateTimeField(null=True, blank=True, verbose_name=_("Deadline"))
     current_score = models.IntegerField(verbose_name=_("Current Score"))
     complete = models.BooleanField(default=False, verbose_name=_("Complete"))
-    user_answers = models.TextField(
-        blank=True, default="{}", verbose_name=_("User Answers")
-    )
     start = models.DateTimeField(auto_now_add=True, verbose_name=_("Start"))
     end = models.DateTimeField(null=True, blank=True, verbose_name=_("End"))
 
@@ -295,31 +549,94 @@ class Sitting(models.Model):
 
     class Meta:
         permissions = (("view_sittings", _("Can see completed exams.")),)
+        indexes = [
+            models.Index(
+                fields=["user", "quiz", "course", "complete"], name="sitting_user_quiz"
+            ),
+            models.Index(fields=["complete", "deadline"], name="sitting_deadline"),
+        ]
+
+    def _question_ids(self):
+        if not hasattr(self, "_cached_question_ids"):
+            if self.question_order:
+                question_ids = [int(q) for q in self.question_order.split(",") if q]
+            else:
+                question_ids = self._snapshot().question_order(
+                    self.seed,
+                    count=self.quiz.draw_count,
+                    stratify_by=self.quiz.stratify_by,
+                    shuffle=self.quiz.random_order,
+                )
+            self._cached_question_ids = question_ids
+        return self._cached_question_ids
+
+    def pin_question_order(self):
+        """
+        Store the question order derived from the seed in ``question_order``
+        so that later edits of the quiz no longer change this sitting's
+        questions: on completion, and before an edit of an in-progress one.
+        """
+        if not self.question_order:
+            self.question_order = ",".join(map(str, self._question_ids())) + ","
+
+    def _remaining_question_ids(self):
+        """
+        The ids of the questions still to answer. A derived order holds only
+        while the quiz is unchanged: once it was edited after this sitting
+        started, skip what was answered rather than trusting the cursor.
+        """
+        question_ids = self._question_ids()
+        if self._order_changed():
+            answers = self._answers()
+            return [q for q in question_ids if q not in answers]
+        return question_ids[self.cursor:]
+
+    def _order_changed(self):
+        """Whether the quiz was edited since this unpinned sitting started."""
+        return not self.question_order and self.quiz.timestamp > self.start
+
+    def _answers(self):
+        """This sitting's answers by question id, loaded once."""
+        if not hasattr(self, "_answers_cache"):
+            self._answers_cache = {answer.question_id: answer for answer in self.answers.all()}
+        return self._answers_cache
+
+    def _snapshot(self):
+        from .snapshot import get_quiz_snapshot
+
+        return get_quiz_snapshot(self.quiz)
+
+    def _with_choice_seed(self, question):
+        # Random choice orders are derived per sitting and question, so a
+        # reload shows the choices in the same order
+        seed = self.seed if self.seed is not None else self.pk
+        question.choice_seed = f"{seed}:{question.id}"
+        return question
 
     def get_first_question(self):
-        if not self.question_list:
+        remaining = self._remaining_question_ids()
+        if not remaining:
             return False
-        first_question_id = int(self.question_list.split(",", 1)[0])
-        return Question.objects.get_subclass(id=first_question_id)
+        question = self._snapshot().get_question(remaining[0])
+        if question is None:
+            # Removed from the quiz after this sitting started
+            question = Question.objects.get_subclass(id=remaining[0])
+        return self._with_choice_seed(question)
 
     def remove_first_question(self):
-        if not self.question_list:
+        if not self._remaining_question_ids():
             return
-        _, remaining_questions = self.question_list.split(",", 1)
-        self.question_list = remaining_questions
-        self.save()
+        self.cursor += 1
+        self.save(update_fields=["cursor"])
 
     def add_to_score(self, points):
         self.current_score += int(points)
-        self.save()
+        self.save(update_fields=["current_score"])
 
     @property
     def get_current_score(self):
         return self.current_score
 
-    def _question_ids(self):
-        return [int(q) for q in self.question_order.split(",") if q]
-
     @property
     def get_percent_correct(self):
         total_questions = len(self._question_ids())
@@ -328,38 +645,86 @@ class Sitting(models.Model):
         percent = (self.current_score / total_questions) * 100
         return min(max(int(round(percent)), 0), 100)
 
-    def mark_quiz_complete(self):
-        from django.utils import timezone
+    def start_clock(self):
+        """
+        Set the deadline of a timed quiz's sitting made ahead of time by
+        pregenerate, once, when the student first opens it.
+        """
+        if self.deadline is None and self.quiz.time_limit:
+            self.deadline = Sitting.objects.new_deadline(self.quiz)
+            Sitting.objects.filter(pk=self.pk, deadline__isnull=True).update(
+                deadline=self.deadline
+            )
+
+    @property
+    def expired(self):
+        """Whether the deadline and its grace period have passed."""
+        if self.deadline is None:
+            return False
+        return now() > self.deadline + timedelta(seconds=settings.QUIZ_DEADLINE_GRACE)
+
+    @property
+    def seconds_left(self):
+        if self.deadline is None:
+            return None
+        return max(0, int((self.deadline - now()).total_seconds()))
+
+    def expire(self):
+        """Complete the sitting after its deadline with what was answered in time."""
+        if self.quiz.single_page:
+            self.submit_answers(
+                {question_id: answer.answer for question_id, answer in self._answers().items()}
+            )
+        else:
+            self.mark_quiz_complete()
+
+    def mark_quiz_complete(self, save=True):
         self.complete = True
-        self.end = timezone.now()
+        self.end = now()
+        self.pin_question_order()
         
         # Make sure the quiz is set to exam_paper=True to store the result
         if not self.quiz.exam_paper:
             self.quiz.exam_paper = True
             self.quiz.save()
         
-        # Ensure the sitting is saved properly
-        self.save()
+        if save:
+            self.save(update_fields=["complete", "end", "question_order"])
 
     def add_incorrect_question(self, question):
-        incorrect_ids = self.get_incorrect_questions
-        incorrect_ids.append(question.id)
-        self.incorrect_questions = ",".join(map(str, incorrect_ids)) + ","
-        if self.complete:
-            self.add_to_score(-1)
-        self.save()
+        """Mark ``question`` incorrect, taking its point back if it had one."""
+        question_ids = self._question_ids()
+        if question.id not in question_ids:
+            # Not asked in this sitting: nothing to mark
+            return
+        answer = self._answers().get(question.id)
+        if answer is None:
+            # Unanswered questions are incorrect without a row; keep the
+            # marking so that it shows up in the incorrect list
+            self._answers_cache[question.id] = SittingAnswer.objects.create(
+                sitting=self,
+                question=question,
+                position=question_ids.index(question.id),
+                answer="",
+                correct=False,
+            )
+        elif answer.correct:
+            answer.correct = False
+            answer.save(update_fields=["correct"])
+            if self.complete:
+                self.add_to_score(-1)
 
     @property
     def get_incorrect_questions(self):
-        return [int(q) for q in self.incorrect_questions.split(",") if q]
+        answers = sorted(self._answers().values(), key=lambda answer: answer.position)
+        return [answer.question_id for answer in answers if not answer.correct]
 
     def remove_incorrect_question(self, question):
-        incorrect_ids = self.get_incorrect_questions
-        if question.id in incorrect_ids:
-            incorrect_ids.remove(question.id)
-            self.incorrect_questions = ",".join(map(str, incorrect_ids)) + ","
+        answer = self._answers().get(question.id)
+        if answer is not None and not answer.correct:
+            answer.correct = True
+            answer.save(update_fields=["correct"])
             self.add_to_score(1)
-            self.save()
 
     @property
     def check_if_passed(self):
@@ -372,40 +737,117 @@ class Sitting(models.Model):
         else:
             return _("You failed this quiz, try again.")
 
-    def add_user_answer(self, question, guess):
-        user_answers = json.loads(self.user_answers)
-        user_answers[str(question.id)] = guess
-        self.user_answers = json.dumps(user_answers)
-        self.save()
+    def add_user_answer(self, question, guess, correct=False):
+        """Record the answer to the current question with one insert."""
+        answer = SittingAnswer.objects.create(
+            sitting=self,
+            question=question,
+            position=self.cursor,
+            answer=str(guess),
+            correct=correct,
+        )
+        if hasattr(self, "_answers_cache"):
+            self._answers_cache[question.id] = answer
+        return answer
+
+    def record_answer(self, question, guess, correct):
+        """
+        Answer the current question as one unit of work: the score, cursor
+        and (after the last question) completion are applied in memory and
+        written with a single UPDATE next to the answer's INSERT. The UPDATE
+        only matches while the cursor is still where this request read it;
+        when another request (a double click, a retry) answered the question
+        first, nothing is written, the sitting is reloaded and None returned.
+        """
+        cursor = self.cursor
+        answer = SittingAnswer(
+            sitting=self,
+            question=question,
+            position=cursor,
+            answer=str(guess),
+            correct=correct,
+        )
+        if hasattr(self, "_answers_cache") or self._order_changed():
+            self._answers()[question.id] = answer
+        fields = ["cursor"]
+        self.cursor += 1
+        if correct:
+            self.current_score += 1
+            fields.append("current_score")
+        if not self._remaining_question_ids():
+            self.mark_quiz_complete(save=False)
+            fields += ["complete", "end", "question_order"]
+
+        with transaction.atomic():
+            claimed = Sitting.objects.filter(
+                pk=self.pk, cursor=cursor, complete=False
+            ).update(**{field: getattr(self, field) for field in fields})
+            if claimed:
+                answer.save()
+        if not claimed:
+            self.__dict__.pop("_answers_cache", None)
+            self.refresh_from_db(
+                fields=["cursor", "current_score", "complete", "end", "question_order"]
+            )
+            return None
+        return answer
+
+    def submit_answers(self, answers):
+        """
+        Grade the answers of a single-page sitting ({question id: guess})
+        against the answer key in one pass and complete it: the graded
+        answers replace any drafts with one bulk insert and the score is
+        written with one UPDATE. Blank answers and answers to questions
+        outside the sitting are left out.
+        """
+        question_ids = self._question_ids()
+        answers = {
+            question_id: str(answers[question_id])
+            for question_id in question_ids
+            if answers.get(question_id) not in (None, "")
+        }
+        graded = self._snapshot().answer_key.grade(answers)
+        rows = [
+            SittingAnswer(
+                sitting=self,
+                question_id=question_id,
+                position=position,
+                answer=answers[question_id],
+                correct=graded[question_id],
+            )
+            for position, question_id in enumerate(question_ids)
+            if question_id in answers
+        ]
+        self.current_score = sum(graded.values())
+        self.cursor = len(question_ids)
+        self.mark_quiz_complete(save=False)
+        with transaction.atomic():
+            self.answers.all().delete()
+            SittingAnswer.objects.bulk_create(rows)
+            self.save(
+                update_fields=["cursor", "current_score", "complete", "end", "question_order"]
+            )
+        self._answers_cache = {row.question_id: row for row in rows}
 
     def get_questions(self, with_answers=False):
-        # Cache question ids to avoid repeated calls to _question_ids()
-        if not hasattr(self, '_cached_question_ids'):
-            self._cached_question_ids = self._question_ids()
-        question_ids = self._cached_question_ids
-        
-        # Cache the questions to avoid repeated DB queries
+        # Questions of the sitting still in the quiz, in the sitting's order
         if not hasattr(self, '_questions_cache'):
-            # Use prefetch_related to optimize related model loading
-            questions = list(self.quiz.question_set.filter(
-                id__in=question_ids).select_subclasses())
-                
-            # Sort questions in memory rather than in the database
-            question_dict = {q.id: q for q in questions}
-            self._questions_cache = [question_dict[qid] for qid in question_ids if qid in question_dict]
+            self._questions_cache = [
+                self._with_choice_seed(question)
+                for question in self._snapshot().get_questions(self._question_ids())
+            ]
         
         questions = self._questions_cache
         
         # Process user answers if needed
         if with_answers:
-            # Parse JSON only once
-            if not hasattr(self, '_user_answers_cache'):
-                self._user_answers_cache = json.loads(self.user_answers)
+            answers = self._answers()
             
             # Make a copy of the questions to avoid modifying the cache
             questions = list(questions)
             for question in questions:
-                question.user_answer = self._user_answers_cache.get(str(question.id))
+                answer = answers.get(question.id)
+                question.user_answer = answer.answer if answer else None
                 
         return questions
 
@@ -418,9 +860,66 @@ class Sitting(models.Model):
         return len(self._question_ids())
 
     def progress(self):
-        answered = len(json.loads(self.user_answers))
-        total = self.get_max_score
-        return answered, total
+        return self.cursor, self.get_max_score
+
+
+class SittingAnswerManager(models.Manager):
+    def save_drafts(self, sitting_id, answers):
+        """
+        Insert or overwrite the ungraded drafts ({question id: guess}) of a
+        single-page sitting with one INSERT ... ON CONFLICT statement.
+        Their positions are assigned when the sitting is submitted.
+        """
+        if not answers:
+            return 0
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        sitting, question, position, answer, correct = (
+            qn(opts.get_field(name).column)
+            for name in ("sitting", "question", "position", "answer", "correct")
+        )
+        rows = ", ".join(["(%s, %s, %s, %s, %s)"] * len(answers))
+        params = []
+        for question_id, guess in answers.items():
+            params += [sitting_id, question_id, 0, str(guess), False]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {qn(opts.db_table)} "
+                f"({sitting}, {question}, {position}, {answer}, {correct}) VALUES {rows} "
+                f"ON CONFLICT ({sitting}, {question}) DO UPDATE SET {answer} = excluded.{answer}",
+                params,
+            )
+        return len(answers)
+
+
+class SittingAnswer(models.Model):
+    """The answer given to one question of a sitting, appended as it comes in."""
+
+    sitting = models.ForeignKey(
+        Sitting, related_name="answers", verbose_name=_("Sitting"), on_delete=models.CASCADE
+    )
+    question = models.ForeignKey(
+        "Question", verbose_name=_("Question"), on_delete=models.CASCADE
+    )
+    # Index of the question in the sitting's question order (0 for drafts)
+    position = models.PositiveIntegerField(verbose_name=_("Position"))
+    answer = models.TextField(blank=True, verbose_name=_("Answer"))
+    correct = models.BooleanField(default=False, verbose_name=_("Correct"))
+
+    objects = SittingAnswerManager()
+
+    class Meta:
+        verbose_name = _("Sitting answer")
+        verbose_name_plural = _("Sitting answers")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sitting", "question"], name="unique_sitting_answer"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sitting_id}: {self.question_id} = {self.answer}"
 
 
 class Question(models.Model):
@@ -443,6 +942,18 @@ class Question(models.Model):
             "Explanation to be shown after the question has been answered."),
         verbose_name=_("Explanation"),
     )
+    tag = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name=_("Tag"),
+        help_text=_("Topic of the question, used to stratify random draws."),
+    )
+    difficulty = models.CharField(
+        max_length=10,
+        choices=DIFFICULTY_OPTIONS,
+        blank=True,
+        verbose_name=_("Difficulty"),
+    )
 
     objects = InheritanceManager()
 
@@ -469,7 +980,12 @@ class MCQuestion(Question):
         verbose_name = _("Multiple Choice Question")
         verbose_name_plural = _("Multiple Choice Questions")
 
+    # Questions handed out by a Sitting carry the quiz's ``answer_key`` and
+    # answer from it; the queries below serve questions loaded elsewhere.
+
     def check_if_correct(self, guess):
+        if hasattr(self, "answer_key"):
+            return self.answer_key.question(self.id).is_correct(guess)
         try:
             answer = Choice.objects.get(id=int(guess))
             return answer.correct
@@ -480,17 +996,26 @@ class MCQuestion(Question):
         if self.choice_order == "content":
             return queryset.order_by("choice_text")
         elif self.choice_order == "random":
-            return queryset.order_by("?")
+            # Shuffle in Python: no per-render random sort in the database
+            choices = list(queryset)
+            random.Random(getattr(self, "choice_seed", None)).shuffle(choices)
+            return choices
         else:
             return queryset
 
     def get_choices(self):
+        if hasattr(self, "answer_key"):
+            return self.answer_key.question(self.id).ordered_choices(
+                getattr(self, "choice_seed", None)
+            )
         return self.order_choices(Choice.objects.filter(question=self))
 
     def get_choices_list(self):
         return [(choice.id, choice.choice_text) for choice in self.get_choices()]
 
     def answer_choice_to_string(self, guess):
+        if hasattr(self, "answer_key"):
+            return self.answer_key.question(self.id).choice_text(guess)
         try:
             return Choice.objects.get(id=int(guess)).choice_text
         except (Choice.DoesNotExist, ValueError):
@@ -537,3 +1062,95 @@ class EssayQuestion(Question):
     def answer_choice_to_string(self, guess):
         return str(guess)
 
+
+# ########################################################
+# Answer key versioning
+# ########################################################
+
+
+def touch_quizzes(question_ids):
+    """
+    Move the timestamp of the quizzes of ``question_ids`` forward, which
+    retires their cached answer keys (see quiz.answer_key).
+    """
+    Quiz.objects.filter(question__in=question_ids).update(timestamp=now())
+
+
+PIN_BATCH_SIZE = 1000
+
+
+def pin_sittings(quiz_ids):
+    """
+    Pin the question order of the sittings of ``quiz_ids`` that only store
+    a seed (see Sitting.pin_question_order), before their questions or draw
+    settings change. Runs ahead of the change, so the orders are derived
+    from the quizzes as the sittings saw them. Completed sittings were
+    pinned when they completed; the rest is updated in chunks.
+    """
+    pending = (
+        Sitting.objects.filter(quiz__in=quiz_ids, question_order="", complete=False)
+        .select_related("quiz")
+        .order_by("pk")
+    )
+    last_pk = 0
+    while True:
+        sittings = list(pending.filter(pk__gt=last_pk)[:PIN_BATCH_SIZE])
+        if not sittings:
+            return
+        for sitting in sittings:
+            sitting.pin_question_order()
+        Sitting.objects.bulk_update(sittings, ["question_order"])
+        last_pk = sittings[-1].pk
+
+
+@receiver(pre_save, sender=Quiz)
+def quiz_draw_changed(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old = Quiz.objects.filter(pk=instance.pk).values(
+        "random_order", "draw_count", "stratify_by"
+    ).first()
+    if old and old != {
+        "random_order": instance.random_order,
+        "draw_count": instance.draw_count,
+        "stratify_by": instance.stratify_by,
+    }:
+        pin_sittings([instance.pk])
+
+
+@receiver(post_save, sender=Choice)
+@receiver(pre_delete, sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    touch_quizzes([instance.question_id])
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=MCQuestion)
+@receiver(post_save, sender=EssayQuestion)
+@receiver(pre_delete, sender=Question)
+@receiver(pre_delete, sender=MCQuestion)
+@receiver(pre_delete, sender=EssayQuestion)
+def question_changed(sender, instance, **kwargs):
+    if kwargs["signal"] is pre_delete:
+        pin_sittings(instance.quiz.values("pk"))
+    touch_quizzes([instance.pk])
+
+
+@receiver(m2m_changed, sender=Question.quiz.through)
+def question_quizzes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_add", "pre_remove", "pre_clear"):
+        if reverse:
+            pin_sittings([instance.pk])
+        elif pk_set is None:
+            pin_sittings(instance.quiz.values("pk"))
+        else:
+            pin_sittings(pk_set)
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        Quiz.objects.filter(pk=instance.pk).update(timestamp=now())
+    elif action == "pre_clear":
+        touch_quizzes([instance.pk])
+    else:
+        Quiz.objects.filter(pk__in=pk_set).update(timestamp=now())
+
@@ -0,0 +1,162 @@
+"""
+Immutable per-quiz snapshots for taking quizzes.
+
+When a class starts an exam, every student's first request used to load
+the quiz's questions with their subclasses, and every answer reloaded the
+current question. A QuizSnapshot holds all of it (question ids in order,
+each question's type, text, explanation, figure, tag, difficulty and
+choice order, and the answer key), built with two queries once per quiz
+version and language and then served from this process or the shared
+cache. The version is
+the quiz's ``timestamp``, which question and choice edits move forward
+(see the signals in quiz.models), so an outdated snapshot is never read.
+"""
+
+import random
+import threading
+from collections import OrderedDict
+
+from django.apps import apps
+from django.core.cache import cache
+from django.utils import translation
+
+from .answer_key import build_answer_key
+
+SNAPSHOT_KEY = "quiz:snapshot:{}:{}:{}"
+SNAPSHOT_TIMEOUT = 24 * 60 * 60
+# Per-process copies kept, least recently used dropped first
+SNAPSHOT_LOCAL_SIZE = 256
+
+# Per-process copies: {(quiz id, language): (version, QuizSnapshot)}
+_local = OrderedDict()
+_lock = threading.Lock()
+
+
+class QuizSnapshot:
+    def __init__(self, questions, answer_key):
+        # {question id: (model name, field values)}, in quiz order
+        self.questions = questions
+        self.question_ids = tuple(questions)
+        self.answer_key = answer_key
+
+    def question_order(self, seed=None, count=None, stratify_by="", shuffle=True):
+        """
+        The question ids in the order a sitting asks them: all of them in
+        quiz order without a seed. With one, either the permutation derived
+        from it or, when ``count`` is less than the number of questions, a
+        draw of ``count`` ids made with it, taking from every ``stratify_by``
+        group ("tag" or "difficulty") in proportion to its size. Drawing
+        costs O(count) on the cached id array, whatever the size of the
+        pool. Without ``shuffle`` the ids drawn keep the quiz order.
+        """
+        if seed is None:
+            return list(self.question_ids)
+        rng = random.Random(seed)
+        if not count or count >= len(self.question_ids):
+            question_ids = list(self.question_ids)
+            if shuffle:
+                rng.shuffle(question_ids)
+            return question_ids
+
+        if stratify_by:
+            question_ids = []
+            for ids, quota in self._quotas(stratify_by, count):
+                question_ids += rng.sample(ids, quota)
+        else:
+            question_ids = rng.sample(self.question_ids, count)
+        if shuffle:
+            rng.shuffle(question_ids)
+        else:
+            # question_ids are in primary key order
+            question_ids.sort()
+        return question_ids
+
+    def strata(self, field):
+        """{value of ``field``: question ids}, computed once per snapshot."""
+        cache = self.__dict__.setdefault("_strata", {})
+        if field not in cache:
+            strata = {}
+            for question_id, (model_name, fields) in self.questions.items():
+                strata.setdefault(fields.get(field, ""), []).append(question_id)
+            cache[field] = {value: tuple(ids) for value, ids in sorted(strata.items())}
+        return cache[field]
+
+    def _quotas(self, field, count):
+        # Proportional allocation, rounding by largest remainder
+        strata = self.strata(field)
+        total = len(self.question_ids)
+        quotas = {value: count * len(ids) // total for value, ids in strata.items()}
+        by_remainder = sorted(strata, key=lambda value: -(count * len(strata[value]) % total))
+        for value in by_remainder[: count - sum(quotas.values())]:
+            quotas[value] += 1
+        return [(strata[value], quota) for value, quota in quotas.items() if quota]
+
+    def get_question(self, question_id):
+        """
+        A new instance of the question, built without a query and carrying
+        the answer key, or None if it is not part of the quiz.
+        """
+        entry = self.questions.get(question_id)
+        if entry is None:
+            return None
+        model_name, fields = entry
+        model = apps.get_model("quiz", model_name)
+        if model_name != "question":
+            fields = {**fields, "question_ptr_id": question_id}
+        question = model(id=question_id, **fields)
+        question._state.adding = False
+        question.answer_key = self.answer_key
+        return question
+
+    def get_questions(self, question_ids=None):
+        """Instances of ``question_ids`` (all by default) that are in the quiz."""
+        if question_ids is None:
+            question_ids = self.question_ids
+        questions = (self.get_question(question_id) for question_id in question_ids)
+        return [question for question in questions if question is not None]
+
+
+def build_quiz_snapshot(quiz):
+    from .models import MCQuestion
+
+    questions = {}
+    for question in quiz.question_set.order_by("pk").select_subclasses():
+        fields = {
+            "content": question.content,
+            "explanation": question.explanation,
+            "figure": question.figure.name,
+            "tag": question.tag,
+            "difficulty": question.difficulty,
+        }
+        if isinstance(question, MCQuestion):
+            fields["choice_order"] = question.choice_order
+        questions[question.pk] = (question._meta.model_name, fields)
+    return QuizSnapshot(questions, build_answer_key(quiz))
+
+
+def get_quiz_snapshot(quiz):
+    """
+    Return the QuizSnapshot of ``quiz`` for the active language. Costs no
+    query once this process has it, and one cache lookup when another
+    process built it.
+    """
+    version = quiz.timestamp.isoformat()
+    language = translation.get_language()
+    with _lock:
+        entry = _local.get((quiz.pk, language))
+        if entry is not None and entry[0] == version:
+            _local.move_to_end((quiz.pk, language))
+            return entry[1]
+
+    key = SNAPSHOT_KEY.format(quiz.pk, version, language)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_quiz_snapshot(quiz)
+        cache.set(key, snapshot, timeout=SNAPSHOT_TIMEOUT)
+
+    with _lock:
+        _local[(quiz.pk, language)] = (version, snapshot)
+        _local.move_to_end((quiz.pk, language))
+        while len(_local) > SNAPSHOT_LOCAL_SIZE:
+            _local.popitem(last=False)
+    return snapshot
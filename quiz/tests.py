@@ -1,3 +1,680 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Student, User
+from course.models import Course, CourseAllocation, Program
+from result.models import TakenCourse
+from quiz.answer_key import get_answer_key
+from quiz.models import Choice, MCQuestion, Progress, Question, Quiz, Sitting, SittingAnswer
+from quiz import snapshot
+from quiz.snapshot import get_quiz_snapshot
+
+
+def create_quiz(course, questions, **kwargs):
+    quiz = Quiz.objects.create(course=course, title=f"Quiz {questions}", **kwargs)
+    for i in range(questions):
+        question = MCQuestion.objects.create(content=f"Question {i}")
+        question.quiz.add(quiz)
+        Choice.objects.bulk_create(
+            [
+                Choice(question=question, choice_text="Right", correct=True),
+                Choice(question=question, choice_text="Wrong", correct=False),
+            ]
+        )
+    return quiz
+
+
+def writes(captured):
+    return [
+        query["sql"].split(" (")[0].split(" SET")[0].split(" WHERE")[0]
+        for query in captured
+        if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+    ]
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    TRAFFIC_ANALYTICS_ENABLED=False,
+)
+class QuizTestCase(TestCase):
+    """A course and a logged-in student, shared by the quiz test cases."""
+
+    def setUp(self):
+        program = Program.objects.create(title="Science")
+        self.course = Course.objects.create(
+            program=program, title="Physics", code="PHY101", level="High School"
+        )
+        self.user = User.objects.create_user(
+            username="student", password="password", is_student=True
+        )
+        self.client.force_login(self.user)
+
+
+class QuizTakeTestCase(QuizTestCase):
+    def take_url(self, quiz):
+        return reverse("quiz_take", kwargs={"pk": self.course.pk, "slug": quiz.slug})
+
+    def answer(self, quiz, correct=True):
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz, complete=False)
+        question = sitting.get_first_question()
+        choice = Choice.objects.get(question=question, correct=correct)
+        return self.client.post(self.take_url(quiz), {"answers": choice.pk})
+
+    def test_answers_are_stored_as_rows(self):
+        quiz = create_quiz(self.course, 3, exam_paper=True)
+        self.client.get(self.take_url(quiz))
+        self.answer(quiz, correct=True)
+        self.answer(quiz, correct=False)
+
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz)
+        self.assertEqual(sitting.progress(), (2, 3))
+        self.assertEqual(sitting.current_score, 1)
+        answers = list(sitting.answers.order_by("position"))
+        self.assertEqual([answer.correct for answer in answers], [True, False])
+        self.assertEqual(sitting.get_incorrect_questions, [answers[1].question_id])
+
+        response = self.answer(quiz, correct=True)
+        self.assertTemplateUsed(response, "quiz/result.html")
+        sitting.refresh_from_db()
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.current_score, 2)
+        self.assertEqual(len(sitting.questions_with_user_answers), 3)
+
+    def test_answer_cost_does_not_depend_on_quiz_length(self):
+        counts = []
+        for length in (10, 500):
+            quiz = create_quiz(self.course, length, exam_paper=True)
+            self.client.get(self.take_url(quiz))
+            self.answer(quiz)
+            with CaptureQueriesContext(connection) as captured:
+                self.answer(quiz)
+            counts.append(len(captured))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(SittingAnswer.objects.count(), 4)
+
+    def test_marking_toggles_answers(self):
+        quiz = create_quiz(self.course, 2, exam_paper=True)
+        self.client.get(self.take_url(quiz))
+        self.answer(quiz, correct=True)
+        self.answer(quiz, correct=True)
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz)
+        first, second = sitting.get_questions()
+
+        sitting.add_incorrect_question(first)
+        self.assertEqual(sitting.current_score, 1)
+        self.assertEqual(sitting.get_incorrect_questions, [first.id])
+        sitting.remove_incorrect_question(first)
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.current_score, 2)
+        self.assertFalse(sitting.answers.filter(correct=False).exists())
+
+    def test_marking_ignores_questions_of_other_sittings(self):
+        quiz = create_quiz(self.course, 1, exam_paper=True)
+        other = create_quiz(self.course, 1)
+        self.client.get(self.take_url(quiz))
+        self.answer(quiz, correct=True)
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz)
+        lecturer = User.objects.create_user(
+            username="lecturer", password="password", is_lecturer=True
+        )
+        self.client.force_login(lecturer)
+        url = reverse("quiz_marking_detail", kwargs={"pk": sitting.pk})
+
+        response = self.client.post(url, {"qid": other.question_set.get().pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(sitting.answers.filter(correct=False).exists())
+        response = self.client.post(url, {"qid": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_exam_start_is_served_from_the_snapshot(self):
+        """A class opening an exam at once loads its questions only once."""
+        quiz = create_quiz(self.course, 20, exam_paper=True, random_order=True)
+        students = User.objects.bulk_create(
+            User(username=f"examinee{i}", is_student=True) for i in range(40)
+        )
+        cache.clear()
+
+        per_student = []
+        with CaptureQueriesContext(connection) as captured:
+            for student in students:
+                self.client.force_login(student)
+                start = len(captured)
+                response = self.client.get(self.take_url(quiz))
+                self.assertContains(response, "Right")
+                per_student.append(len(captured) - start)
+
+        question_queries = [
+            query
+            for query in captured
+            if '"quiz_question"' in query["sql"] or '"quiz_choice"' in query["sql"]
+        ]
+        # The first student builds the snapshot, everyone else reuses it
+        self.assertEqual(len(question_queries), 2)
+        self.assertEqual(per_student[0], per_student[1] + 2)
+        self.assertEqual(len(set(per_student[1:])), 1)
+        seeds = set(Sitting.objects.filter(quiz=quiz).values_list("seed", flat=True))
+        self.assertGreater(len(seeds), 1)
+
+    @mock.patch("quiz.snapshot.SNAPSHOT_LOCAL_SIZE", 2)
+    def test_process_keeps_the_recently_used_snapshots(self):
+        first, second, third = (create_quiz(self.course, 1) for _ in range(3))
+        for quiz in (first, second, first, third):
+            get_quiz_snapshot(quiz)
+        self.assertEqual([pk for pk, language in snapshot._local], [first.pk, third.pk])
+
+    def test_order_is_derived_from_the_seed(self):
+        quiz = create_quiz(self.course, 8, exam_paper=True, random_order=True)
+        MCQuestion.objects.filter(quiz=quiz).update(choice_order="random")
+        cache.clear()
+        self.client.get(self.take_url(quiz))
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz)
+        self.assertEqual(sitting.question_order, "")
+        self.assertIsNotNone(sitting.seed)
+
+        def shown():
+            reloaded = Sitting.objects.get(pk=sitting.pk)
+            return [
+                (question.id, [choice.id for choice in question.get_choices()])
+                for question in reloaded.get_questions()
+            ]
+
+        with CaptureQueriesContext(connection) as captured:
+            first = shown()
+        self.assertEqual(first, shown())
+        self.assertFalse([query for query in captured if "RANDOM()" in query["sql"]])
+
+        other = Sitting(pk=sitting.pk, quiz=quiz, seed=sitting.seed + 1)
+        self.assertCountEqual(other._question_ids(), sitting._question_ids())
+        self.assertEqual(
+            Sitting(quiz=quiz, seed=sitting.seed)._question_ids(), sitting._question_ids()
+        )
+
+    def test_quiz_edit_after_completion_keeps_the_sitting(self):
+        quiz = create_quiz(self.course, 3, exam_paper=True, random_order=True)
+        self.client.get(self.take_url(quiz))
+        for _ in range(3):
+            self.answer(quiz)
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz)
+        order = sitting._question_ids()
+        self.assertEqual(sitting.get_percent_correct, 100)
+
+        added = MCQuestion.objects.create(content="Added later")
+        added.quiz.add(quiz)
+        quiz.random_order = False
+        quiz.save()
+        sitting = Sitting.objects.get(pk=sitting.pk)
+        self.assertEqual(sitting._question_ids(), order)
+        self.assertEqual(sitting.get_percent_correct, 100)
+        self.assertNotIn(added.pk, [question.pk for question in sitting.get_questions()])
+
+    def test_quiz_edit_keeps_the_questions_in_progress(self):
+        quiz = create_quiz(self.course, 3, exam_paper=True, random_order=True)
+        self.client.get(self.take_url(quiz))
+        self.answer(quiz)
+        added = MCQuestion.objects.create(content="Added later")
+        Choice.objects.create(question=added, choice_text="Right", correct=True)
+        added.quiz.add(quiz)
+
+        for _ in range(2):
+            self.answer(quiz)
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz)
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.answers.count(), 3)
+        self.assertEqual(sitting.progress(), (3, 3))
+        self.assertFalse(sitting.answers.filter(question=added).exists())
+
+    @mock.patch("quiz.models.PIN_BATCH_SIZE", 2)
+    def test_quiz_edit_pins_in_progress_sittings_in_chunks(self):
+        quiz = create_quiz(self.course, 3, exam_paper=True, random_order=True)
+        self.client.get(self.take_url(quiz))
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz)
+        order = sitting._question_ids()
+        completed = Sitting.objects.create(
+            user=self.user, quiz=quiz, course=self.course, seed=1, current_score=0,
+            complete=True,
+        )
+        Sitting.objects.bulk_create(
+            Sitting(user=self.user, quiz=quiz, course=self.course, seed=seed, current_score=0)
+            for seed in range(2, 6)
+        )
+
+        with CaptureQueriesContext(connection) as captured:
+            quiz.random_order = False
+            quiz.save()
+        pins = [
+            query for query in captured
+            if query["sql"].startswith("UPDATE") and "question_order" in query["sql"]
+        ]
+        self.assertEqual(len(pins), 3)
+        self.assertFalse(
+            Sitting.objects.filter(quiz=quiz, complete=False, question_order="").exists()
+        )
+        self.assertEqual(Sitting.objects.get(pk=completed.pk).question_order, "")
+        self.assertEqual(Sitting.objects.get(pk=sitting.pk)._question_ids(), order)
+
+    def test_answer_is_a_single_write(self):
+        quiz = create_quiz(self.course, 5, exam_paper=True)
+        self.client.get(self.take_url(quiz))
+        self.answer(quiz)
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz, complete=False)
+        choice = Choice.objects.get(question=sitting.get_first_question(), correct=True)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.client.post(self.take_url(quiz), {"answers": choice.pk})
+        self.assertEqual(
+            writes(captured),
+            ['UPDATE "quiz_sitting"', 'INSERT INTO "quiz_sittinganswer"'],
+        )
+        self.assertEqual(len(captured), 9)
+        self.assertFalse(
+            [query for query in captured if '"quiz_question"' in query["sql"]]
+            + [query for query in captured if '"quiz_choice"' in query["sql"]]
+        )
+
+    def test_repeated_answer_is_not_recorded_twice(self):
+        quiz = create_quiz(self.course, 2, exam_paper=True)
+        self.client.get(self.take_url(quiz))
+        first = Sitting.objects.get(user=self.user, quiz=quiz)
+        # Two requests that read the sitting before either answered
+        second = Sitting.objects.get(pk=first.pk)
+        second.quiz = first.quiz = quiz
+        question = first.get_first_question()
+
+        self.assertIsNotNone(first.record_answer(question, "1", True))
+        self.assertIsNone(second.record_answer(question, "1", True))
+        self.assertEqual(second.progress(), (1, 2))
+        self.assertEqual(second.current_score, 1)
+        self.assertEqual(SittingAnswer.objects.filter(sitting=first).count(), 1)
+
+    def test_last_answer_completes_in_the_same_update(self):
+        quiz = create_quiz(self.course, 2, exam_paper=True)
+        self.client.get(self.take_url(quiz))
+        self.answer(quiz)
+        sitting = Sitting.objects.get(user=self.user, quiz=quiz, complete=False)
+        choice = Choice.objects.get(question=sitting.get_first_question(), correct=True)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.client.post(self.take_url(quiz), {"answers": choice.pk})
+        self.assertEqual(
+            writes(captured),
+            [
+                'UPDATE "quiz_sitting"',
+                'INSERT INTO "quiz_sittinganswer"',
+                'INSERT INTO "quiz_progress"',
+            ],
+        )
+        sitting.refresh_from_db()
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.current_score, 2)
+        self.assertEqual(self.user.progress.score, f"{quiz},2,2,")
+
+
+class QuestionPoolTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.course, 40, exam_paper=True, draw_count=8)
+        ids = list(MCQuestion.objects.filter(quiz=self.quiz).values_list("pk", flat=True))
+        Question.objects.filter(pk__in=ids[:30]).update(tag="optics", difficulty="easy")
+        Question.objects.filter(pk__in=ids[30:]).update(tag="waves", difficulty="hard")
+        self.quiz.save()
+
+    def test_draw_is_recorded_by_the_seed(self):
+        url = reverse("quiz_take", kwargs={"pk": self.course.pk, "slug": self.quiz.slug})
+        self.client.get(url)
+        sitting = Sitting.objects.get(user=self.user, quiz=self.quiz)
+        drawn = sitting._question_ids()
+        self.assertEqual(sitting.progress(), (0, 8))
+        self.assertEqual(drawn, sorted(drawn))
+        self.assertEqual(Sitting.objects.get(pk=sitting.pk)._question_ids(), drawn)
+
+        for _ in range(8):
+            question = Sitting.objects.get(pk=sitting.pk).get_first_question()
+            choice = Choice.objects.get(question=question, correct=True)
+            response = self.client.post(url, {"answers": choice.pk})
+        self.assertTemplateUsed(response, "quiz/result.html")
+        sitting.refresh_from_db()
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.current_score, 8)
+        self.assertCountEqual(sitting.answers.values_list("question_id", flat=True), drawn)
+
+    def test_draw_survives_pool_edits(self):
+        url = reverse("quiz_take", kwargs={"pk": self.course.pk, "slug": self.quiz.slug})
+        self.client.get(url)
+        sitting = Sitting.objects.get(user=self.user, quiz=self.quiz)
+        drawn = sitting._question_ids()
+
+        removed = Question.objects.filter(quiz=self.quiz).exclude(pk__in=drawn).first()
+        self.quiz.question_set.remove(removed)
+        MCQuestion.objects.create(content="Added later").quiz.add(self.quiz)
+        self.quiz.draw_count = 5
+        self.quiz.save()
+        self.assertEqual(Sitting.objects.get(pk=sitting.pk)._question_ids(), drawn)
+
+    def test_stratified_draw(self):
+        snapshot = get_quiz_snapshot(Quiz.objects.get(pk=self.quiz.pk))
+        tags = dict(Question.objects.values_list("pk", "tag"))
+        draws = set()
+        with self.assertNumQueries(0):
+            for seed in range(20):
+                drawn = snapshot.question_order(seed, count=8, stratify_by="tag")
+                self.assertEqual(len(set(drawn)), 8)
+                self.assertEqual([tags[pk] for pk in drawn].count("waves"), 2)
+                draws.add(tuple(sorted(drawn)))
+        self.assertGreater(len(draws), 1)
+
+        drawn = snapshot.question_order(3, count=5, stratify_by="difficulty")
+        self.assertEqual(len(drawn), 5)
+        self.assertEqual(snapshot.question_order(3, count=5, stratify_by="difficulty"), drawn)
+        # Drawing more than the pool asks every question
+        self.assertEqual(len(snapshot.question_order(3, count=100)), 40)
+
+
+class SinglePageExamTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.course, 30, exam_paper=True, single_page=True)
+        cache.clear()
+        self.url = reverse("quiz_take_page", kwargs={"pk": self.course.pk, "slug": self.quiz.slug})
+        self.choices = {
+            choice.question_id: choice.pk
+            for choice in Choice.objects.filter(question__quiz=self.quiz, correct=True)
+        }
+
+    def test_all_questions_on_one_page(self):
+        take_url = reverse("quiz_take", kwargs={"pk": self.course.pk, "slug": self.quiz.slug})
+        self.assertRedirects(self.client.get(take_url), self.url)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        self.assertContains(response, 'type="radio"', count=60)
+        self.assertFalse([query for query in captured if '"quiz_choice"' in query["sql"]])
+
+    def autosave(self, batch, sitting=None):
+        sitting = sitting or Sitting.objects.get(user=self.user, quiz=self.quiz)
+        return self.client.post(
+            reverse("sitting_autosave", kwargs={"pk": sitting.pk}),
+            json.dumps(batch),
+            content_type="application/json",
+        )
+
+    def test_autosave_batches_apply_once(self):
+        self.client.get(self.url)
+        first, second = list(self.choices)[:2]
+        batch = {"seq": 1, "answers": {first: self.choices[first]}}
+        sitting = Sitting.objects.get(user=self.user, quiz=self.quiz)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.autosave(batch, sitting)
+        self.assertEqual(response.json(), {"applied": True, "seq": 1})
+        self.assertEqual(
+            writes(captured), ['UPDATE "quiz_sitting"', 'INSERT INTO "quiz_sittinganswer"']
+        )
+        self.assertFalse(
+            [
+                query
+                for query in captured
+                if query["sql"].startswith("SELECT") and '"quiz_' in query["sql"]
+            ]
+        )
+
+        # A retry is acknowledged without being applied again
+        self.assertEqual(self.autosave(batch).json(), {"applied": False, "seq": 1})
+        wrong = Choice.objects.get(question_id=first, correct=False)
+        self.autosave({"seq": 2, "answers": {first: wrong.pk, second: self.choices[second]}})
+        self.autosave({"seq": 1, "answers": {first: self.choices[first]}})
+
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.last_seq, 2)
+        self.assertIsNotNone(sitting.heartbeat)
+        self.assertEqual(
+            dict(sitting.answers.values_list("question_id", "answer")),
+            {first: str(wrong.pk), second: str(self.choices[second])},
+        )
+        self.assertFalse(sitting.complete)
+        self.assertContains(self.client.get(self.url), "checked", count=2)
+
+    def test_autosave_heartbeat_and_errors(self):
+        self.client.get(self.url)
+        sitting = Sitting.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(self.autosave({}).status_code, 200)
+        sitting.refresh_from_db()
+        self.assertIsNotNone(sitting.heartbeat)
+
+        self.assertEqual(self.autosave({"answers": {"1": "2"}}).status_code, 400)
+        self.assertEqual(self.autosave({"seq": 1, "answers": {"x": "2"}}).status_code, 400)
+        first = next(iter(self.choices))
+        for answer in (None, [1], {"a": 1}, True):
+            response = self.autosave({"seq": 1, "answers": {first: answer}})
+            self.assertEqual(response.status_code, 400)
+        self.client.force_login(User.objects.create(username="other", is_student=True))
+        self.assertEqual(self.autosave({}, sitting).status_code, 404)
+
+    def test_autosave_ignores_questions_outside_the_sitting(self):
+        self.client.get(self.url)
+        other = create_quiz(self.course, 1)
+        foreign = Question.objects.get(quiz=other)
+        first = next(iter(self.choices))
+        cache.clear()
+        response = self.autosave(
+            {"seq": 1, "answers": {999999: "x", foreign.pk: "1", first: self.choices[first]}}
+        )
+        self.assertEqual(response.json(), {"applied": True, "seq": 1})
+        sitting = Sitting.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(list(sitting.answers.values_list("question_id", flat=True)), [first])
+
+    def test_submission_is_graded_in_one_pass(self):
+        self.client.get(self.url)
+        wrong = Choice.objects.filter(question__quiz=self.quiz, correct=False).first()
+        data = {f"question-{pk}": choice for pk, choice in self.choices.items()}
+        data[f"question-{wrong.question_id}"] = wrong.pk
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(self.url, data)
+        self.assertTemplateUsed(response, "quiz/result.html")
+        self.assertEqual(
+            writes(captured),
+            [
+                'DELETE FROM "quiz_sittinganswer"',
+                'INSERT INTO "quiz_sittinganswer"',
+                'UPDATE "quiz_sitting"',
+                'INSERT INTO "quiz_progress"',
+            ],
+        )
+        sitting = Sitting.objects.get(user=self.user, quiz=self.quiz)
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.current_score, 29)
+        self.assertEqual(sitting.progress(), (30, 30))
+        self.assertEqual(sitting.get_incorrect_questions, [wrong.question_id])
+
+
+@override_settings(QUIZ_DEADLINE_GRACE=10)
+class TimedQuizTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.course, 3, exam_paper=True, time_limit=30)
+        self.url = reverse("quiz_take", kwargs={"pk": self.course.pk, "slug": self.quiz.slug})
+
+    def overdue(self, sittings):
+        Sitting.objects.filter(pk__in=[s.pk for s in sittings]).update(
+            deadline=timezone.now() - timedelta(seconds=11)
+        )
+
+    def test_deadline_is_enforced_on_answers(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'id="quiz-timer"')
+        sitting = Sitting.objects.get(user=self.user, quiz=self.quiz)
+        self.assertAlmostEqual(
+            (sitting.deadline - sitting.start).total_seconds(), 30 * 60, delta=5
+        )
+
+        question = sitting.get_first_question()
+        choice = Choice.objects.get(question=question, correct=True)
+        self.client.post(self.url, {"answers": choice.pk})
+        self.overdue([sitting])
+        sitting.refresh_from_db()
+        choice = Choice.objects.get(question=sitting.get_first_question(), correct=True)
+        response = self.client.post(self.url, {"answers": choice.pk})
+
+        self.assertTemplateUsed(response, "quiz/result.html")
+        sitting.refresh_from_db()
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.answers.count(), 1)
+        self.assertEqual(sitting.current_score, 1)
+
+    def test_pregenerated_clock_starts_when_opened(self):
+        student = Student.objects.create(student=self.user)
+        TakenCourse.objects.create(student=student, course=self.course)
+        Sitting.objects.pregenerate(self.quiz)
+        self.assertIsNone(Sitting.objects.get(user=self.user).deadline)
+        self.client.get(self.url)
+        self.assertIsNotNone(Sitting.objects.get(user=self.user).deadline)
+
+    def test_sweeper_completes_overdue_sittings_in_bulk(self):
+        page_quiz = create_quiz(self.course, 3, single_page=True, time_limit=30)
+        students = User.objects.bulk_create(
+            User(username=f"examinee{i}", is_student=True) for i in range(4)
+        )
+        overdue = [
+            Sitting.objects.new_sitting(students[0], self.quiz, self.course),
+            Sitting.objects.new_sitting(students[1], self.quiz, self.course),
+            Sitting.objects.new_sitting(students[2], page_quiz, self.course),
+        ]
+        running = Sitting.objects.new_sitting(students[3], page_quiz, self.course)
+        Progress.objects.create(user=students[1], score=f"{self.quiz},2,3,")
+        first, second, third = overdue[2]._question_ids()
+        right = Choice.objects.get(question_id=first, correct=True)
+        wrong = Choice.objects.get(question_id=second, correct=False)
+        SittingAnswer.objects.save_drafts(
+            overdue[2].pk, {first: right.pk, second: wrong.pk, third: ""}
+        )
+        self.overdue(overdue)
+
+        response = self.client.post(
+            reverse("sitting_autosave", kwargs={"pk": overdue[2].pk}),
+            "{}",
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 404)
+
+        out = StringIO()
+        call_command("expire_sittings", stdout=out)
+        self.assertIn("Completed 3 expired sittings.", out.getvalue())
+        self.assertEqual(
+            set(Sitting.objects.filter(complete=True).values_list("pk", flat=True)),
+            {sitting.pk for sitting in overdue},
+        )
+        running.refresh_from_db()
+        self.assertFalse(running.complete)
+
+        graded = Sitting.objects.get(pk=overdue[2].pk)
+        self.assertEqual(graded.current_score, 1)
+        self.assertEqual(graded.progress(), (3, 3))
+        self.assertEqual(
+            list(graded.answers.order_by("position").values_list("question_id", "correct")),
+            [(first, True), (second, False)],
+        )
+        self.assertEqual(graded.end, graded.deadline)
+        self.assertTrue(Quiz.objects.get(pk=page_quiz.pk).exam_paper)
+        self.assertEqual(
+            dict(Progress.objects.values_list("user_id", "score")),
+            {
+                students[0].pk: f"{self.quiz},0,3,",
+                students[1].pk: f"{self.quiz},2,6,",
+                students[2].pk: f"{page_quiz},1,3,",
+            },
+        )
+
+
+class AnswerKeyTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.course, 3)
+        cache.clear()
+
+    def test_key_is_loaded_once(self):
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+        # Questions and choices of the quiz snapshot
+        with self.assertNumQueries(2):
+            answer_key = get_answer_key(quiz)
+        with self.assertNumQueries(0):
+            self.assertIs(get_answer_key(quiz), answer_key)
+
+        question = MCQuestion.objects.filter(quiz=quiz).first()
+        right = Choice.objects.get(question=question, correct=True)
+        question.answer_key = answer_key
+        with self.assertNumQueries(0):
+            self.assertTrue(question.check_if_correct(str(right.pk)))
+            self.assertFalse(question.check_if_correct("not a choice"))
+            self.assertEqual(question.answer_choice_to_string(right.pk), "Right")
+            self.assertEqual(
+                [str(choice) for choice in question.get_choices()], ["Right", "Wrong"]
+            )
+
+    def test_key_follows_question_edits(self):
+        question = MCQuestion.objects.filter(quiz=self.quiz).first()
+        wrong = Choice.objects.get(question=question, correct=False)
+        get_answer_key(Quiz.objects.get(pk=self.quiz.pk))
+
+        wrong.correct = True
+        wrong.save()
+        answer_key = get_answer_key(Quiz.objects.get(pk=self.quiz.pk))
+        self.assertTrue(answer_key.question(question.pk).is_correct(wrong.pk))
+
+        other = MCQuestion.objects.create(content="Added later")
+        Choice.objects.create(question=other, choice_text="Yes", correct=True)
+        self.quiz.question_set.add(other)
+        answer_key = get_answer_key(Quiz.objects.get(pk=self.quiz.pk))
+        choice = other.choice_set.get()
+        self.assertEqual(answer_key.question(other.pk).choice_text(choice.pk), "Yes")
+
+
+class PregenerateSittingsTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = create_quiz(self.course, 5, exam_paper=True, random_order=True)
+        self.students = []
+        for i in range(6):
+            user = User.objects.create(username=f"student{i}", is_student=True)
+            student = Student.objects.create(student=user)
+            TakenCourse.objects.create(student=student, course=self.course)
+            self.students.append(user)
+
+    def test_pregenerate_skips_students_with_a_sitting(self):
+        existing = Sitting.objects.new_sitting(self.students[0], self.quiz, self.course)
+        with self.assertNumQueries(2):
+            # Enrolled students without a sitting, one INSERT
+            created = Sitting.objects.pregenerate(self.quiz)
+        self.assertEqual(created, 5)
+        self.assertEqual(Sitting.objects.filter(user=self.students[0]).get(), existing)
+        self.assertEqual(Sitting.objects.pregenerate(self.quiz), 0)
+
+    def test_exam_start_only_reads(self):
+        call_command("pregenerate_sittings", self.quiz.slug, stdout=StringIO())
+        self.client.force_login(self.students[3])
+        url = reverse("quiz_take", kwargs={"pk": self.course.pk, "slug": self.quiz.slug})
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [query for query in captured if query["sql"].startswith(("INSERT", "UPDATE"))]
+        )
+
+    def test_lecturer_action(self):
+        lecturer = User.objects.create(username="lecturer", is_lecturer=True)
+        self.client.force_login(lecturer)
+        url = reverse("quiz_pregenerate", kwargs={"slug": self.course.slug, "pk": self.quiz.pk})
+        self.assertEqual(self.client.post(url).status_code, 403)
+
+        allocation = CourseAllocation.objects.create(lecturer=lecturer)
+        allocation.courses.add(self.course)
+        self.client.post(url)
+        self.assertEqual(Sitting.objects.filter(quiz=self.quiz).count(), 6)
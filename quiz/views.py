@@ -1,3 +1,5 @@
+import json
+
 from .models import (
     Course,
     EssayQuestion,
@@ -8,6 +10,7 @@ from .models import (
     Sitting,
 
 )
+from .snapshot import get_quiz_snapshot
 from .forms import (
     EssayForm,
     MCQuestionForm,
@@ -23,9 +26,13 @@ from django.views.generic import (
     TemplateView,
     UpdateView,
 )
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
 from django.db import transaction
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.views.decorators.http import require_POST
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.decorators import method_decorator
 from django.urls import reverse
@@ -39,6 +46,9 @@ from django.utils.decorators import method_decorator
 from django.contrib import messages
   # Load environment variables from .env file
 
+# Rows of one autosave upsert, within SQLite's 999 query parameters
+AUTOSAVE_MAX_ANSWERS = 100
+
 
 # ########################################################
 # Quiz Views
@@ -101,6 +111,24 @@ def quiz_delete(request, slug, pk):
     return redirect("quiz_index", slug=slug)
 
 
+@login_required
+@lecturer_required
+def quiz_pregenerate_sittings(request, slug, pk):
+    quiz = get_object_or_404(Quiz.objects.select_related("course"), pk=pk)
+    if not (
+        request.user.is_superuser
+        or quiz.course_id in request.academic.allocated_course_ids
+    ):
+        raise PermissionDenied
+    if request.method == "POST":
+        try:
+            count = Sitting.objects.pregenerate(quiz)
+            messages.success(request, f"{count} sittings prepared for {quiz.title}.")
+        except ImproperlyConfigured as e:
+            messages.error(request, str(e))
+    return redirect("quiz_index", slug=slug)
+
+
 @login_required
 def quiz_list(request, slug):
     course = get_object_or_404(Course, slug=slug)
@@ -214,7 +242,7 @@ class QuizMarkingList(ListView):
         queryset = Sitting.objects.filter(complete=True)
         if not self.request.user.is_superuser:
             queryset = queryset.filter(
-                quiz__course__allocated_course__lecturer__pk=self.request.user.id
+                quiz__course_id__in=self.request.academic.allocated_course_query
             )
         quiz_filter = self.request.GET.get("quiz_filter")
         if quiz_filter:
@@ -234,7 +262,10 @@ class QuizMarkingDetail(DetailView):
         sitting = self.get_object()
         question_id = request.POST.get("qid")
         if question_id:
-            question = Question.objects.get_subclass(id=int(question_id))
+            try:
+                question = Question.objects.get_subclass(id=int(question_id))
+            except (ValueError, Question.DoesNotExist):
+                return HttpResponseBadRequest("Unknown question.")
             if int(question_id) in sitting.get_incorrect_questions:
                 sitting.remove_incorrect_question(question)
             else:
@@ -252,16 +283,23 @@ class QuizMarkingDetail(DetailView):
 # ########################################################
 
 
-@method_decorator([login_required], name="dispatch")
-class QuizTake(FormView):
-    form_class = QuestionForm
-    template_name = "quiz/question.html"
+class QuizSittingMixin:
+    """
+    Finds the quiz, the course and the user's sitting for the views that
+    take a quiz, enforces its deadline and renders the result once the
+    sitting is complete.
+    """
+
     result_template_name = "quiz/result.html"
 
-    def dispatch(self, request, *args, **kwargs):
+    def start_sitting(self, request):
+        """
+        Set up the sitting, or return the response to show instead: a
+        redirect when there is none, the result when its time is up.
+        """
         self.quiz = get_object_or_404(Quiz, slug=self.kwargs["slug"])
         self.course = get_object_or_404(Course, pk=self.kwargs["pk"])
-        if not Question.objects.filter(quiz=self.quiz).exists():
+        if not get_quiz_snapshot(self.quiz).question_ids:
             messages.warning(request, "This quiz has no questions available.")
             return redirect("quiz_index", slug=self.course.slug)
 
@@ -275,6 +313,71 @@ class QuizTake(FormView):
             )
             return redirect("quiz_index", slug=self.course.slug)
 
+        self.sitting.start_clock()
+        if self.sitting.expired:
+            # Nothing sent after the deadline is taken
+            messages.warning(
+                request, "Time is up: the quiz was submitted with the answers given in time."
+            )
+            self.sitting.expire()
+            return self.final_result_user()
+        return None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["sitting"] = self.sitting
+        context["deadline_grace"] = settings.QUIZ_DEADLINE_GRACE
+        return context
+
+    def final_result_user(self, record_progress=True):
+        if not self.sitting.complete:
+            self.sitting.mark_quiz_complete()
+        # Progress is updated once per attempt rather than once per answer
+        score, possible = self.sitting.current_score, self.sitting.get_max_score
+        if record_progress:
+            progress, created = Progress.objects.get_or_create(
+                user=self.request.user, defaults={"score": f"{self.quiz},{score},{possible},"}
+            )
+            if not created:
+                progress.update_score(self.quiz, score, possible)
+        results = {
+            "course": self.course,
+            "quiz": self.quiz,
+            "score": self.sitting.get_current_score,
+            "max_score": self.sitting.get_max_score,
+            "percent": self.sitting.get_percent_correct,
+            "sitting": self.sitting,
+            "previous": getattr(self, "previous", {}),
+        }
+
+        if self.quiz.answers_at_end:
+            results["questions"] = self.sitting.get_questions(
+                with_answers=True)
+            results["incorrect_questions"] = self.sitting.get_incorrect_questions
+
+        # Only delete the sitting if it's not an exam paper AND the user is not a superuser or lecturer
+        if (
+            not self.quiz.exam_paper
+            and not self.request.user.is_superuser
+            and not self.request.user.is_lecturer
+        ):
+            self.sitting.delete()
+
+        return render(self.request, self.result_template_name, results)
+
+
+@method_decorator([login_required], name="dispatch")
+class QuizTake(QuizSittingMixin, FormView):
+    form_class = QuestionForm
+    template_name = "quiz/question.html"
+
+    def dispatch(self, request, *args, **kwargs):
+        response = self.start_sitting(request)
+        if response is not None:
+            return response
+        if self.quiz.single_page:
+            return redirect("quiz_take_page", pk=self.course.pk, slug=self.quiz.slug)
+
         # Set self.question and self.progress here
         self.question = self.sitting.get_first_question()
         self.progress = self.sitting.progress()
@@ -292,23 +395,16 @@ class QuizTake(FormView):
         return self.form_class
 
     def form_valid(self, form):
-        self.form_valid_user(form)
-        if not self.sitting.get_first_question():
-            return self.final_result_user()
+        answered = self.form_valid_user(form)
+        if self.sitting.complete:
+            # The request that answered last has recorded the progress
+            return self.final_result_user(record_progress=answered)
         return super().get(self.request)
 
     def form_valid_user(self, form):
-        progress, _ = Progress.objects.get_or_create(user=self.request.user)
         guess = form.cleaned_data["answers"]
         is_correct = self.question.check_if_correct(guess)
 
-        if is_correct:
-            self.sitting.add_to_score(1)
-            progress.update_score(self.question, 1, 1)
-        else:
-            self.sitting.add_incorrect_question(self.question)
-            progress.update_score(self.question, 0, 1)
-
         if not self.quiz.answers_at_end:
             self.previous = {
                 "previous_answer": guess,
@@ -320,12 +416,18 @@ class QuizTake(FormView):
         else:
             self.previous = {}
 
-        self.sitting.add_user_answer(self.question, guess)
-        self.sitting.remove_first_question()
+        # One UPDATE of the sitting and one INSERT for the answer
+        answered = self.sitting.record_answer(self.question, guess, is_correct) is not None
+        if not answered:
+            # Already answered by another request (a double click or a
+            # retry): carry on from where that one left the sitting
+            self.previous = {}
 
         # Update self.question and self.progress for the next question
-        self.question = self.sitting.get_first_question()
+        if not self.sitting.complete:
+            self.question = self.sitting.get_first_question()
         self.progress = self.sitting.progress()
+        return answered
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -338,32 +440,80 @@ class QuizTake(FormView):
             context["progress"] = self.progress
         return context
 
-    def final_result_user(self):
-        self.sitting.mark_quiz_complete()
-        results = {
-            "course": self.course,
-            "quiz": self.quiz,
-            "score": self.sitting.get_current_score,
-            "max_score": self.sitting.get_max_score,
-            "percent": self.sitting.get_percent_correct,
-            "sitting": self.sitting,
-            "previous": getattr(self, "previous", {}),
-        }
 
-        if self.quiz.answers_at_end:
-            results["questions"] = self.sitting.get_questions(
-                with_answers=True)
-            results["incorrect_questions"] = self.sitting.get_incorrect_questions
+@method_decorator([login_required], name="dispatch")
+class QuizTakePage(QuizSittingMixin, TemplateView):
+    """
+    Single-page mode: every question on one page, rendered from the cached
+    quiz snapshot, with the answers autosaved as drafts (see
+    sitting_autosave) and submitted in one POST.
+    """
 
-        # Only delete the sitting if it's not an exam paper AND the user is not a superuser or lecturer
-        if (
-            not self.quiz.exam_paper
-            and not self.request.user.is_superuser
-            and not self.request.user.is_lecturer
-        ):
-            self.sitting.delete()
+    template_name = "quiz/exam.html"
 
-        return render(self.request, self.result_template_name, results)
+    def dispatch(self, request, *args, **kwargs):
+        response = self.start_sitting(request)
+        if response is not None:
+            return response
+        if not self.quiz.single_page:
+            return redirect("quiz_take", pk=self.course.pk, slug=self.quiz.slug)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["quiz"] = self.quiz
+        context["course"] = self.course
+        # For sitting_autosave, which checks the answers against them
+        Sitting.objects.cache_question_ids(self.sitting)
+        context["questions"] = [
+            {
+                "question": question,
+                "choices": question.get_choices() if isinstance(question, MCQuestion) else None,
+            }
+            for question in self.sitting.get_questions(with_answers=True)
+        ]
+        return context
+
+    def post(self, request, *args, **kwargs):
+        answers = {}
+        for key, value in request.POST.items():
+            if key.startswith("question-") and key[9:].isdigit():
+                answers[int(key[9:])] = value.strip()
+        self.sitting.submit_answers(answers)
+        return self.final_result_user()
+
+
+@login_required
+@require_POST
+def sitting_autosave(request, pk):
+    """
+    Autosave and heartbeat of a single-page sitting. Takes a JSON body
+    {"seq": n, "answers": {question id: answer}}, or {} for a heartbeat
+    alone. Each batch is applied once and only if its seq is above the last
+    one applied, so clients can resend freely. Answers to questions that
+    are not part of the sitting are ignored. Loads neither the sitting nor
+    its quiz and renders no template: one UPDATE and one upsert.
+    """
+    try:
+        data = json.loads(request.body)
+        seq = data.get("seq")
+        answers = {}
+        for question_id, answer in (data.get("answers") or {}).items():
+            if isinstance(answer, bool) or not isinstance(answer, (str, int)):
+                raise ValueError
+            answers[int(question_id)] = str(answer)
+        if answers and (not isinstance(seq, int) or seq < 1):
+            raise ValueError
+    except (AttributeError, TypeError, ValueError):
+        return JsonResponse({"error": "Invalid autosave batch."}, status=400)
+    if len(answers) > AUTOSAVE_MAX_ANSWERS:
+        return JsonResponse({"error": "Too many answers in one batch."}, status=400)
+
+    try:
+        applied, seq = Sitting.objects.autosave(pk, request.user, seq, answers)
+    except Sitting.DoesNotExist:
+        return JsonResponse({"error": "No quiz in progress."}, status=404)
+    return JsonResponse({"applied": applied, "seq": seq})
 
 
 @login_required
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
 
-from .models import TakenCourse, Result
+from .models import CourseStats, TakenCourse, Result
 
 
 class ScoreAdmin(admin.ModelAdmin):
@@ -19,5 +19,11 @@ class ScoreAdmin(admin.ModelAdmin):
     ]
 
 
+class CourseStatsAdmin(admin.ModelAdmin):
+    list_display = ["course", "enrollments", "pass_count", "average_total", "updated_at"]
+    ordering = ["-enrollments"]
+
+
 admin.site.register(TakenCourse, ScoreAdmin)
+admin.site.register(CourseStats, CourseStatsAdmin)
 admin.site.register(Result)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from result.models import CourseStats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the per-course enrollment and score statistics from TakenCourse"
+
+    def handle(self, *args, **options):
+        count = CourseStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {count} courses."))
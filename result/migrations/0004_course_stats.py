@@ -0,0 +1,57 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:18
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_course_stats(apps, schema_editor):
+    TakenCourse = apps.get_model("result", "TakenCourse")
+    CourseStats = apps.get_model("result", "CourseStats")
+    stats = {}
+    grouped = (
+        TakenCourse.objects.values("course_id", "grade")
+        .annotate(
+            count=models.Count("pk"),
+            passed=models.Count("pk", filter=models.Q(comment="PASS")),
+            total_sum=models.Sum("total"),
+            point_sum=models.Sum("point"),
+        )
+        .order_by()
+    )
+    for row in grouped:
+        item = stats.setdefault(row["course_id"], CourseStats(course_id=row["course_id"]))
+        item.enrollments += row["count"]
+        item.pass_count += row["passed"]
+        item.total_sum += row["total_sum"] or 0
+        item.point_sum += row["point_sum"] or 0
+        key = row["grade"] or "NG"
+        item.grade_histogram[key] = item.grade_histogram.get(key, 0) + row["count"]
+    CourseStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0017_blob_storage'),
+        ('result', '0003_remove_takencourse_semester'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='course.course')),
+                ('enrollments', models.PositiveIntegerField(db_index=True, default=0)),
+                ('pass_count', models.PositiveIntegerField(default=0)),
+                ('total_sum', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('point_sum', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('grade_histogram', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'course stats',
+            },
+        ),
+        migrations.RunPython(build_course_stats, migrations.RunPython.noop),
+    ]
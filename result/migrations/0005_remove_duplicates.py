@@ -0,0 +1,77 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+from core.utils import merge_duplicates
+
+
+# Scores entered by lecturers; total, grade, point and comment follow them
+TAKEN_COURSE_SCORES = ["assignment", "mid_exam", "quiz", "attendance", "final_exam"]
+
+
+def remove_duplicates(apps, schema_editor):
+    TakenCourse = apps.get_model("result", "TakenCourse")
+    Result = apps.get_model("result", "Result")
+    CourseStats = apps.get_model("result", "CourseStats")
+
+    # Plan both first, so that a conflict stops the migration before any
+    # row is deleted
+    result_merges = merge_duplicates(
+        Result,
+        ["student", "semester", "session", "level"],
+        ["gpa", "cgpa"],
+        lambda row: row["gpa"] is not None or row["cgpa"] is not None,
+    )
+    taken_merges = merge_duplicates(
+        TakenCourse,
+        ["student", "course"],
+        TAKEN_COURSE_SCORES,
+        lambda row: any(row[field] for field in TAKEN_COURSE_SCORES),
+    )
+
+    Result.objects.filter(
+        pk__in=[pk for pks in result_merges.values() for pk in pks]
+    ).delete()
+
+    duplicates = TakenCourse.objects.filter(
+        pk__in=[pk for pks in taken_merges.values() for pk in pks]
+    )
+    course_ids = set(duplicates.values_list("course_id", flat=True))
+    if not course_ids:
+        return
+    duplicates.delete()
+
+    # Recount the affected courses (signals do not run in migrations)
+    CourseStats.objects.filter(course_id__in=course_ids).delete()
+    stats = {}
+    grouped = (
+        TakenCourse.objects.filter(course_id__in=course_ids)
+        .values("course_id", "grade")
+        .annotate(
+            count=models.Count("pk"),
+            passed=models.Count("pk", filter=models.Q(comment="PASS")),
+            total_sum=models.Sum("total"),
+            point_sum=models.Sum("point"),
+        )
+        .order_by()
+    )
+    for row in grouped:
+        item = stats.setdefault(row["course_id"], CourseStats(course_id=row["course_id"]))
+        item.enrollments += row["count"]
+        item.pass_count += row["passed"]
+        item.total_sum += row["total_sum"] or 0
+        item.point_sum += row["point_sum"] or 0
+        key = row["grade"] or "NG"
+        item.grade_histogram[key] = item.grade_histogram.get(key, 0) + row["count"]
+    CourseStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('result', '0004_course_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.8 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('result', '0005_remove_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='takencourse',
+            index=models.Index(fields=['course', 'comment'], name='takencourse_course_comment'),
+        ),
+        migrations.AddConstraint(
+            model_name='result',
+            constraint=models.UniqueConstraint(fields=('student', 'semester', 'session', 'level'), name='unique_result_per_semester'),
+        ),
+        migrations.AddConstraint(
+            model_name='takencourse',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_taken_course'),
+        ),
+    ]
@@ -1,11 +1,19 @@
 from decimal import Decimal
 from django.conf import settings
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
 from django.urls import reverse
 
 from accounts.models import Student
-from core.models import Semester
+from core.academic import get_current_semester
 from course.models import Course
 
 A_PLUS = "A+"
@@ -105,6 +113,16 @@ class TakenCourse(models.Model):
         choices=COMMENT_CHOICES, max_length=200, blank=True, editable=False
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course"], name="unique_taken_course"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["course", "comment"], name="takencourse_course_comment"),
+        ]
+
     def get_absolute_url(self):
         return reverse("course_detail", kwargs={"slug": self.course.slug})
 
@@ -147,7 +165,7 @@ class TakenCourse(models.Model):
         super().save(*args, **kwargs)
 
     def calculate_gpa(self):
-        current_semester = Semester.objects.filter(is_current_semester=True).first()
+        current_semester = get_current_semester()
         if not current_semester:
             return Decimal("0.00")
 
@@ -185,5 +203,172 @@ class Result(models.Model):
     session = models.CharField(max_length=100, blank=True, null=True)
     level = models.CharField(max_length=25, choices=settings.LEVEL_CHOICES, null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "semester", "session", "level"],
+                name="unique_result_per_semester",
+            ),
+        ]
+
     def __str__(self):
         return f"Result for {self.student} - Semester: {self.semester}, Level: {self.level}"
+
+
+# ########################################################
+# Course statistics
+# ########################################################
+
+
+class CourseStats(models.Model):
+    """
+    Enrollment and score totals of a course, kept up to date from
+    TakenCourse signals so that listings read them from one indexed table
+    instead of aggregating TakenCourse. Rebuild with
+    `manage.py rebuild_course_stats` after bulk changes that skip signals.
+    """
+
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    enrollments = models.PositiveIntegerField(default=0, db_index=True)
+    pass_count = models.PositiveIntegerField(default=0)
+    total_sum = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    point_sum = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    # Number of students per grade, e.g. {"A": 3, "B+": 5}
+    grade_histogram = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "course stats"
+
+    def __str__(self):
+        return f"Stats for {self.course}"
+
+    @property
+    def average_total(self):
+        if not self.enrollments:
+            return Decimal("0.00")
+        return round(self.total_sum / self.enrollments, 2)
+
+    @property
+    def fail_count(self):
+        return self.enrollments - self.pass_count
+
+    @classmethod
+    def apply(cls, course_id, rows, sign):
+        """
+        Add (``sign=1``) or remove (``sign=-1``) the stats rows of
+        ``course_id``; each row is a ``(total, point, grade, comment)``
+        tuple of a TakenCourse.
+        """
+        with transaction.atomic():
+            if sign > 0:
+                # Create the row first, so two first enrollments in a course
+                # both wait for the lock below instead of both inserting.
+                cls.objects.bulk_create([cls(course_id=course_id)], ignore_conflicts=True)
+            stats = cls.objects.select_for_update().filter(course_id=course_id).first()
+            if stats is None:
+                # Nothing to remove from, e.g. while the course itself is
+                # being deleted.
+                return
+            histogram = stats.grade_histogram
+            for total, point, grade, comment in rows:
+                stats.enrollments += sign
+                stats.total_sum += sign * Decimal(total)
+                stats.point_sum += sign * Decimal(point)
+                if comment == PASS:
+                    stats.pass_count += sign
+                key = grade or NG
+                histogram[key] = histogram.get(key, 0) + sign
+                if not histogram[key]:
+                    del histogram[key]
+            stats.save()
+
+    @classmethod
+    def record_enrollments(cls, taken_courses):
+        """Count TakenCourse rows created with bulk_create(), which sends no signals."""
+        by_course = {}
+        for taken in taken_courses:
+            taken._stats_row = _stats_row(taken)
+            by_course.setdefault(taken.course_id, []).append(taken._stats_row[1])
+        for course_id, rows in by_course.items():
+            cls.apply(course_id, rows, 1)
+
+    @classmethod
+    def rebuild(cls, course_ids=None):
+        """
+        Recompute the rows of ``course_ids`` (all courses by default) from
+        TakenCourse in one grouped query. Returns the number of rows.
+        """
+        taken_courses = TakenCourse.objects.all()
+        existing = cls.objects.all()
+        if course_ids is not None:
+            taken_courses = taken_courses.filter(course_id__in=course_ids)
+            existing = existing.filter(course_id__in=course_ids)
+        grouped = taken_courses.values("course_id", "grade").annotate(
+            count=models.Count("pk"),
+            passed=models.Count("pk", filter=models.Q(comment=PASS)),
+            total_sum=models.Sum("total"),
+            point_sum=models.Sum("point"),
+        )
+        stats = {}
+        for row in grouped.order_by():
+            item = stats.setdefault(row["course_id"], cls(course_id=row["course_id"]))
+            item.enrollments += row["count"]
+            item.pass_count += row["passed"]
+            item.total_sum += row["total_sum"] or 0
+            item.point_sum += row["point_sum"] or 0
+            key = row["grade"] or NG
+            item.grade_histogram[key] = item.grade_histogram.get(key, 0) + row["count"]
+
+        with transaction.atomic():
+            existing.delete()
+            cls.objects.bulk_create(stats.values(), batch_size=1000)
+        return len(stats)
+
+
+STATS_FIELDS = ["course_id", "total", "point", "grade", "comment"]
+
+
+def _stats_row(taken):
+    return taken.course_id, (taken.total, taken.point, taken.grade, taken.comment)
+
+
+@receiver(post_init, sender=TakenCourse)
+def taken_course_post_init_receiver(sender, instance, **kwargs):
+    if instance.pk is None or set(STATS_FIELDS) & instance.get_deferred_fields():
+        # Reading deferred fields here would cost a query per instance;
+        # they are loaded in pre_save/pre_delete when actually needed.
+        instance._stats_row = None
+    else:
+        instance._stats_row = _stats_row(instance)
+
+
+@receiver(pre_save, sender=TakenCourse)
+@receiver(pre_delete, sender=TakenCourse)
+def taken_course_pre_change_receiver(sender, instance, raw=False, **kwargs):
+    if instance._stats_row is None and instance.pk is not None and not raw:
+        row = TakenCourse.objects.filter(pk=instance.pk).values_list(*STATS_FIELDS).first()
+        if row is not None:
+            instance._stats_row = row[0], tuple(row[1:])
+
+
+@receiver(post_save, sender=TakenCourse)
+def taken_course_post_save_receiver(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = instance._stats_row
+    new = _stats_row(instance)
+    if old != new:
+        if old is not None:
+            CourseStats.apply(old[0], [old[1]], -1)
+        CourseStats.apply(new[0], [new[1]], 1)
+    instance._stats_row = new
+
+
+@receiver(post_delete, sender=TakenCourse)
+def taken_course_post_delete_receiver(sender, instance, **kwargs):
+    if instance._stats_row is not None:
+        CourseStats.apply(instance._stats_row[0], [instance._stats_row[1]], -1)
+        instance._stats_row = None
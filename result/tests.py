@@ -1,3 +1,90 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import Student, User
+from course.models import Course, Program
+from result.models import CourseStats, TakenCourse
+
+
+class CourseStatsTestCase(TestCase):
+    def setUp(self):
+        program = Program.objects.create(title="Science")
+        self.physics = Course.objects.create(
+            program=program, title="Physics", code="PHY101", level="High School"
+        )
+        self.chemistry = Course.objects.create(
+            program=program, title="Chemistry", code="CHE101", level="High School"
+        )
+        self.students = []
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f"student{i}", password="password", is_student=True
+            )
+            self.students.append(Student.objects.create(student=user))
+
+    def assertStatsMatchRebuild(self):
+        incremental = {
+            stats.course_id: (
+                stats.enrollments,
+                stats.pass_count,
+                stats.total_sum,
+                stats.grade_histogram,
+            )
+            for stats in CourseStats.objects.filter(enrollments__gt=0)
+        }
+        CourseStats.rebuild()
+        rebuilt = {
+            stats.course_id: (
+                stats.enrollments,
+                stats.pass_count,
+                stats.total_sum,
+                stats.grade_histogram,
+            )
+            for stats in CourseStats.objects.all()
+        }
+        self.assertEqual(incremental, rebuilt)
+
+    def test_maintained_from_signals(self):
+        first = TakenCourse.objects.create(
+            student=self.students[0], course=self.physics, final_exam=95
+        )
+        TakenCourse.objects.create(
+            student=self.students[1], course=self.physics, final_exam=30
+        )
+        stats = CourseStats.objects.get(course=self.physics)
+        self.assertEqual(stats.enrollments, 2)
+        self.assertEqual(stats.pass_count, 1)
+        self.assertEqual(stats.average_total, Decimal("62.50"))
+        self.assertEqual(stats.grade_histogram, {"A+": 1, "F": 1})
+
+        first.final_exam = 72
+        first.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.grade_histogram, {"B": 1, "F": 1})
+
+        first.course = self.chemistry
+        first.save()
+        self.assertEqual(CourseStats.objects.get(course=self.physics).enrollments, 1)
+        self.assertEqual(CourseStats.objects.get(course=self.chemistry).enrollments, 1)
+
+        TakenCourse.objects.filter(course=self.physics).delete()
+        self.assertEqual(CourseStats.objects.get(course=self.physics).enrollments, 0)
+        self.assertStatsMatchRebuild()
+
+    def test_bulk_registration_and_deferred_rows(self):
+        taken_courses = TakenCourse.objects.bulk_create(
+            TakenCourse(student=student, course=self.physics) for student in self.students
+        )
+        CourseStats.record_enrollments(taken_courses)
+        self.assertEqual(CourseStats.objects.get(course=self.physics).enrollments, 3)
+
+        taken = TakenCourse.objects.only("pk", "student").first()
+        taken.delete()
+        self.assertEqual(CourseStats.objects.get(course=self.physics).enrollments, 2)
+        self.assertStatsMatchRebuild()
+
+    def test_course_delete(self):
+        TakenCourse.objects.create(student=self.students[0], course=self.physics)
+        self.physics.delete()
+        self.assertFalse(CourseStats.objects.exists())
@@ -1,3 +1,5 @@
+import time
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.http import HttpResponseRedirect
@@ -5,7 +7,7 @@ from django.urls import reverse_lazy
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.files.storage import FileSystemStorage
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 
 from reportlab.platypus import (
     SimpleDocTemplate,
@@ -22,15 +24,20 @@ from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT, TA_CENTER, TA_RIGHT
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 
-from core.models import Session, Semester
 from course.models import Course
 from accounts.models import Student
 from accounts.decorators import lecturer_required, student_required
+from core.metrics import PDF_SECONDS, counter, histogram
 from .models import TakenCourse, Result
 
 
 CM = 2.54
 
+SCORE_SUBMISSION_SECONDS = histogram(
+    "score_submission_seconds", "Time spent saving a lecturer's score sheet"
+)
+SCORES_SUBMITTED = counter("scores_submitted_total", "Student scores saved by lecturers")
+
 
 # ########################################################
 # Score Add & Add for
@@ -42,15 +49,11 @@ def add_score(request):
     Shows a page where a lecturer will select a course allocated
     to him for score entry. in a specific semester and session
     """
-    current_session = Session.objects.filter(is_current_session=True).first()
-    
+    current_session, current_semester = request.academic.period
+
     if not current_session:
         messages.error(request, "No active session found. Please create and set an active session first.")
         return render(request, "result/add_score.html")
-        
-    current_semester = Semester.objects.filter(
-        is_current_semester=True, session=current_session
-    ).first()
 
     if not current_semester:
         messages.error(request, "No active semester found. Please set an active semester for the current session.")
@@ -60,7 +63,7 @@ def add_score(request):
     # allocated_course__lecturer__pk=request.user.id,
     # semester=current_semester)
     courses = Course.objects.filter(
-        allocated_course__lecturer__pk=request.user.id
+        pk__in=request.academic.allocated_course_query
     ).filter(semester=current_semester)
     context = {
         "current_session": current_session,
@@ -77,18 +80,17 @@ def add_score_for(request, id):
     Shows a page where a lecturer will add score for students that
     are taking courses allocated to him in a specific semester and session
     """
-    current_session = Session.objects.filter(is_current_session=True).first()
+    current_session, current_semester = request.academic.period
     if not current_session:
         messages.error(request, "No active session found. Please set an active session before proceeding.")
         return redirect("add_score")
-    
-    current_semester = get_object_or_404(
-        Semester, is_current_semester=True, session=current_session
-    )
+
+    if not current_semester:
+        raise Http404("No current semester.")
     
     if request.method == "GET":
         courses = Course.objects.filter(
-            allocated_course__lecturer__pk=request.user.id
+            pk__in=request.academic.allocated_course_query
         ).filter(semester=current_semester)
         course = Course.objects.get(pk=id)
         # myclass = Class.objects.get(lecturer__pk=request.user.id)
@@ -118,6 +120,7 @@ def add_score_for(request, id):
         return render(request, "result/add_score_for.html", context)
 
     if request.method == "POST":
+        start = time.perf_counter()
         ids = ()
         data = request.POST.copy()
         data.pop("csrfmiddlewaretoken", None)  # remove csrf_token
@@ -202,6 +205,8 @@ def add_score_for(request, id):
             #     Result.objects.get_or_create(student=student.student, gpa=gpa,
             # semester=current_semester, level=student.student.level)
 
+        SCORE_SUBMISSION_SECONDS.observe(time.perf_counter() - start)
+        SCORES_SUBMITTED.inc(len(ids))
         messages.success(request, "Successfully Recorded! ")
         return HttpResponseRedirect(reverse_lazy("add_score_for", kwargs={"id": id}))
     return HttpResponseRedirect(reverse_lazy("add_score_for", kwargs={"id": id}))
@@ -213,7 +218,7 @@ def add_score_for(request, id):
 @login_required
 @student_required
 def grade_result(request):
-    student = Student.objects.get(student__pk=request.user.id)
+    student = request.academic.get_student_or_404()
     courses = TakenCourse.objects.filter(student__student__pk=request.user.id).filter(
         course__level=student.level
     )
@@ -269,7 +274,7 @@ def grade_result(request):
 @login_required
 @student_required
 def assessment_result(request):
-    student = Student.objects.get(student__pk=request.user.id)
+    student = request.academic.get_student_or_404()
     courses = TakenCourse.objects.filter(
         student__student__pk=request.user.id, course__level=student.level
     )
@@ -287,8 +292,9 @@ def assessment_result(request):
 @login_required
 @lecturer_required
 def result_sheet_pdf_view(request, id):
-    current_semester = Semester.objects.get(is_current_semester=True)
-    current_session = Session.objects.get(is_current_session=True)
+    current_session, current_semester = request.academic.period
+    if not current_session or not current_semester:
+        raise Http404("No current session or semester.")
     result = TakenCourse.objects.filter(course__pk=id)
     course = get_object_or_404(Course, id=id)
     no_of_pass = TakenCourse.objects.filter(course__pk=id, comment="PASS").count()
@@ -446,7 +452,8 @@ def result_sheet_pdf_view(request, id):
     tbl = Table(tbl_data)
     Story.append(tbl)
 
-    doc.build(Story)
+    with PDF_SECONDS.time(document="result_sheet"):
+        doc.build(Story)
 
     fs = FileSystemStorage(settings.MEDIA_ROOT + "/result_sheet")
     with fs.open(fname) as pdf:
@@ -459,7 +466,9 @@ def result_sheet_pdf_view(request, id):
 @login_required
 @student_required
 def course_registration_form(request):
-    current_session = Session.objects.get(is_current_session=True)
+    current_session = request.academic.current_session
+    if not current_session:
+        raise Http404("No current session.")
     courses = TakenCourse.objects.filter(student__student__id=request.user.id)
     fname = request.user.username + ".pdf"
     fname = fname.replace("/", "-")
@@ -514,7 +523,7 @@ def course_registration_form(request):
     title = "<b><u>STUDENT COURSE REGISTRATION FORM</u></b>"
     title = Paragraph(title.upper(), normal)
     Story.append(title)
-    student = Student.objects.get(student__pk=request.user.id)
+    student = request.academic.get_student_or_404()
 
     tbl_data = [
         [
@@ -723,7 +732,6 @@ def course_registration_form(request):
     certification.fontName = "Helvetica"
     certification.fontSize = 8
     certification.leading = 18
-    student = Student.objects.get(student__pk=request.user.id)
     certification_text = (
         "CERTIFICATION OF REGISTRATION: I certify that <b>"
         + str(request.user.get_full_name.upper())
@@ -751,7 +759,8 @@ def course_registration_form(request):
     setattr(im, "_offs_y", 550)
     Story.append(im)
 
-    doc.build(Story)
+    with PDF_SECONDS.time(document="registration_form"):
+        doc.build(Story)
     fs = FileSystemStorage(settings.MEDIA_ROOT + "/registration_form")
     with fs.open(fname) as pdf:
         response = HttpResponse(pdf, content_type="application/pdf")
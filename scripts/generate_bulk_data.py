@@ -0,0 +1,262 @@
+"""
+Deterministic bulk data for load tests and benchmarks.
+
+Unlike the factory_boy factories next to it, this builds every table with
+``bulk_create`` in batches: slugs, student ids and password hashes are
+computed up front and no per-row signals run, so a realistic dataset
+(20k students, 2k courses, 500k enrollments) takes minutes, not hours.
+The same seed always produces the same rows. Use it on a scratch database
+through `manage.py generate_bulk_data`.
+"""
+
+import random
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from accounts.models import Student, User
+from core.academic import invalidate_current_period
+from core.activity import activity_log_disabled
+from core.models import Semester, Session
+from course.models import Course, CourseAllocation, Program
+from quiz.models import Choice, MCQuestion, Question, Quiz
+from result.models import (
+    F,
+    FAIL,
+    GRADE_BOUNDARIES,
+    GRADE_POINT_MAPPING,
+    NG,
+    PASS,
+    CourseStats,
+    TakenCourse,
+)
+
+FIRST_NAMES = [
+    "Amina", "Bilal", "Chen", "Dara", "Elif", "Farah", "Goran", "Hana", "Ivan",
+    "Jamal", "Kiri", "Lina", "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa",
+    "Samir", "Tara", "Umar", "Vera", "Wen", "Yusuf", "Zara",
+]
+LAST_NAMES = [
+    "Ahmadi", "Baker", "Costa", "Diallo", "Evans", "Fischer", "Garcia", "Haddad",
+    "Ito", "Jensen", "Khan", "Lopez", "Moreau", "Novak", "Okafor", "Petrov",
+    "Rahimi", "Silva", "Tanaka", "Usman", "Volkov", "Wang", "Yilmaz", "Zhou",
+]
+SUBJECTS = [
+    "Algebra", "Biology", "Chemistry", "Economics", "Geography", "Geometry",
+    "History", "Literature", "Physics", "Statistics", "Computing", "Art",
+]
+LEVELS = [settings.MIDDLE_SCHOOL, settings.HIGH_SCHOOL]
+SEMESTERS = [settings.FIRST, settings.SECOND]
+YEARS = [year for year, _ in settings.YEARS]
+
+
+def _grade(total):
+    for boundary, grade in GRADE_BOUNDARIES:
+        if total >= boundary:
+            return grade
+    return NG
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_bulk_data(
+    students=20000,
+    courses=2000,
+    taken_courses=500000,
+    lecturers=None,
+    quizzes=None,
+    questions_per_quiz=10,
+    seed=42,
+    prefix="bench",
+    batch_size=5000,
+    log=print,
+):
+    """
+    Create the dataset and return the number of rows created per model.
+    ``lecturers`` defaults to one per 5 courses, ``quizzes`` to one per
+    10 courses; every student takes ``taken_courses / students`` courses.
+    """
+    rng = random.Random(seed)
+    lecturers = lecturers if lecturers is not None else max(1, courses // 5)
+    quizzes = quizzes if quizzes is not None else max(1, courses // 10)
+    per_student = min(courses, max(1, taken_courses // max(1, students)))
+    password = make_password("password", salt=f"{prefix}salt")
+    counts = {}
+
+    with activity_log_disabled(), transaction.atomic():
+        # Current session and semester
+        Session.objects.update(is_current_session=False)
+        Semester.objects.update(is_current_semester=False)
+        session = Session.objects.create(session=f"{prefix} 2024/2025", is_current_session=True)
+        Semester.objects.create(
+            semester=settings.FIRST, is_current_semester=True, session=session
+        )
+
+        programs = Program.objects.bulk_create(
+            Program(
+                title=f"{prefix} {SUBJECTS[i % len(SUBJECTS)]} program {i}",
+                summary=f"{SUBJECTS[i % len(SUBJECTS)]} studies",
+            )
+            for i in range(max(1, courses // 50))
+        )
+        counts["programs"] = len(programs)
+
+        course_objects = []
+        for i in range(courses):
+            subject = SUBJECTS[i % len(SUBJECTS)]
+            course_objects.append(
+                Course(
+                    program=programs[i % len(programs)],
+                    slug=f"{prefix}-course-{i:05d}",
+                    title=f"{subject} {i}",
+                    code=f"{prefix.upper()}{i:05d}",
+                    credit=rng.randint(1, 6),
+                    summary=f"{subject} course {i}",
+                    level=rng.choice(LEVELS),
+                    year=rng.choice(YEARS),
+                    semester=SEMESTERS[i % 2],
+                    is_elective=rng.random() < 0.2,
+                )
+            )
+        course_objects = Course.objects.bulk_create(course_objects, batch_size=batch_size)
+        credits = {course.pk: course.credit for course in course_objects}
+        course_ids = [course.pk for course in course_objects]
+        counts["courses"] = len(course_objects)
+        log(f"Created {len(programs)} programs and {len(course_objects)} courses.")
+
+        def make_user(role, i, **flags):
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            return User(
+                username=f"{prefix}-{role}-{i:06d}",
+                password=password,
+                first_name=first_name,
+                last_name=last_name,
+                email=f"{prefix}-{role}-{i:06d}@example.com",
+                gender=rng.choice("MF"),
+                **flags,
+            )
+
+        lecturer_users = User.objects.bulk_create(
+            (make_user("lecturer", i, is_lecturer=True) for i in range(lecturers)),
+            batch_size=batch_size,
+        )
+        allocations = CourseAllocation.objects.bulk_create(
+            CourseAllocation(lecturer=lecturer, session=session) for lecturer in lecturer_users
+        )
+        Through = CourseAllocation.courses.through
+        Through.objects.bulk_create(
+            (
+                Through(
+                    courseallocation_id=allocations[i % len(allocations)].pk,
+                    course_id=course_id,
+                )
+                for i, course_id in enumerate(course_ids)
+            ),
+            batch_size=batch_size,
+        )
+        counts["lecturers"] = len(lecturer_users)
+        log(f"Created {len(lecturer_users)} lecturers with course allocations.")
+
+        counts["students"] = 0
+        counts["taken_courses"] = 0
+        for batch in _batches(range(students), batch_size):
+            users = User.objects.bulk_create(
+                make_user("student", i, is_student=True) for i in batch
+            )
+            student_objects = Student.objects.bulk_create(
+                Student(
+                    student=user,
+                    level=rng.choice(LEVELS),
+                    program=programs[i % len(programs)],
+                    student_unique_id=f"{prefix}-{i:06d}",
+                )
+                for i, user in zip(batch, users)
+            )
+            enrollments = []
+            for student in student_objects:
+                for course_id in rng.sample(course_ids, per_student):
+                    scores = [rng.randint(0, limit) for limit in (10, 20, 10, 10, 50)]
+                    total = Decimal(sum(scores))
+                    grade = _grade(total)
+                    enrollments.append(
+                        TakenCourse(
+                            student=student,
+                            course_id=course_id,
+                            assignment=scores[0],
+                            mid_exam=scores[1],
+                            quiz=scores[2],
+                            attendance=scores[3],
+                            final_exam=scores[4],
+                            total=total,
+                            grade=grade,
+                            point=Decimal(credits[course_id])
+                            * Decimal(GRADE_POINT_MAPPING[grade]),
+                            comment=FAIL if grade in (F, NG) else PASS,
+                        )
+                    )
+            TakenCourse.objects.bulk_create(enrollments, batch_size=batch_size)
+            counts["students"] += len(student_objects)
+            counts["taken_courses"] += len(enrollments)
+            log(f"Created {counts['students']} students, {counts['taken_courses']} enrollments.")
+
+        counts.update(_create_quizzes(rng, course_objects, quizzes, questions_per_quiz, prefix))
+        log(f"Created {counts['quizzes']} quizzes with {counts['questions']} questions.")
+
+    CourseStats.rebuild()
+    invalidate_current_period()
+    return counts
+
+
+def _create_quizzes(rng, courses, count, questions_per_quiz, prefix):
+    quizzes = Quiz.objects.bulk_create(
+        Quiz(
+            course=courses[i % len(courses)],
+            title=f"Quiz {i}",
+            slug=f"{prefix}-quiz-{i:05d}",
+            description="Generated quiz",
+            category="practice",
+            random_order=rng.random() < 0.5,
+        )
+        for i in range(count)
+    )
+
+    # MCQuestion uses multi-table inheritance, which bulk_create refuses:
+    # bulk create the Question rows, then insert the child rows through the
+    # manager as bulk_create would, so the ORM provides the table and columns.
+    questions = Question.objects.bulk_create(
+        Question(content=f"Question {q} of quiz {quiz.pk}?")
+        for quiz in quizzes
+        for q in range(questions_per_quiz)
+    )
+    children = [MCQuestion(question_ptr=question, choice_order="") for question in questions]
+    fields = MCQuestion._meta.local_concrete_fields
+    batch_size = max(1, connection.ops.bulk_batch_size(fields, children))
+    for batch in _batches(children, batch_size):
+        MCQuestion._base_manager._insert(batch, fields=fields)
+
+    Through = Question.quiz.through
+    Through.objects.bulk_create(
+        Through(question_id=question.pk, quiz_id=quizzes[i // questions_per_quiz].pk)
+        for i, question in enumerate(questions)
+    )
+    choices = []
+    for question in questions:
+        correct = rng.randrange(4)
+        choices.extend(
+            Choice(question_id=question.pk, choice_text=f"Answer {c}", correct=c == correct)
+            for c in range(4)
+        )
+    Choice.objects.bulk_create(choices, batch_size=5000)
+    return {"quizzes": len(quizzes), "questions": len(questions)}
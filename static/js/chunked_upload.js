@@ -0,0 +1,171 @@
+"use strict";
+
+// Resumable chunked uploads for course files and videos.
+//
+// A form opts in with data-chunked-start (URL of chunked_upload_start),
+// data-chunked-kind ("file" or "video") and data-chunked-field (name of the
+// file input). The upload id is remembered in localStorage so that picking
+// the same file again after a dropped connection or a page reload resumes
+// from the last offset acknowledged by the server.
+
+(function () {
+  var MAX_RETRIES = 5;
+
+  function getCookie(name) {
+    var match = document.cookie.match(new RegExp("(^|;\\s*)" + name + "=([^;]*)"));
+    return match ? decodeURIComponent(match[2]) : null;
+  }
+
+  function sleep(ms) {
+    return new Promise(function (resolve) {
+      setTimeout(resolve, ms);
+    });
+  }
+
+  function storageKey(form, file) {
+    return ["chunked", form.dataset.chunkedStart, file.name, file.size, file.lastModified].join(":");
+  }
+
+  function request(method, url, body, headers) {
+    headers = headers || {};
+    headers["X-CSRFToken"] = getCookie("csrftoken");
+    return fetch(url, {
+      method: method,
+      body: body,
+      headers: headers,
+      credentials: "same-origin",
+    }).then(function (response) {
+      return response.json().then(function (data) {
+        data.status = response.status;
+        return data;
+      });
+    });
+  }
+
+  function startOrResume(form, file, fields) {
+    var key = storageKey(form, file);
+    var saved = window.localStorage.getItem(key);
+    var resume = saved
+      ? request("GET", saved).then(function (data) {
+          return data.status === 200 ? Object.assign(data, { url: saved }) : null;
+        })
+      : Promise.resolve(null);
+
+    return resume.then(function (status) {
+      if (status) {
+        return status;
+      }
+      var body = new FormData();
+      body.append("kind", form.dataset.chunkedKind);
+      body.append("filename", file.name);
+      body.append("size", file.size);
+      if (fields.topic) {
+        body.append("topic", fields.topic);
+      }
+      return request("POST", form.dataset.chunkedStart, body).then(function (data) {
+        if (data.status !== 201) {
+          throw new Error(data.error || "Could not start the upload.");
+        }
+        data.url = form.dataset.chunkedStart + data.upload_id + "/";
+        window.localStorage.setItem(key, data.url);
+        return data;
+      });
+    });
+  }
+
+  async function sendChunks(file, status, onProgress) {
+    var offset = status.offset;
+    var retries = 0;
+    while (offset < file.size) {
+      var end = Math.min(offset + status.chunk_size, file.size);
+      var data;
+      try {
+        data = await request("PUT", status.url, file.slice(offset, end), {
+          "Content-Type": "application/octet-stream",
+          "Content-Range": "bytes " + offset + "-" + (end - 1) + "/" + file.size,
+        });
+      } catch (e) {
+        data = null;
+      }
+      if (data && (data.status === 200 || data.status === 409)) {
+        // On 409 the server tells us where to continue from.
+        offset = data.offset;
+        retries = 0;
+        onProgress(offset / file.size);
+        continue;
+      }
+      if (data && data.status < 500) {
+        throw new Error(data.error || "Upload failed.");
+      }
+      retries += 1;
+      if (retries > MAX_RETRIES) {
+        throw new Error("Upload interrupted. Select the file again to resume.");
+      }
+      await sleep(1000 * Math.pow(2, retries));
+      // Ask the server how much it has before retrying.
+      try {
+        var current = await request("GET", status.url);
+        offset = current.offset;
+      } catch (e) {}
+    }
+  }
+
+  function init(form) {
+    var input = form.querySelector('input[type="file"][name="' + form.dataset.chunkedField + '"]');
+    var progress = form.querySelector("[data-chunked-progress]");
+    if (!input || !window.fetch) {
+      return;
+    }
+
+    form.addEventListener("submit", function (event) {
+      var file = input.files[0];
+      if (!file) {
+        return; // nothing to upload, let the regular form submit (e.g. video URL)
+      }
+      event.preventDefault();
+      var fields = {
+        topic: new URLSearchParams(window.location.search).get("topic"),
+      };
+      var submit = form.querySelector('[type="submit"]');
+      submit.disabled = true;
+      if (progress) {
+        progress.classList.remove("d-none");
+      }
+
+      startOrResume(form, file, fields)
+        .then(function (status) {
+          return sendChunks(file, status, function (ratio) {
+            if (progress) {
+              var bar = progress.querySelector(".progress-bar");
+              bar.style.width = Math.round(ratio * 100) + "%";
+              bar.textContent = Math.round(ratio * 100) + "%";
+            }
+          }).then(function () {
+            var body = new FormData();
+            ["title", "description"].forEach(function (name) {
+              var field = form.querySelector('[name="' + name + '"]');
+              if (field) {
+                body.append(name, field.value);
+              }
+            });
+            return request("POST", status.url + "complete/", body);
+          });
+        })
+        .then(function (data) {
+          if (!data.redirect) {
+            throw new Error(data.error || "Upload failed.");
+          }
+          window.localStorage.removeItem(storageKey(form, file));
+          window.location.href = data.redirect;
+        })
+        .catch(function (error) {
+          submit.disabled = false;
+          alert(error.message);
+        });
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll("form[data-chunked-start]").forEach(init);
+  });
+})();